@@ -1,26 +1,30 @@
-import pygame
 import random
-import math
-from circleshape import CircleShape
+from entitystore import StoredShape
 from constants import ASTEROID_MIN_RADIUS, SCORE_LARGE, SCORE_MEDIUM, SCORE_SMALL
 from explosion import Explosion
+from shapes import ShapeLibrary
+from governor import RenderQuality
 
-class Asteroid(CircleShape):
+class Asteroid(StoredShape):
+    __slots__ = ('shape',)
     # Static containers will be set from main.py
     containers = []
+    # Lumpy outlines are shared by every asteroid
+    shapes = ShapeLibrary()
+    quality = RenderQuality()  # Will be set from main.py
+    # Simulation and cosmetic randomness, will be set from main.py
+    rng = random.Random()
+    effects_rng = random.Random()
     
-    def __init__(self, x: int, y: int, radius: int):
-        super().__init__(x, y, radius)
-        # Create lumpy shape
-        self.vertices = []
-        num_vertices = random.randint(8, 12)
-        for i in range(num_vertices):
-            angle = (i / num_vertices) * 2 * math.pi
-            # Vary radius between 0.8 and 1.2 of original radius
-            dist = self.radius * random.uniform(0.8, 1.2)
-            x = math.cos(angle) * dist
-            y = math.sin(angle) * dist
-            self.vertices.append((x, y))
+    def reset(self, x: int, y: int, radius: int):
+        super().reset(x, y, radius)
+        # Pick one of the pre-built lumpy shapes
+        self.shape = self.effects_rng.randrange(self.shapes.variants)
+
+    @property
+    def vertices(self):
+        """Outline vertices relative to the asteroid's centre"""
+        return self.shapes.vertices(self.radius, self.shape)
     
     @property
     def score_value(self):
@@ -32,47 +36,53 @@ class Asteroid(CircleShape):
         return SCORE_SMALL
     
     def draw(self, screen):
-        # Draw lumpy asteroid by connecting vertices
-        points = []
-        for x, y in self.vertices:
-            point = (self.position.x + x, self.position.y + y)
-            points.append(point)
-        # Close the shape by connecting back to first point
-        if points:
-            points.append(points[0])
-        pygame.draw.lines(screen, "white", False, points, 2)
+        # Blit the pre-rendered outline centred on the asteroid
+        surface, half = self.shapes.sprite(self.radius, self.shape,
+                                           self.quality.outline_detail, self.quality.line_width)
+        x, y = self.store.render_positions[self.slot]
+        return screen.blit(surface, (x - half, y - half))
     
-    def update(self, dt):
-        self.position += self.velocity * dt
-        self.wrap_position()
-        
-    def split(self):
-        """Split asteroid into two smaller asteroids"""
+    def split(self, at: float = None):
+        """Split asteroid into two smaller asteroids and return them.
+
+        at is how far through the last step it was hit, for swept
+        collisions: the explosion and pieces start from where the asteroid
+        was at that moment and the pieces move on for the rest of the step.
+        """
+        if at is None:
+            x, y = self.position.x, self.position.y
+        else:
+            x, y = self.store.position_at(self.slot, at).tolist()
+
         # Create explosion effect
-        Explosion(self.position.x, self.position.y, self.radius)
+        Explosion.spawn(x, y, self.radius)
         
         # If this is already a small asteroid, just destroy it
         if self.radius <= ASTEROID_MIN_RADIUS:
             self.kill()
-            return
+            return []
             
         # Calculate new properties for child asteroids
         new_radius = self.radius - ASTEROID_MIN_RADIUS
         
         # Generate random split angle (20-50 degrees)
-        split_angle = random.uniform(20, 50)
+        split_angle = self.rng.uniform(20, 50)
         
         # Create two new velocity vectors by rotating current velocity
         velocity1 = self.velocity.rotate(split_angle)
         velocity2 = self.velocity.rotate(-split_angle)
         
         # Create two new smaller asteroids
-        asteroid1 = Asteroid(self.position.x, self.position.y, new_radius)
-        asteroid2 = Asteroid(self.position.x, self.position.y, new_radius)
+        asteroid1 = Asteroid.spawn(x, y, new_radius)
+        asteroid2 = Asteroid.spawn(x, y, new_radius)
         
         # Set their velocities (1.2x faster than parent)
         asteroid1.velocity = velocity1 * 1.2
         asteroid2.velocity = velocity2 * 1.2
+        if at is not None:
+            asteroid1.store.launch(asteroid1.slot, at)
+            asteroid2.store.launch(asteroid2.slot, at)
         
         # Kill the original asteroid after creating the new ones
-        self.kill()
\ No newline at end of file
+        self.kill()
+        return [asteroid1, asteroid2]
\ No newline at end of file
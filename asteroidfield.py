@@ -6,40 +6,52 @@ from constants import *
 
 class AsteroidField:
     containers = []  # Will be set from main.py
+    rng = random.Random()  # Will be set from main.py
+    world_size = (WORLD_WIDTH, WORLD_HEIGHT)  # Will be set from main.py
     
     def __init__(self):
         # Add self to containers (updatable group)
         for container in self.containers:
-            container.append(self)
+            container.add(self)
         self.spawn_timer = 0
     
     def update(self, dt):
         self.spawn_timer += dt
         
-        # Spawn a new asteroid every ASTEROID_SPAWN_DELAY seconds
+        # Spawn a new asteroid every ASTEROID_SPAWN_DELAY seconds. A world
+        # bigger than the screen is split into screen-sized tiles which get
+        # one each, so asteroids are as dense as on a single screen.
         if self.spawn_timer >= ASTEROID_SPAWN_DELAY:
             self.spawn_timer = 0
-            self.spawn_asteroid()
+            width, height = self.world_size
+            cols = max(1, width // SCREEN_WIDTH)
+            rows = max(1, height // SCREEN_HEIGHT)
+            for row in range(rows):
+                for col in range(cols):
+                    self.spawn_asteroid(width * col // cols, height * row // rows,
+                                        width // cols, height // rows)
     
-    def spawn_asteroid(self):
-        # Random position along screen edge
-        side = random.randint(0, 3)
+    def spawn_asteroid(self, left=0, top=0, width=None, height=None):
+        # Random position along the edge of the tile, by default the whole world
+        if width is None:
+            width, height = self.world_size
+        side = self.rng.randint(0, 3)
         if side == 0:  # Top
-            x = random.randint(0, SCREEN_WIDTH)
+            x = self.rng.randint(0, width)
             y = 0
         elif side == 1:  # Right
-            x = SCREEN_WIDTH
-            y = random.randint(0, SCREEN_HEIGHT)
+            x = width
+            y = self.rng.randint(0, height)
         elif side == 2:  # Bottom
-            x = random.randint(0, SCREEN_WIDTH)
-            y = SCREEN_HEIGHT
+            x = self.rng.randint(0, width)
+            y = height
         else:  # Left
             x = 0
-            y = random.randint(0, SCREEN_HEIGHT)
+            y = self.rng.randint(0, height)
             
         # Create asteroid with random size and velocity
-        asteroid = Asteroid(x, y, random.randint(ASTEROID_MIN_RADIUS, ASTEROID_MAX_RADIUS))
+        asteroid = Asteroid.spawn(left + x, top + y, self.rng.randint(ASTEROID_MIN_RADIUS, ASTEROID_MAX_RADIUS))
         asteroid.velocity = pygame.Vector2(
-            random.uniform(-ASTEROID_MAX_SPEED, ASTEROID_MAX_SPEED),
-            random.uniform(-ASTEROID_MAX_SPEED, ASTEROID_MAX_SPEED)
+            self.rng.uniform(-ASTEROID_MAX_SPEED, ASTEROID_MAX_SPEED),
+            self.rng.uniform(-ASTEROID_MAX_SPEED, ASTEROID_MAX_SPEED)
         )
\ No newline at end of file
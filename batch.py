@@ -0,0 +1,235 @@
+"""Run many headless games in parallel for tuning and balance checks.
+
+Each game gets its own seed and a policy from policies.py driving the ship.
+Results stream back from a process pool as games finish and are aggregated
+per policy and constant override set:
+
+    python batch.py --games 2000 --policy aim --sweep ASTEROID_SPAWN_DELAY=0.5,1,2
+
+Overrides are patched into every loaded module for the length of a game.
+Constants read at import time keep their old value, so sweeping them is
+rejected: SHOT_RADIUS, ASTEROID_MAX_RADIUS (and ASTEROID_MIN_RADIUS and
+ASTEROID_KINDS, which it is computed from), ASTEROID_SHAPE_VARIANTS,
+VIEW_MARGIN and the WORLD_* and SCREEN_* sizes. FIXED_DT can be swept to
+play at a coarser step; PLAYER_FRICTION applies per 1/SIMULATION_RATE
+seconds whatever the step, so drag per second stays the same. Sweeping
+SIMULATION_RATE (with FIXED_DT) does change it.
+"""
+import argparse
+import ast
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+import constants
+
+# One game to play: overrides is a tuple of (constant name, value) pairs
+GameSpec = namedtuple('GameSpec', ['seed', 'policy', 'overrides', 'max_time'],
+                      defaults=('aim', (), 600.0))
+
+METRICS = ('score', 'survival_time', 'asteroids_destroyed', 'frames')
+
+
+# Bound at import time somewhere, but play_game passes them in itself
+PASSED_EXPLICITLY = {'FIXED_DT'}
+
+
+def _import_time_uses(path: str, names):
+    """Names from constants read when path is imported rather than when its
+    code runs: argument defaults, class attributes and module globals"""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    expressions = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            expressions.extend(node.args.defaults)
+            expressions.extend(default for default in node.args.kw_defaults if default is not None)
+    for body in [tree.body] + [node.body for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]:
+        expressions.extend(statement.value for statement in body
+                           if isinstance(statement, (ast.Assign, ast.AnnAssign)) and statement.value)
+    return {node.id for expression in expressions for node in ast.walk(expression)
+            if isinstance(node, ast.Name) and node.id in names}
+
+
+def _derived_constants():
+    """Map each constant computed from others in constants.py to its inputs"""
+    with open(constants.__file__) as f:
+        tree = ast.parse(f.read())
+    derived = {}
+    for statement in tree.body:
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1:
+            inputs = {node.id for node in ast.walk(statement.value) if isinstance(node, ast.Name)}
+            if inputs:
+                derived[statement.targets[0].id] = inputs
+    return derived
+
+
+def check_overrides(overrides, modules):
+    """Raise ValueError for overrides that would not fully take effect.
+
+    modules are the loaded modules of this project. A constant they read at
+    import time keeps its old value there, and constants derived from an
+    overridden one are not recomputed unless they are overridden as well.
+    """
+    names = {name for name, _ in overrides}
+    for module in modules:
+        bound = _import_time_uses(module.__file__, names) - PASSED_EXPLICITLY
+        if bound:
+            raise ValueError(f"{', '.join(sorted(bound))} cannot be overridden: "
+                             f"{os.path.basename(module.__file__)} reads it at import time")
+    for derived, inputs in _derived_constants().items():
+        stale = inputs & names
+        if stale and derived not in names:
+            raise ValueError(f"{derived} is computed from {', '.join(sorted(stale))}; "
+                             f"override it as well")
+
+
+@contextmanager
+def constant_overrides(overrides):
+    """Temporarily replace values from constants.py.
+
+    Game modules copy constants with 'from constants import ...', so every
+    loaded module of this project holding the name is patched too.
+    Overrides that would not take effect are rejected (see check_overrides).
+    """
+    project = os.path.dirname(os.path.abspath(constants.__file__))
+    modules = [module for module in list(sys.modules.values())
+               if os.path.dirname(os.path.abspath(getattr(module, '__file__', None) or os.sep)) == project]
+    for name, _ in overrides:
+        if not hasattr(constants, name):
+            raise AttributeError(f"constants has no {name}")
+    check_overrides(overrides, [module for module in modules
+                                 if module is not constants and os.path.isfile(module.__file__)])
+    saved = []
+    try:
+        for name, value in overrides:
+            for module in modules:
+                if hasattr(module, name):
+                    saved.append((module, name, getattr(module, name)))
+                    setattr(module, name, value)
+        yield
+    finally:
+        for module, name, value in reversed(saved):
+            setattr(module, name, value)
+
+
+def play_game(spec: GameSpec):
+    """Play one game to the end (or max_time) and return its result dict"""
+    # Imported in the worker so the parent doesn't need pygame set up
+    from headless import HeadlessGame
+    from policies import resolve_policy
+
+    policy = resolve_policy(spec.policy)
+    policy_rng = random.Random(spec.seed)
+    start = time.perf_counter()
+    with constant_overrides(spec.overrides):
+        game = HeadlessGame(seed=spec.seed)
+        observation = game.observe()
+        # step() bound FIXED_DT as its default when it was defined
+        dt = constants.FIXED_DT
+        max_frames = int(spec.max_time / dt)
+        done = False
+        while not done and game.frames < max_frames:
+            observation, _, done = game.step(policy(observation, policy_rng), dt)
+    return {
+        'seed': spec.seed,
+        'policy': spec.policy,
+        'overrides': dict(spec.overrides),
+        'score': game.game_objects['score'],
+        'survival_time': game.time,
+        'asteroids_destroyed': game.game_objects['asteroids_destroyed'],
+        'frames': game.frames,
+        'game_over': done,
+        'wall_time': time.perf_counter() - start,
+    }
+
+
+def run_batch(specs, workers: int = None):
+    """Play every spec on a process pool, yielding results as games finish"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_game, spec) for spec in specs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def sweep(grid, seeds, policy: str = 'aim', max_time: float = 600.0):
+    """GameSpecs for every combination of the values in grid, for every seed.
+
+    grid maps constant names to lists of values.
+    """
+    names = sorted(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        overrides = tuple(zip(names, values))
+        for seed in seeds:
+            yield GameSpec(seed, policy, overrides, max_time)
+
+
+def aggregate(results):
+    """Summary statistics per (policy, overrides) group"""
+    groups = {}
+    for result in results:
+        key = (result['policy'], tuple(sorted(result['overrides'].items())))
+        groups.setdefault(key, []).append(result)
+    summary = []
+    for (policy, overrides), group in sorted(groups.items(), key=lambda item: repr(item[0])):
+        row = {'policy': policy, 'overrides': dict(overrides), 'games': len(group)}
+        for metric in METRICS:
+            values = [result[metric] for result in group]
+            row[metric] = {'mean': statistics.fmean(values),
+                           'stdev': statistics.stdev(values) if len(values) > 1 else 0.0,
+                           'min': min(values), 'max': max(values)}
+        summary.append(row)
+    return summary
+
+
+def parse_sweep(text: str):
+    """Parse NAME=v1,v2,... into (name, [values])"""
+    name, _, values = text.partition("=")
+    current = getattr(constants, name)
+    kind = type(current) if isinstance(current, (int, float)) else float
+    return name, [kind(value) for value in values.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many headless games on a process pool")
+    parser.add_argument("--games", type=int, default=100, help="games per parameter combination")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--policy", default="aim", help="policy name or module:function")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--max-time", type=float, default=600.0, help="simulated seconds per game")
+    parser.add_argument("--sweep", action="append", default=[], metavar="NAME=V1,V2",
+                        help="constant values to sweep over; may be repeated. FIXED_DT keeps "
+                             "the same drag per second. Rejected, as they are read at import time: "
+                             "SHOT_RADIUS, ASTEROID_MIN/MAX_RADIUS, ASTEROID_KINDS, "
+                             "ASTEROID_SHAPE_VARIANTS, VIEW_MARGIN, WORLD_* and SCREEN_*")
+    args = parser.parse_args(argv)
+
+    grid = dict(parse_sweep(text) for text in args.sweep)
+    specs = list(sweep(grid, range(args.seed, args.seed + args.games), args.policy, args.max_time))
+    start = time.perf_counter()
+    results = []
+    for result in run_batch(specs, args.workers):
+        results.append(result)
+        print(f"\r{len(results)}/{len(specs)} games", end="", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+
+    for row in aggregate(results):
+        overrides = " ".join(f"{name}={value}" for name, value in row['overrides'].items()) or "defaults"
+        print(f"{row['policy']:<14} {overrides:<32} games {row['games']:<5} "
+              f"score {row['score']['mean']:8.1f} ±{row['score']['stdev']:<7.1f} "
+              f"survival {row['survival_time']['mean']:6.1f}s "
+              f"destroyed {row['asteroids_destroyed']['mean']:6.1f}")
+    frames = sum(result['frames'] for result in results)
+    print(f"{len(results)} games, {frames} frames in {elapsed:.1f}s "
+          f"({frames / elapsed:.0f} frames/s on {args.workers} workers)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
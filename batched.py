@@ -0,0 +1,428 @@
+"""Many independent games stepped in lockstep with NumPy, for bot training.
+
+BatchedGame keeps K worlds in shared (K, ...) arrays and advances all of
+them with one call: the ship, AsteroidField spawning, store integration
+and wrapping, shot expiry, Asteroid.split and the collisions and scoring of
+main.check_collisions, each done as array operations over every world at
+once. Worlds that end are started again straight away.
+
+The rules are the same as the object game's, but randomness comes from one
+NumPy generator for the whole batch, so a batched world does not replay a
+HeadlessGame with the same seed. Explosions and particles are cosmetic and
+left out.
+
+    python batched.py --worlds 256 --steps 600    # world-steps/s against looping HeadlessGame
+"""
+import argparse
+import random
+import sys
+import time
+import numpy as np
+from constants import (SCREEN_WIDTH, SCREEN_HEIGHT, FIXED_DT, PLAYER_RADIUS, PLAYER_TURN_SPEED, PLAYER_SPEED,
+                       PLAYER_ACCELERATION, PLAYER_FRICTION, PLAYER_SHOOT_SPEED, PLAYER_SHOOT_COOLDOWN,
+                       STARTING_LIVES, RESPAWN_TIME, ASTEROID_MIN_RADIUS, ASTEROID_MAX_RADIUS,
+                       ASTEROID_MAX_SPEED, ASTEROID_SPAWN_DELAY, SHOT_RADIUS, SHOT_LIFETIME, SHOT_RANGE,
+                       MAX_SHOTS, SCORE_LARGE, SCORE_MEDIUM, SCORE_SMALL, BATCH_MAX_ASTEROIDS, SIMULATION_RATE)
+from inputs import Actions
+
+WORLD_SIZE = np.array((SCREEN_WIDTH, SCREEN_HEIGHT), dtype=float)
+
+
+def _forward(rotation):
+    """(0, 1) rotated by rotation degrees, as pygame.Vector2.rotate does; (..., 2)"""
+    angle = np.radians(rotation)
+    return np.stack((-np.sin(angle), np.cos(angle)), axis=-1)
+
+
+def _wrap(positions, radii):
+    """Vectorized CircleShape.wrap_position; positions (..., 2), radii broadcast against (...)"""
+    radii = radii[..., None]
+    below = positions < -radii
+    above = positions > WORLD_SIZE + radii
+    positions[:] = np.where(below, WORLD_SIZE + radii, np.where(above, -radii, positions))
+
+
+def _compact(alive):
+    """Slots of the live entities in each world, packed to the front.
+
+    Returns (slots, valid), both (K, M) with M the most live entities in
+    any world; slots keep their order and valid marks the real entries.
+    """
+    width = max(1, int(alive.sum(axis=1).max()))
+    slots = np.argsort(~alive, axis=1, kind='stable')[:, :width]
+    return slots, np.take_along_axis(alive, slots, axis=1)
+
+
+def _free_slots(free, wanted):
+    """Match requests to free slots in each world.
+
+    free is a (K, N) mask of usable slots and wanted a (K, M) mask of
+    requests. Returns (worlds, requests, slots) for the requests that got a
+    slot: the r-th request in a world takes its r-th free slot.
+    """
+    order = np.argsort(~free, axis=1, kind='stable')
+    available = free.sum(axis=1)
+    worlds, requests = np.nonzero(wanted)
+    rank = np.cumsum(wanted, axis=1)[worlds, requests] - 1
+    ok = rank < available[worlds]
+    worlds, requests = worlds[ok], requests[ok]
+    return worlds, requests, order[worlds, rank[ok]]
+
+
+class BatchedGame:
+    """K worlds advanced together; step() takes a (K, 5) array of Actions fields"""
+
+    def __init__(self, worlds: int, seed: int = None, max_asteroids: int = BATCH_MAX_ASTEROIDS,
+                 max_shots: int = MAX_SHOTS):
+        self.worlds = worlds
+        self.rng = np.random.default_rng(seed)
+        k, a, s = worlds, max_asteroids, max_shots
+        # Ships
+        self.player_positions = np.zeros((k, 2))
+        self.player_velocities = np.zeros((k, 2))
+        self.rotations = np.zeros(k)
+        self.shoot_timers = np.zeros(k)
+        self.respawn_timers = np.zeros(k)
+        self.vulnerable = np.zeros(k, dtype=bool)
+        self.lives = np.zeros(k, dtype=np.int64)
+        self.scores = np.zeros(k, dtype=np.int64)
+        self.spawn_timers = np.zeros(k)
+        # Asteroids, in fixed slots per world
+        self.asteroid_positions = np.zeros((k, a, 2))
+        self.asteroid_velocities = np.zeros((k, a, 2))
+        self.asteroid_radii = np.zeros((k, a))
+        self.asteroid_alive = np.zeros((k, a), dtype=bool)
+        # Shots, handed out in ring order like RingStore
+        self.shot_positions = np.zeros((k, s, 2))
+        self.shot_velocities = np.zeros((k, s, 2))
+        self.shot_ages = np.zeros((k, s))
+        self.shot_travelled = np.zeros((k, s))
+        self.shot_alive = np.zeros((k, s), dtype=bool)
+        self.shot_heads = np.zeros(k, dtype=np.intp)
+        # Counters since construction
+        self.steps = 0
+        self.episodes = 0
+        self.dropped_asteroids = 0  # spawns and split pieces that found no free slot
+        self.reset()
+
+    def reset(self, worlds=None):
+        """Start fresh games in the worlds selected by a (K,) mask (all by
+        default) and return the observation of the whole batch"""
+        mask = np.ones(self.worlds, dtype=bool) if worlds is None else np.asarray(worlds, dtype=bool)
+        self.player_positions[mask] = WORLD_SIZE / 2
+        self.player_velocities[mask] = 0
+        self.rotations[mask] = 0
+        self.shoot_timers[mask] = 0
+        self.respawn_timers[mask] = 0
+        self.vulnerable[mask] = True
+        self.lives[mask] = STARTING_LIVES
+        self.scores[mask] = 0
+        self.spawn_timers[mask] = 0
+        self.asteroid_alive[mask] = False
+        self.asteroid_velocities[mask] = 0
+        self.shot_alive[mask] = False
+        self.shot_velocities[mask] = 0
+        self.shot_heads[mask] = 0
+        return self.observe()
+
+    def step(self, actions, dt: float = FIXED_DT):
+        """Advance every world by dt with a (K, 5) array of Actions fields.
+
+        Returns (observations, rewards, dones). rewards is the score gained
+        by each world this step; worlds flagged in dones have ended and were
+        already started again, so their observation is the new game's first.
+        """
+        actions = np.asarray(actions, dtype=bool).reshape(self.worlds, len(Actions._fields))
+        scores = self.scores.copy()
+        # Same order as the updatable group: stores, ship, then the field
+        self._update_asteroids(dt)
+        self._update_shots(dt)
+        self._update_players(actions, dt)
+        self._update_fields(dt)
+        self._collide_players()
+        self._collide_shots()
+        rewards = self.scores - scores
+        dones = self.lives < 0
+        self.steps += 1
+        if dones.any():
+            self.episodes += int(dones.sum())
+            self.reset(dones)
+        return self.observe(), rewards, dones
+
+    def _update_asteroids(self, dt):
+        # Dead slots have zero velocity, so there is no need to mask them
+        self.asteroid_positions += self.asteroid_velocities * dt
+        _wrap(self.asteroid_positions, self.asteroid_radii)
+
+    def _update_shots(self, dt):
+        alive = self.shot_alive
+        self.shot_ages[alive] += dt
+        self.shot_travelled[alive] += PLAYER_SHOOT_SPEED * dt
+        self.shot_positions += self.shot_velocities * dt
+        positions = self.shot_positions
+        expired = (self.shot_ages > SHOT_LIFETIME) | (self.shot_travelled > SHOT_RANGE)
+        expired |= ((positions < -SHOT_RADIUS) | (positions > WORLD_SIZE + SHOT_RADIUS)).any(axis=2)
+        self._kill_shots(expired & alive)
+
+    def _kill_shots(self, mask):
+        self.shot_alive[mask] = False
+        self.shot_velocities[mask] = 0
+
+    def _update_players(self, actions, dt):
+        rotate_left, rotate_right, thrust, reverse, fire = actions.T
+        playing = self.lives >= 0
+        recovering = playing & ~self.vulnerable
+        self.respawn_timers[recovering] -= dt
+        self.vulnerable |= recovering & (self.respawn_timers <= 0)
+        cooling = self.shoot_timers > 0
+        self.shoot_timers[cooling] -= dt
+
+        self.rotations += PLAYER_TURN_SPEED * dt * (rotate_right.astype(float) - rotate_left)
+        forward = _forward(self.rotations)
+        self.player_velocities += forward * (PLAYER_ACCELERATION * dt * thrust)[:, None]
+        self.player_positions -= forward * (PLAYER_SPEED * dt * reverse)[:, None]
+        self.player_velocities *= PLAYER_FRICTION ** (dt * SIMULATION_RATE)
+        self.player_positions += self.player_velocities * dt
+
+        shooting = fire & (self.shoot_timers <= 0) & playing
+        if shooting.any():
+            self._spawn_shots(shooting, forward)
+        _wrap(self.player_positions, np.full(self.worlds, float(PLAYER_RADIUS)))
+
+    def _spawn_shots(self, worlds, forward):
+        k = np.flatnonzero(worlds)
+        slots = self.shot_heads[k]
+        self.shot_heads[k] = (slots + 1) % self.shot_alive.shape[1]
+        # The ring evicts whatever was in the slot
+        self.shot_positions[k, slots] = self.player_positions[k]
+        self.shot_velocities[k, slots] = forward[k] * PLAYER_SHOOT_SPEED
+        self.shot_ages[k, slots] = 0
+        self.shot_travelled[k, slots] = 0
+        self.shot_alive[k, slots] = True
+        self.shoot_timers[k] = PLAYER_SHOOT_COOLDOWN
+
+    def _update_fields(self, dt):
+        self.spawn_timers += dt
+        due = self.spawn_timers >= ASTEROID_SPAWN_DELAY
+        if not due.any():
+            return
+        self.spawn_timers[due] = 0
+        worlds = np.flatnonzero(due)
+        n = len(worlds)
+        # Random point along a random edge, as AsteroidField.spawn_asteroid
+        side = self.rng.integers(0, 4, n)
+        along = self.rng.integers(0, WORLD_SIZE + 1, (n, 2)).astype(float)
+        # Top, right, bottom, left
+        positions = np.empty((n, 2))
+        positions[:, 0] = np.choose(side, (along[:, 0], WORLD_SIZE[0], along[:, 0], 0.0))
+        positions[:, 1] = np.choose(side, (0.0, along[:, 1], WORLD_SIZE[1], along[:, 1]))
+        radii = self.rng.integers(ASTEROID_MIN_RADIUS, ASTEROID_MAX_RADIUS + 1, n).astype(float)
+        velocities = self.rng.uniform(-ASTEROID_MAX_SPEED, ASTEROID_MAX_SPEED, (n, 2))
+        wanted = np.zeros((n, 1), dtype=bool)
+        wanted[:, 0] = True
+        rows, _, slots = _free_slots(~self.asteroid_alive[worlds], wanted)
+        self.dropped_asteroids += n - len(rows)
+        self._place_asteroids(worlds[rows], slots, positions[rows], velocities[rows], radii[rows])
+
+    def _place_asteroids(self, worlds, slots, positions, velocities, radii):
+        self.asteroid_positions[worlds, slots] = positions
+        self.asteroid_velocities[worlds, slots] = velocities
+        self.asteroid_radii[worlds, slots] = radii
+        self.asteroid_alive[worlds, slots] = True
+
+    def _collide_players(self):
+        """Triangle-against-circle test of Player.collides_with for every
+        vulnerable ship against every asteroid in its world"""
+        testing = self.vulnerable & (self.lives >= 0)
+        if not testing.any():
+            return
+        k = np.flatnonzero(testing)
+        position = self.player_positions[k]
+        forward = _forward(self.rotations[k]) * PLAYER_RADIUS
+        right = _forward(self.rotations[k] + 90) * (PLAYER_RADIUS / 1.5)
+        corners = np.stack((position + forward, position - forward - right, position - forward + right), axis=1)
+        centres = self.asteroid_positions[k]
+        radii_sq = self.asteroid_radii[k] ** 2
+        offsets = centres - position[:, None, :]
+        touching = np.einsum('kai,kai->ka', offsets, offsets) <= radii_sq
+        for i in range(3):
+            start = corners[:, i, None, :]
+            edge = corners[:, (i + 1) % 3, None, :] - start
+            length_sq = np.einsum('kai,kai->ka', edge, edge)
+            t = np.clip(np.einsum('kai,kai->ka', centres - start, edge) / length_sq, 0, 1)
+            delta = start + t[..., None] * edge - centres
+            touching |= np.einsum('kai,kai->ka', delta, delta) <= radii_sq
+        hit = k[(touching & self.asteroid_alive[k]).any(axis=1)]
+        if len(hit) == 0:
+            return
+        # Player.respawn
+        self.lives[hit] -= 1
+        again = hit[self.lives[hit] >= 0]
+        self.player_positions[again] = WORLD_SIZE / 2
+        self.player_velocities[again] = 0
+        self.rotations[again] = 0
+        self.respawn_timers[again] = RESPAWN_TIME
+        self.vulnerable[again] = False
+
+    def _collide_shots(self):
+        """Shot hits, scoring and Asteroid.split for every world.
+
+        As in find_shot_hits, each asteroid (in slot order) takes the first
+        shot touching it that no earlier asteroid took.
+        """
+        if not self.shot_alive.any() or not self.asteroid_alive.any():
+            return
+        # Only live entities are compared, packed to the front of each world
+        asteroid_slots, asteroid_valid = _compact(self.asteroid_alive)
+        shot_slots, shot_valid = _compact(self.shot_alive)
+        centres = np.take_along_axis(self.asteroid_positions, asteroid_slots[..., None], axis=1)
+        shots = np.take_along_axis(self.shot_positions, shot_slots[..., None], axis=1)
+        delta = centres[:, :, None, :] - shots[:, None, :, :]
+        reach = np.take_along_axis(self.asteroid_radii, asteroid_slots, axis=1)[:, :, None] + SHOT_RADIUS
+        overlaps = np.einsum('kasi,kasi->kas', delta, delta) < reach * reach
+        overlaps &= asteroid_valid[:, :, None] & shot_valid[:, None, :]
+        if not overlaps.any():
+            return
+        # Asteroids claim in packed (slot) order, all worlds at once: each
+        # takes its first overlapping shot that no earlier asteroid took
+        hit_shot = np.full(asteroid_slots.shape, -1)
+        taken = np.zeros(shot_slots.shape, dtype=bool)
+        for j in np.flatnonzero(overlaps.any(axis=(0, 2))):
+            candidates = overlaps[:, j] & ~taken
+            worlds = np.flatnonzero(candidates.any(axis=1))
+            shots = candidates[worlds].argmax(axis=1)
+            hit_shot[worlds, j] = shots
+            taken[worlds, shots] = True
+
+        worlds, packed = np.nonzero(hit_shot >= 0)
+        asteroids = asteroid_slots[worlds, packed]
+        taken_worlds, taken_packed = np.nonzero(taken)
+        self._kill_shots((taken_worlds, shot_slots[taken_worlds, taken_packed]))
+        radii = self.asteroid_radii[worlds, asteroids]
+        values = np.where(radii >= ASTEROID_MIN_RADIUS * 3, SCORE_LARGE,
+                          np.where(radii >= ASTEROID_MIN_RADIUS * 2, SCORE_MEDIUM, SCORE_SMALL))
+        np.add.at(self.scores, worlds, values)
+        positions = self.asteroid_positions[worlds, asteroids]
+        parent_velocities = self.asteroid_velocities[worlds, asteroids]
+        self.asteroid_alive[worlds, asteroids] = False
+        self.asteroid_velocities[worlds, asteroids] = 0
+
+        # Asteroid.split: bigger asteroids break into two faster pieces
+        splitting = radii > ASTEROID_MIN_RADIUS
+        if not splitting.any():
+            return
+        worlds, asteroids, radii = worlds[splitting], asteroids[splitting], radii[splitting]
+        positions, parent_velocities = positions[splitting], parent_velocities[splitting]
+        angles = self.rng.uniform(20, 50, len(worlds))
+        new_radii = radii - ASTEROID_MIN_RADIUS
+        requests = np.zeros(self.asteroid_alive.shape, dtype=bool)
+        for sign in (1, -1):
+            requests[:] = False
+            requests[worlds, asteroids] = True
+            rows, parents, slots = _free_slots(~self.asteroid_alive, requests)
+            # Map each granted request back to its entry in worlds/asteroids
+            width = self.asteroid_alive.shape[1]
+            index = np.searchsorted(worlds * width + asteroids, rows * width + parents)
+            self.dropped_asteroids += len(worlds) - len(index)
+            velocities = _rotate(parent_velocities[index], sign * angles[index]) * 1.2
+            self._place_asteroids(rows, slots, positions[index], velocities, new_radii[index])
+
+    def observe(self):
+        """Stacked observations for every world.
+
+        Rows match HeadlessGame.observe(); asteroids and shots are padded to
+        their slot counts, with masks marking the live ones.
+        """
+        return {
+            'player': np.column_stack((self.player_positions, self.player_velocities,
+                                       self.rotations % 360, self.vulnerable)),
+            'lives': self.lives.copy(),
+            'asteroids': np.concatenate((self.asteroid_positions, self.asteroid_velocities,
+                                         self.asteroid_radii[..., None]), axis=2),
+            'asteroid_mask': self.asteroid_alive.copy(),
+            'shots': np.concatenate((self.shot_positions, self.shot_velocities), axis=2),
+            'shot_mask': self.shot_alive.copy(),
+            'score': self.scores.copy(),
+        }
+
+    def observe_world(self, world: int):
+        """One world's observation in exactly the HeadlessGame.observe() layout, for policies"""
+        asteroids = self.asteroid_alive[world]
+        shots = self.shot_alive[world]
+        return {
+            'player': np.concatenate((self.player_positions[world], self.player_velocities[world],
+                                      (self.rotations[world] % 360, self.vulnerable[world]))),
+            'lives': int(self.lives[world]),
+            'asteroids': np.column_stack((self.asteroid_positions[world][asteroids],
+                                          self.asteroid_velocities[world][asteroids],
+                                          self.asteroid_radii[world][asteroids])),
+            'shots': np.column_stack((self.shot_positions[world][shots], self.shot_velocities[world][shots])),
+            'score': int(self.scores[world]),
+            'game_over': bool(self.lives[world] < 0),
+        }
+
+
+def _rotate(vectors, degrees):
+    """Rotate (n, 2) vectors counter-clockwise by degrees, as pygame.Vector2.rotate"""
+    angle = np.radians(degrees)
+    cos, sin = np.cos(angle), np.sin(angle)
+    return np.column_stack((vectors[:, 0] * cos - vectors[:, 1] * sin,
+                            vectors[:, 0] * sin + vectors[:, 1] * cos))
+
+
+def random_actions(rng, worlds: int):
+    """Vectorized policies.random_policy: every button pressed with probability 0.3"""
+    return rng.random((worlds, len(Actions._fields))) < 0.3
+
+
+def bench_batched(worlds: int, steps: int, seed: int = 0):
+    """Return (world-steps per second, episodes finished) for one BatchedGame"""
+    game = BatchedGame(worlds, seed)
+    rng = np.random.default_rng(seed + 1)
+    start = time.perf_counter()
+    for _ in range(steps):
+        game.step(random_actions(rng, worlds))
+    return worlds * steps / (time.perf_counter() - start), game.episodes
+
+
+def bench_headless(worlds: int, steps: int, seed: int = 0):
+    """World-steps per second for HeadlessGame worlds played one after another.
+
+    The object game keeps its world in class attributes, so only one can
+    exist at a time and several can only be looped.
+    """
+    # Imported here so the batched environment itself doesn't need pygame
+    from headless import HeadlessGame
+    from policies import random_policy
+    rng = random.Random(seed)
+    total = 0.0
+    for world in range(worlds):
+        game = HeadlessGame(seed=seed + world)
+        start = time.perf_counter()
+        for _ in range(steps):
+            _, _, done = game.step(random_policy(None, rng))
+            if done:
+                game.reset()
+        total += time.perf_counter() - start
+    return worlds * steps / total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the batched environment against looping HeadlessGame")
+    parser.add_argument("--worlds", type=int, default=256)
+    parser.add_argument("--steps", type=int, default=600)
+    parser.add_argument("--headless-worlds", type=int, default=4,
+                        help="HeadlessGame worlds to loop through for the comparison")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    batched_rate, episodes = bench_batched(args.worlds, args.steps, args.seed)
+    print(f"batched  {args.worlds} worlds x {args.steps} steps: {batched_rate:,.0f} world-steps/s "
+          f"({episodes} episodes finished)")
+    headless_rate = bench_headless(args.headless_worlds, args.steps, args.seed)
+    print(f"headless {args.headless_worlds} worlds x {args.steps} steps, looped: {headless_rate:,.0f} world-steps/s")
+    print(f"speedup {batched_rate / headless_rate:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""Headless performance benchmarks.
+
+Builds worlds with reset_game(), drives them through scripted stress
+scenarios and reports per-phase timings. Results can be written to JSON and
+compared against an earlier run:
+
+    python benchmark.py --output before.json
+    python benchmark.py --compare before.json
+
+With --memory each scenario instead runs twice, with and without object
+pools, each in a fresh process, and reports peak RSS and GC pauses.
+
+With --timestep a fixed shooting gallery is played at 1, 2, 4 and 8 times
+the normal step with discrete and swept collisions, and the hits are
+compared against the 60 Hz run.
+"""
+import argparse
+import gc
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pygame
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, FIXED_DT, PLAYER_SHOOT_SPEED, LARGE_WORLD_SCREENS
+from camera import Camera
+from collision import SpatialHash, DEFAULT_MODE, MODE_GRID, MODE_PAIRWISE, MODE_VECTORIZED, MODE_SWEPT
+from inputs import Actions, ScriptedInput
+from main import reset_game, update_objects, resolve_collisions, draw_game
+from shot import Shot
+from pools import pool_stats
+
+PHASES = ("update", "collision", "draw")
+
+
+def asteroid_swarm(game_objects, size):
+    """N asteroids drifting around an idle ship"""
+    for _ in range(size):
+        game_objects['asteroid_field'].spawn_asteroid()
+
+
+def sustained_fire(game_objects, size):
+    """N asteroids and a spinning ship firing every single frame"""
+    asteroid_swarm(game_objects, size)
+    game_objects['player'].input_source.set(Actions(rotate_right=True))
+
+    def tick(frame):
+        game_objects['player'].shoot()
+    return tick
+
+
+def split_storm(game_objects, size):
+    """N asteroids, all of them split at once every half second"""
+    asteroid_swarm(game_objects, size)
+
+    def tick(frame):
+        if frame % 30 == 0:
+            for asteroid in list(game_objects['asteroids']):
+                asteroid.split()
+            game_objects['kill_queue'].flush()
+    return tick
+
+
+def large_world(game_objects, size):
+    """N asteroids scattered over a world many screens big, seen through a camera"""
+    asteroid_swarm(game_objects, size)
+    width, height = game_objects['world_size']
+    rng = game_objects['rng']
+    for asteroid in game_objects['asteroids']:
+        asteroid.position = (rng.uniform(0, width), rng.uniform(0, height))
+
+
+SCENARIOS = {
+    'asteroid_swarm': (asteroid_swarm, 1000),
+    'sustained_fire': (sustained_fire, 300),
+    'split_storm': (split_storm, 200),
+    'large_world': (large_world, 20000),
+}
+
+# Scenarios played in a world bigger than the screen, in screens across and down
+WORLD_SCREENS = {'large_world': LARGE_WORLD_SCREENS}
+
+
+def entity_counts(game_objects):
+    return {
+        'asteroids': len(game_objects['asteroids']),
+        'shots': len(game_objects['shots']),
+        'explosions': len(game_objects['explosions']),
+        'particles': len(game_objects['particles']),
+    }
+
+
+class GcPauses:
+    """Times every garbage collection while active, through gc.callbacks"""
+
+    def __init__(self):
+        self.pauses = []
+        self.started = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.started = time.perf_counter_ns()
+        elif self.started is not None:
+            self.pauses.append(time.perf_counter_ns() - self.started)
+            self.started = None
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+    def summary(self):
+        return {'collections': len(self.pauses),
+                'total_ms': sum(self.pauses) / 1e6,
+                'max_ms': max(self.pauses, default=0) / 1e6}
+
+
+def run_scenario(name, size=None, frames=600, seed=0, mode=DEFAULT_MODE, draw=True, pooled=True):
+    """Run one scenario and return its timing summary"""
+    setup, default_size = SCENARIOS[name]
+    size = default_size if size is None else size
+    screens = WORLD_SCREENS.get(name, 1)
+    world_size = (SCREEN_WIDTH * screens, SCREEN_HEIGHT * screens)
+    camera = Camera(world_size) if screens > 1 else None
+    game_objects = reset_game(ScriptedInput(), seed, pooled, world_size)
+    # The ship must survive the whole run
+    game_objects['player'].lives = 10 ** 9
+    # Only the scripted waves should add asteroids
+    game_objects['updatable'].remove(game_objects['asteroid_field'])
+    tick = setup(game_objects, size)
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)) if draw else None
+    grids = (SpatialHash(width=world_size[0], height=world_size[1]),
+             SpatialHash(width=world_size[0], height=world_size[1]))
+    timings = {phase: np.zeros(frames, dtype=np.int64) for phase in PHASES}
+    clock = time.perf_counter_ns
+
+    start = clock()
+    for frame in range(frames):
+        if tick is not None:
+            tick(frame)
+        t0 = clock()
+        update_objects(game_objects, FIXED_DT, mode)
+        t1 = clock()
+        resolve_collisions(game_objects, mode, grids)
+        t2 = clock()
+        if screen is not None:
+            screen.fill("black")
+            draw_game(screen, game_objects, camera=camera)
+        t3 = clock()
+        timings['update'][frame] = t1 - t0
+        timings['collision'][frame] = t2 - t1
+        timings['draw'][frame] = t3 - t2
+    elapsed = (clock() - start) / 1e9
+
+    return {
+        'size': size,
+        'frames': frames,
+        'mode': mode,
+        'entities': entity_counts(game_objects),
+        'phases': {phase: {'mean_ms': float(values.mean() / 1e6),
+                           'p95_ms': float(np.percentile(values, 95) / 1e6),
+                           'total_ms': float(values.sum() / 1e6)}
+                   for phase, values in timings.items()},
+        'fps': frames / elapsed,
+        'pools': pool_stats(game_objects),
+    }
+
+
+def measure_memory(name, size, frames, seed, mode, draw, pooled):
+    """Run a scenario and add its GC pauses and this process's peak RSS"""
+    with GcPauses() as pauses:
+        result = run_scenario(name, size, frames, seed, mode, draw, pooled)
+    result['gc'] = pauses.summary()
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 if sys.platform == "darwin" else 1
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale / 1024
+    return result
+
+
+def run_memory(names, frames, seed, mode, draw, size=None):
+    """Compare pooled and unpooled runs, each in its own fresh process"""
+    results = {}
+    for name in names:
+        for pooled in (False, True):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results[name, pooled] = executor.submit(
+                    measure_memory, name, size, frames, seed, mode, draw, pooled).result()
+    return results
+
+
+def print_memory(results):
+    for (name, pooled), result in results.items():
+        gc_stats = result['gc']
+        label = "pooled" if pooled else "unpooled"
+        line = (f"{name:<16} {label:<9} {result['fps']:8.1f} fps  peak RSS {result['peak_rss_mb']:.1f}MB  "
+                f"gc {gc_stats['collections']} runs, {gc_stats['total_ms']:.1f}ms total, "
+                f"{gc_stats['max_ms']:.2f}ms max")
+        for pool_name, stats in result['pools'].items():
+            if 'hits' in stats:
+                line += f"  {pool_name} {stats['hits']}/{stats['hits'] + stats['misses']} reused"
+        print(line)
+
+
+# Shooting gallery for --timestep: a volley of shots from the middle of the
+# screen every VOLLEY_TICKS 60 Hz steps, turning a little each time
+VOLLEY_TICKS = 24
+VOLLEY_SHOTS = 12
+
+
+def shooting_gallery(multiple: int, mode: str, seconds: float = 20.0, size: int = 40, seed: int = 0):
+    """Play the gallery with steps multiple times FIXED_DT; returns (hits, score).
+
+    The volleys land on the same 60 Hz ticks whatever the step, so the only
+    difference between runs is how collisions see the bigger steps.
+    """
+    game_objects = reset_game(ScriptedInput(), seed)
+    player = game_objects['player']
+    # The ship is only a launcher here
+    player.is_vulnerable = False
+    game_objects['updatable'].remove(player)
+    game_objects['updatable'].remove(game_objects['asteroid_field'])
+    asteroid_swarm(game_objects, size)
+    centre = pygame.Vector2(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
+    ticks = round(seconds / FIXED_DT)
+    for tick in range(0, ticks, multiple):
+        if tick % VOLLEY_TICKS == 0:
+            volley = tick // VOLLEY_TICKS
+            for i in range(VOLLEY_SHOTS):
+                shot = Shot.spawn(centre.x, centre.y)
+                shot.velocity = pygame.Vector2(0, PLAYER_SHOOT_SPEED).rotate(360 * i / VOLLEY_SHOTS + volley * 7)
+        update_objects(game_objects, FIXED_DT * multiple, mode)
+        resolve_collisions(game_objects, mode)
+    return game_objects['asteroids_destroyed'], game_objects['score']
+
+
+def run_timestep(seed, multiples=(1, 2, 4, 8)):
+    """Gallery results for discrete and swept collisions at each step multiple"""
+    baseline = shooting_gallery(1, DEFAULT_MODE, seed=seed)
+    rows = []
+    for mode in (DEFAULT_MODE, MODE_SWEPT):
+        for multiple in multiples:
+            start = time.perf_counter()
+            hits, score = shooting_gallery(multiple, mode, seed=seed)
+            rows.append((mode, multiple, hits, score, time.perf_counter() - start))
+    return baseline, rows
+
+
+def print_timestep(baseline, rows):
+    hits, score = baseline
+    print(f"60 Hz {DEFAULT_MODE}: {hits} hits, score {score}")
+    for mode, multiple, hits, score, seconds in rows:
+        print(f"  {mode:<10} x{multiple}: {hits:4d} hits ({hits - baseline[0]:+d}), "
+              f"score {score:6d} ({score - baseline[1]:+d})  {seconds:.2f}s")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(names, frames, seed, mode, draw, size=None):
+    results = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': np.__version__,
+            'frames': frames,
+            'seed': seed,
+        },
+        'scenarios': {},
+    }
+    for name in names:
+        results['scenarios'][name] = run_scenario(name, size, frames, seed, mode, draw)
+    return results
+
+
+def print_results(results, baseline=None):
+    for name, result in results['scenarios'].items():
+        phases = "  ".join(f"{phase} {result['phases'][phase]['mean_ms']:.3f}ms"
+                           for phase in PHASES)
+        line = f"{name:<16} n={result['size']:<5} {result['fps']:8.1f} fps  {phases}"
+        if baseline and name in baseline['scenarios']:
+            ratio = result['fps'] / baseline['scenarios'][name]['fps']
+            line += f"  ({ratio:.2f}x vs {baseline['meta'].get('commit') or 'baseline'})"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless performance benchmarks")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS),
+                        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--size", type=int, help="override each scenario's entity count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", default=DEFAULT_MODE,
+                        choices=[MODE_GRID, MODE_PAIRWISE, MODE_VECTORIZED, MODE_SWEPT])
+    parser.add_argument("--no-draw", action="store_true", help="skip the draw phase")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--memory", action="store_true",
+                        help="compare peak RSS and GC pauses with and without object pools")
+    parser.add_argument("--timestep", action="store_true",
+                        help="compare collision outcomes at larger steps against 60 Hz")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+
+    if args.timestep:
+        print_timestep(*run_timestep(args.seed))
+        return 0
+
+    if args.memory:
+        print_memory(run_memory(args.scenarios, args.frames, args.seed, args.mode,
+                                not args.no_draw, args.size))
+        return 0
+
+    results = run_all(args.scenarios, args.frames, args.seed, args.mode, not args.no_draw, args.size)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import numpy as np
+import pygame
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, VIEW_MARGIN
+
+
+class Camera:
+    """Window onto a world bigger than the screen, centred on a target.
+
+    The world wraps, so each entity is drawn at whichever of its wrapped
+    copies is nearest the centre of the view.
+    """
+
+    def __init__(self, world_size, view_size=(SCREEN_WIDTH, SCREEN_HEIGHT), margin: float = VIEW_MARGIN):
+        self.world_size = np.array(world_size, dtype=float)
+        self.view_size = np.array(view_size, dtype=float)
+        self.margin = margin
+        self.centre = self.world_size / 2
+
+    def follow(self, position):
+        """Centre the view on a world position"""
+        self.centre = np.array((position[0], position[1]), dtype=float)
+
+    def to_screen(self, positions):
+        """Map (n, 2) world positions to screen positions"""
+        half_world = self.world_size / 2
+        offsets = (np.asarray(positions) - self.centre + half_world) % self.world_size - half_world
+        return offsets + self.view_size / 2
+
+    def point_to_screen(self, position) -> pygame.Vector2:
+        x, y = self.to_screen(np.array((position[0], position[1])))
+        return pygame.Vector2(x, y)
+
+    def visible(self, screen_positions, radii):
+        """Mask of circles at screen_positions that reach into the view.
+
+        margin is added to each radius, to cover sprites drawn past it.
+        """
+        reach = np.asarray(radii)[..., None] + self.margin
+        return ((screen_positions > -reach) & (screen_positions < self.view_size + reach)).all(axis=-1)
@@ -1,38 +1,68 @@
 import pygame
-from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from constants import WORLD_WIDTH, WORLD_HEIGHT
+from groups import KillQueue
 
 # Base class for game objects
 class CircleShape:
+    __slots__ = ('position', 'radius', 'velocity', 'alive', 'entity_id')
     containers = []  # Will be set from main.py
+    # Every object gets a new id each time it is (re)initialised, so a
+    # pooled instance looks like a new entity to network clients
+    next_id = 1
+    kill_queue = KillQueue()  # Will be set from main.py
+    pool = None  # Will be set from main.py for pooled classes
+    world_size = (WORLD_WIDTH, WORLD_HEIGHT)  # Will be set from main.py
+
+    @classmethod
+    def spawn(cls, *args):
+        """Create an object, reusing a pooled one when the class has a pool"""
+        if cls.pool is not None:
+            return cls.pool.acquire(*args)
+        return cls(*args)
     
     def __init__(self, x: int, y: int, radius: int):
+        self.reset(x, y, radius)
+
+    def reset(self, x: int, y: int, radius: int):
+        """(Re)initialise this object; pools call this instead of __init__"""
         self.position = pygame.Vector2(x, y)
         self.radius = radius
         self.velocity = pygame.Vector2(0, 0)
+        self.alive = True
+        self.entity_id = CircleShape.next_id
+        CircleShape.next_id += 1
         
         # Add self to all containers
         for container in self.containers:
-            container.append(self)
+            container.add(self)
 
     def wrap_position(self):
-        """Wrap position around screen edges"""
+        """Wrap position around the world edges"""
+        width, height = self.world_size
         # Wrap horizontally
         if self.position.x < -self.radius:
-            self.position.x = SCREEN_WIDTH + self.radius
-        elif self.position.x > SCREEN_WIDTH + self.radius:
+            self.position.x = width + self.radius
+        elif self.position.x > width + self.radius:
             self.position.x = -self.radius
             
         # Wrap vertically
         if self.position.y < -self.radius:
-            self.position.y = SCREEN_HEIGHT + self.radius
-        elif self.position.y > SCREEN_HEIGHT + self.radius:
+            self.position.y = height + self.radius
+        elif self.position.y > height + self.radius:
             self.position.y = -self.radius
 
     def kill(self):
-        """Removes this object from all its containers"""
+        """Marks this object dead and queues it for removal at the end of the phase"""
+        if self.alive:
+            self.alive = False
+            self.kill_queue.push(self)
+
+    def remove(self):
+        """Removes this object from all its containers and returns it to its pool"""
         for container in self.containers:
-            if self in container:
-                container.remove(self)
+            container.discard(self)
+        if self.pool is not None:
+            self.pool.release(self)
 
     def collides_with(self, other: 'CircleShape') -> bool:
         """Returns True if this shape collides with another CircleShape"""
@@ -42,7 +72,8 @@ class CircleShape:
         return distance < (self.radius + other.radius)
 
     def draw(self, screen):
-        # sub-classes must override
+        # sub-classes must override, returning the Rect (or list of Rects)
+        # of the screen area they touched
         pass
 
     def update(self, dt):
@@ -0,0 +1,257 @@
+"""LAN client: sends controls to a server.py server and draws what comes back.
+
+Snapshots arrive every few simulation steps. The client draws
+NET_INTERPOLATION_DELAY behind its estimate of the server's current step,
+blending positions between the two snapshots either side of that time.
+
+    python client.py --host 192.168.1.20
+    python client.py --bot aim --seconds 30    # headless, controlled by a policy
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import deque, namedtuple
+import numpy as np
+import pygame
+from constants import (SCREEN_WIDTH, SCREEN_HEIGHT, SHOT_RADIUS, PLAYER_RADIUS, RENDER_FPS, FIXED_DT,
+                       NET_PORT, NET_INTERPOLATION_DELAY, NET_POSITION_MARGIN)
+from asteroid import Asteroid
+from player import ship_triangle
+from hud import TextCache, Hud, GameOverLayer
+from inputs import KeyboardInput
+from policies import resolve_policy
+from startup import init_subsystems
+import netcode
+
+# One frame's worth of interpolated entities, ready to draw.
+#   asteroids: (n, 4) x, y, radius, shape variant
+#   shots:     (m, 2) x, y
+#   players:   (k, 5) x, y, rotation in degrees, lives, flags
+View = namedtuple('View', 'asteroids shots players score game_over')
+
+
+def _blend(previous, current, alpha):
+    """Interpolate the positions of current's records from previous by id"""
+    positions = netcode.dequantize_positions(np.stack((current['x'], current['y']), axis=1))
+    if len(previous) == 0 or len(current) == 0:
+        return positions, None
+    index = np.minimum(np.searchsorted(previous['id'], current['id']), len(previous) - 1)
+    matched = previous['id'][index] == current['id']
+    start = netcode.dequantize_positions(np.stack((previous['x'][index], previous['y'][index]), axis=1))
+    # Entities that wrapped or respawned in between are drawn where they landed
+    moving = matched & (np.abs(positions - start).max(axis=1) <= NET_POSITION_MARGIN)
+    positions[moving] = start[moving] + (positions[moving] - start[moving]) * alpha
+    return positions, index
+
+
+class GameClient:
+    """Connection to a GameServer and the snapshots received from it"""
+
+    def __init__(self):
+        self.state = netcode.empty_state()
+        # (local arrival time, NetState), newest last
+        self.history = deque(maxlen=32)
+        self.player_index = None
+        self.simulation_rate = None
+        self.last_actions = None
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.connected_at = None
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, host: str, port: int = NET_PORT):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        message_type, body = await netcode.read_message(self.reader)
+        if message_type != netcode.MSG_WELCOME:
+            raise ConnectionError(f"expected a welcome message, got type {message_type}")
+        self.player_index, self.simulation_rate, _ = netcode.decode_welcome(body)
+        self.connected_at = time.perf_counter()
+
+    async def receive(self):
+        """Apply snapshots as they arrive until the server hangs up"""
+        try:
+            while True:
+                message_type, body = await netcode.read_message(self.reader)
+                self.bytes_received += netcode.FRAME.size + len(body)
+                if message_type == netcode.MSG_SNAPSHOT:
+                    self.state = netcode.decode_snapshot(body, self.state)
+                    self.history.append((time.perf_counter(), self.state))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def send_actions(self, actions):
+        """Send our controls, only when they change"""
+        if actions != self.last_actions:
+            message = netcode.encode_input(actions)
+            self.writer.write(message)
+            self.bytes_sent += len(message)
+            self.last_actions = actions
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def bandwidth(self) -> float:
+        """Average bytes per second received since connecting"""
+        elapsed = time.perf_counter() - self.connected_at if self.connected_at else 0
+        return self.bytes_received / elapsed if elapsed > 0 else 0.0
+
+    def interpolate(self, now: float) -> View:
+        """Blend the buffered snapshots for drawing at local time now"""
+        if not self.history:
+            return None
+        arrived, newest = self.history[-1]
+        # Where the server is now, then back off by the interpolation delay
+        target = newest.tick + (now - arrived - NET_INTERPOLATION_DELAY) * self.simulation_rate
+        previous = current = newest
+        for _, state in reversed(self.history):
+            if state.tick <= target:
+                previous = state
+                break
+            current = previous = state
+        alpha = 0.0 if current.tick == previous.tick else \
+            min(1.0, (target - previous.tick) / (current.tick - previous.tick))
+
+        asteroids = current.asteroids
+        positions, _ = _blend(previous.asteroids, asteroids, alpha)
+        asteroid_view = np.column_stack((positions, asteroids['radius'], asteroids['shape']))
+        shot_view, _ = _blend(previous.shots, current.shots, alpha)
+
+        players = current.players
+        positions, index = _blend(previous.players, players, alpha)
+        rotations = players['rotation'].astype(float)
+        if index is not None:
+            # Turn the short way round
+            start = previous.players['rotation'][index].astype(float)
+            rotations = start + ((rotations - start + 32768) % 65536 - 32768) * alpha
+        player_view = np.column_stack((positions, rotations / netcode.ROTATION_SCALE,
+                                       players['lives'], players['flags']))
+        return View(asteroid_view, shot_view, player_view, current.score, current.game_over)
+
+    def observe(self):
+        """The latest state in the layout of HeadlessGame.observe(), for policies.
+
+        Velocities are not sent over the network, so they are zero.
+        """
+        state = self.state
+        players = state.players
+        me = players[self.player_index] if self.player_index < len(players) else None
+        asteroids = np.zeros((len(state.asteroids), 5))
+        asteroids[:, :2] = netcode.dequantize_positions(np.stack((state.asteroids['x'], state.asteroids['y']), axis=1))
+        asteroids[:, 4] = state.asteroids['radius']
+        shots = np.zeros((len(state.shots), 4))
+        shots[:, :2] = netcode.dequantize_positions(np.stack((state.shots['x'], state.shots['y']), axis=1))
+        player = np.zeros(6)
+        if me is not None:
+            player[:2] = netcode.dequantize_positions(np.array((me['x'], me['y'])))
+            player[4] = me['rotation'] / netcode.ROTATION_SCALE
+            player[5] = bool(me['flags'] & netcode.FLAG_VULNERABLE)
+        return {
+            'player': player,
+            'lives': int(me['lives']) if me is not None else 0,
+            'asteroids': asteroids,
+            'shots': shots,
+            'score': state.score,
+            'game_over': state.game_over,
+        }
+
+
+def draw_view(screen, view: View, player_index: int):
+    """Draw an interpolated View; our own ship is drawn thicker"""
+    sprite = Asteroid.shapes.sprite
+    blits = []
+    for x, y, radius, shape in view.asteroids.tolist():
+        surface, half = sprite(radius, int(shape))
+        blits.append((surface, (x - half, y - half)))
+    screen.blits(blits, doreturn=False)
+    for centre in view.shots.tolist():
+        pygame.draw.circle(screen, "white", centre, SHOT_RADIUS)
+    for i, (x, y, rotation, lives, flags) in enumerate(view.players.tolist()):
+        if lives >= 0 and int(flags) & netcode.FLAG_VISIBLE:
+            pygame.draw.polygon(screen, "white", ship_triangle(pygame.Vector2(x, y), rotation, PLAYER_RADIUS),
+                                3 if i == player_index else 1)
+
+
+async def play(host: str, port: int = NET_PORT):
+    """Join a server in a window and play until it is closed"""
+    client = GameClient()
+    await client.connect(host, port)
+    receiver = asyncio.create_task(client.receive())
+
+    init_subsystems()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption(f"Bootsteroids - player {client.player_index + 1}")
+    text_cache = TextCache(36)
+    metrics_cache = TextCache(22)
+    hud = Hud(text_cache)
+    game_over_layer = GameOverLayer(text_cache)
+    keyboard = KeyboardInput()
+    loop = asyncio.get_running_loop()
+
+    running = True
+    while running and not receiver.done():
+        frame_start = loop.time()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                running = False
+        client.send_actions(keyboard.read())
+
+        screen.fill("black")
+        view = client.interpolate(time.perf_counter())
+        if view is not None:
+            draw_view(screen, view, client.player_index)
+            if view.game_over:
+                game_over_layer.draw(screen, view.score)
+            elif client.player_index < len(view.players):
+                hud.draw(screen, view.score, int(view.players[client.player_index][3]))
+        metrics = metrics_cache.render(f"{client.bandwidth() / 1024:.1f} kB/s")
+        screen.blit(metrics, (SCREEN_WIDTH - metrics.get_width() - 10, 10))
+        pygame.display.flip()
+        await asyncio.sleep(max(0.0, 1 / RENDER_FPS - (loop.time() - frame_start)))
+
+    receiver.cancel()
+    await client.close()
+    pygame.quit()
+
+
+async def run_bot(host: str, port: int, policy, seconds: float, seed: int = 0) -> GameClient:
+    """Join a server headless and let a policy play for a while"""
+    client = GameClient()
+    await client.connect(host, port)
+    receiver = asyncio.create_task(client.receive())
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    end = loop.time() + seconds
+    while loop.time() < end and not receiver.done():
+        client.send_actions(policy(client.observe(), rng))
+        await asyncio.sleep(FIXED_DT)
+    receiver.cancel()
+    await client.close()
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Join a Bootsteroids server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=NET_PORT)
+    parser.add_argument("--bot", metavar="POLICY", help="play headless with this policy instead of the keyboard")
+    parser.add_argument("--seconds", type=float, default=30.0, help="how long a bot plays")
+    args = parser.parse_args(argv)
+    if args.bot:
+        client = asyncio.run(run_bot(args.host, args.port, resolve_policy(args.bot), args.seconds))
+        print(f"player {client.player_index + 1}: score {client.state.score}, "
+              f"{client.bandwidth() / 1024:.1f} kB/s received")
+    else:
+        asyncio.run(play(args.host, args.port))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
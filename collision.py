@@ -0,0 +1,295 @@
+import math
+import numpy as np
+import pygame
+from constants import WORLD_WIDTH, WORLD_HEIGHT, ASTEROID_MAX_RADIUS
+from entitystore import wrapped_paths, path_positions
+
+# Cell size for the spatial hash. Any two overlapping circles are at most
+# ASTEROID_MAX_RADIUS + PLAYER_RADIUS apart, so a cell this big means every
+# candidate pair lives in the same or a neighbouring cell.
+CELL_SIZE = ASTEROID_MAX_RADIUS * 2
+
+# Collision modes understood by find_shot_hits / find_player_hit
+MODE_GRID = "grid"
+MODE_PAIRWISE = "pairwise"  # Reference path, checks every pair
+MODE_VECTORIZED = "vectorized"  # Whole-store NumPy overlap, for StoredShape lists
+MODE_SWEPT = "swept"  # Continuous: time of impact along each step's paths, for big steps
+DEFAULT_MODE = MODE_VECTORIZED
+
+# Ship poses tried between the bounding circles touching and parting when
+# confirming a swept player hit with the triangle test
+PLAYER_SWEEP_SAMPLES = 8
+
+
+def within_reach(a, b, reach: float) -> bool:
+    """Cheap test whether two positions are closer than reach (no sqrt)"""
+    dx = a.x - b.x
+    dy = a.y - b.y
+    return dx * dx + dy * dy < reach * reach
+
+
+class SpatialHash:
+    """Uniform grid over the playfield, rebuilt once per frame"""
+
+    def __init__(self, cell_size: float = CELL_SIZE,
+                 width: int = WORLD_WIDTH, height: int = WORLD_HEIGHT):
+        self.cell_size = cell_size
+        # Positions can sit up to one radius outside the world before
+        # wrap_position teleports them, so cell indices are taken modulo the
+        # grid size. Neighbouring cells stay neighbours under the modulo, so
+        # the 3x3 query below never misses a pair.
+        self.cols = max(1, math.ceil(width / cell_size))
+        self.rows = max(1, math.ceil(height / cell_size))
+        self.cells = {}
+
+    def cell_of(self, position):
+        return (int(position.x // self.cell_size) % self.cols,
+                int(position.y // self.cell_size) % self.rows)
+
+    def clear(self):
+        self.cells.clear()
+
+    def rebuild(self, objects):
+        """Clear the grid and insert every object, remembering list order"""
+        self.cells.clear()
+        for index, obj in enumerate(objects):
+            self.insert(obj, index)
+
+    def insert(self, obj, index: int = 0):
+        self.cells.setdefault(self.cell_of(obj.position), []).append((index, obj))
+
+    def query(self, position):
+        """Return (index, obj) entries in the 3x3 block of cells around position"""
+        cx, cy = self.cell_of(position)
+        found = []
+        # A small grid can wrap onto the same cell twice, so dedupe the keys
+        for key in {((cx + dx) % self.cols, (cy + dy) % self.rows)
+                    for dx in (-1, 0, 1) for dy in (-1, 0, 1)}:
+            bucket = self.cells.get(key)
+            if bucket:
+                found.extend(bucket)
+        return found
+
+
+def find_shot_hits(asteroids, shots, mode=DEFAULT_MODE, grid=None):
+    """Return a list of (shot, asteroid) hits for this frame.
+
+    Asteroids are visited in list order and each takes the first shot (in
+    shot list order) that touches it; a shot can only destroy one asteroid.
+    Both modes return exactly the same pairs.
+    """
+    hits = []
+    used = set()
+    if mode == MODE_PAIRWISE:
+        for asteroid in asteroids:
+            for shot in shots:
+                if id(shot) not in used and shot.collides_with(asteroid):
+                    used.add(id(shot))
+                    hits.append((shot, asteroid))
+                    break
+        return hits
+
+    if mode == MODE_VECTORIZED:
+        if not asteroids or not shots:
+            return hits
+        # Gather slots in list order so the greedy pass below visits pairs
+        # in the same order as the pairwise scan
+        asteroid_slots = np.fromiter((a.slot for a in asteroids), dtype=np.intp, count=len(asteroids))
+        shot_slots = np.fromiter((s.slot for s in shots), dtype=np.intp, count=len(shots))
+        overlaps = asteroids[0].store.overlap_matrix(asteroid_slots, shots[0].store, shot_slots)
+        for row in np.flatnonzero(overlaps.any(axis=1)):
+            for col in np.flatnonzero(overlaps[row]):
+                if col not in used:
+                    used.add(col)
+                    hits.append((shots[col], asteroids[row]))
+                    break
+        return hits
+
+    if grid is None:
+        grid = SpatialHash()
+    grid.rebuild(shots)
+    for asteroid in asteroids:
+        # Sort by original index so the result matches the pairwise scan
+        for _, shot in sorted(grid.query(asteroid.position), key=lambda entry: entry[0]):
+            if id(shot) not in used and shot.collides_with(asteroid):
+                used.add(id(shot))
+                hits.append((shot, asteroid))
+                break
+    return hits
+
+
+def contact_windows(paths, other_paths, reach):
+    """When circles moving along paths touch circles moving along other_paths.
+
+    Paths come from wrapped_paths(). reach is an (n, m) array of distances
+    at which the pairs touch. Returns (enter, leave) (n, m) arrays of step
+    fractions for the first time each pair is within reach; enter is inf
+    for pairs that never touch during the step.
+    """
+    origins, motions, lo, hi = paths
+    other_origins, other_motions, other_lo, other_hi = other_paths
+    n, m = len(motions), len(other_motions)
+    enter = np.full((n, m), np.inf)
+    leave = np.full((n, m), np.inf)
+    if n == 0 or m == 0:
+        return enter, leave
+    # Relative motion is the same on every segment; only the origins shift
+    d = motions[:, None, :] - other_motions[None, :, :]
+    a = np.einsum('ijk,ijk->ij', d, d)
+    reach_sq = reach * reach
+    # Later segments only exist for circles that wrapped before the step ended
+    rows = [np.arange(n)] + [np.flatnonzero(lo[:, k] < 1) for k in range(1, origins.shape[1])]
+    cols = [np.arange(m)] + [np.flatnonzero(other_lo[:, k] < 1) for k in range(1, other_origins.shape[1])]
+    for i, row in enumerate(rows):
+        if len(row) == 0:
+            continue
+        for j, col in enumerate(cols):
+            if len(col) == 0:
+                continue
+            block = (row[:, None], col[None, :])
+            start = np.maximum(lo[row, i][:, None], other_lo[col, j][None, :])
+            end = np.minimum(hi[row, i][:, None], other_hi[col, j][None, :])
+            p = origins[row, i][:, None, :] - other_origins[col, j][None, :, :]
+            pair_d = d[block]
+            pair_a = a[block]
+            b = 2 * np.einsum('ijk,ijk->ij', p, pair_d)
+            c = np.einsum('ijk,ijk->ij', p, p) - reach_sq[block]
+            # |p + d t|^2 <= reach^2 between the roots of a t^2 + b t + c
+            disc = b * b - 4 * pair_a * c
+            moving = pair_a > 0
+            root = np.sqrt(np.maximum(disc, 0))
+            denominator = np.where(moving, 2 * pair_a, 1)
+            first = np.where(moving, (-b - root) / denominator, -np.inf)
+            last = np.where(moving, (-b + root) / denominator, np.inf)
+            # Not moving relative to each other: touching all along or never
+            touching = np.where(moving, disc >= 0, c <= 0)
+            window_enter = np.maximum(first, start)
+            window_leave = np.minimum(last, end)
+            better = touching & (window_enter <= window_leave) & (window_enter < enter[block])
+            if better.any():
+                enter[block] = np.where(better, window_enter, enter[block])
+                leave[block] = np.where(better, window_leave, leave[block])
+    return enter, leave
+
+
+def _store_paths(shapes):
+    slots = np.fromiter((s.slot for s in shapes), dtype=np.intp, count=len(shapes))
+    store = shapes[0].store
+    return slots, store, store.paths(slots)
+
+
+def find_swept_shot_hits(asteroids, shots):
+    """Return (time, shot, asteroid) for every pair whose paths touched during
+    the last step, earliest first.
+
+    Times are fractions of the step. Unlike find_shot_hits this lists every
+    touching pair; the caller resolves them in order and skips pairs whose
+    shot or asteroid was already used up. Equal times keep the order the
+    other modes visit pairs in.
+    """
+    if not asteroids or not shots:
+        return []
+    asteroid_slots, asteroid_store, asteroid_paths = _store_paths(asteroids)
+    shot_slots, shot_store, shot_paths = _store_paths(shots)
+    reach = asteroid_store.radii[asteroid_slots][:, None] + shot_store.radii[shot_slots][None, :]
+    enter, _ = contact_windows(asteroid_paths, shot_paths, reach)
+    rows, cols = np.nonzero(np.isfinite(enter))
+    order = np.lexsort((cols, rows, enter[rows, cols]))
+    return [(float(enter[rows[k], cols[k]]), shots[cols[k]], asteroids[rows[k]]) for k in order]
+
+
+def player_path(player):
+    """The ship's last step as a wrapped_paths() path.
+
+    The ship's velocity changes during a step, so this is the straight line
+    between where it started and ended, unwrapped across the screen edges.
+    """
+    previous = np.array([(player.previous_position.x, player.previous_position.y)])
+    current = np.array([(player.position.x, player.position.y)])
+    radius = player.radius
+    motions = current - previous
+    # More than half the world in one step means it wrapped
+    sizes = np.array(player.world_size)
+    jumped = np.abs(motions) > sizes / 2
+    motions = np.where(jumped, motions - np.sign(motions) * (sizes + 2 * radius), motions)
+    return wrapped_paths(previous, motions, current, np.array([radius]), np.zeros(1), *player.world_size)
+
+
+def find_swept_player_hits(player, asteroids):
+    """Return (time, asteroid) for every asteroid the ship touched during the
+    last step, earliest first, with the time each one first touched it.
+
+    Times of impact are found for the ship's bounding circle and then
+    confirmed with the triangle test at poses spread over the time the
+    bounding circles overlap.
+    """
+    if not asteroids:
+        return []
+    slots, store, asteroid_paths = _store_paths(asteroids)
+    paths = player_path(player)
+    radii = store.radii[slots]
+    enter, leave = contact_windows(paths, asteroid_paths, player.radius * 1.21 + radii[None, :])
+    enter, leave = enter[0], leave[0]
+    turn = player.rotation - player.previous_rotation
+    hits = []
+    for index in np.flatnonzero(np.isfinite(enter)).tolist():
+        times = np.linspace(enter[index], leave[index], PLAYER_SWEEP_SAMPLES)
+        ship = path_positions(tuple(np.repeat(part, len(times), axis=0) for part in paths), times)
+        rock = path_positions(tuple(np.repeat(part[[index]], len(times), axis=0) for part in asteroid_paths),
+                              times)
+        for t, (x, y), centre in zip(times.tolist(), ship.tolist(), rock):
+            if player.collides_with_many(centre[None, :], radii[[index]],
+                                         pygame.Vector2(x, y), player.previous_rotation + turn * t)[0]:
+                hits.append((t, index))
+                break
+    # Equal times keep list order, as in the other modes
+    return [(t, asteroids[index]) for t, index in sorted(hits)]
+
+
+def find_swept_player_hit(player, asteroids):
+    """Return (time, asteroid) for the first asteroid the ship touched during
+    the last step, or None"""
+    hits = find_swept_player_hits(player, asteroids)
+    return hits[0] if hits else None
+
+
+def find_player_hits(player, asteroids):
+    """Return every asteroid touching the player, in list order.
+
+    The ship triangle is built once and tested against all asteroid
+    centres and radii together.
+    """
+    if not asteroids:
+        return []
+    store = asteroids[0].store
+    slots = np.fromiter((a.slot for a in asteroids), dtype=np.intp, count=len(asteroids))
+    hits = player.collides_with_many(store.positions[slots], store.radii[slots])
+    return [asteroids[i] for i in np.flatnonzero(hits)]
+
+
+def find_player_hit(player, asteroids, mode=DEFAULT_MODE, grid=None):
+    """Return the first asteroid (in list order) touching the player, or None.
+
+    In swept mode it is the first asteroid the ship touched during the step.
+    """
+    if mode == MODE_SWEPT:
+        hit = find_swept_player_hit(player, asteroids)
+        return hit[1] if hit else None
+
+    if mode == MODE_VECTORIZED:
+        hits = find_player_hits(player, asteroids)
+        return hits[0] if hits else None
+
+    if mode == MODE_PAIRWISE:
+        for asteroid in asteroids:
+            if player.collides_with(asteroid):
+                return asteroid
+        return None
+
+    if grid is None:
+        grid = SpatialHash()
+    grid.rebuild(asteroids)
+    for _, asteroid in sorted(grid.query(player.position), key=lambda entry: entry[0]):
+        if player.collides_with(asteroid):
+            return asteroid
+    return None
@@ -1,10 +1,30 @@
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 
+# Playfield. It can be larger than the window, with a camera following the
+# player (main.py --large-world); everything wraps at the world edges.
+WORLD_WIDTH = SCREEN_WIDTH
+WORLD_HEIGHT = SCREEN_HEIGHT
+LARGE_WORLD_SCREENS = 8  # screens across and down in large-world mode
+
+# Simulation timing
+SIMULATION_RATE = 60                # fixed simulation steps per second
+FIXED_DT = 1 / SIMULATION_RATE      # seconds per simulation step
+MAX_STEPS_PER_FRAME = 5             # catch-up cap, avoids the spiral of death
+RENDER_FPS = 60                     # display frame cap, 0 for uncapped
+THREADED_SIMULATION = False         # step the simulation on its own thread (main.py --threaded)
+
+# Rendering
+DIRTY_RECTS = False               # push only changed screen areas instead of flipping
+DIRTY_RECT_FULL_THRESHOLD = 0.5   # fraction of the screen above which a full flip is used
+
 ASTEROID_MIN_RADIUS = 20
 ASTEROID_KINDS = 3
 ASTEROID_SPAWN_RATE = 0.8  # seconds
 ASTEROID_MAX_RADIUS = ASTEROID_MIN_RADIUS * ASTEROID_KINDS
+# Pixels beyond a circle's radius that the camera still draws it for.
+# Asteroid sprites reach ceil(1.2 radii) + 2 from their centre (shapes.py).
+VIEW_MARGIN = -(-ASTEROID_MAX_RADIUS // 5) + 2
 PLAYER_RADIUS = 20
 PLAYER_TURN_SPEED = 300
 PLAYER_SPEED = 200  # pixels per second
@@ -12,10 +32,14 @@ PLAYER_SPEED = 200  # pixels per second
 # Asteroid constants
 ASTEROID_SPAWN_DELAY = 1.0  # Seconds between asteroid spawns
 ASTEROID_MAX_SPEED = 100
+ASTEROID_SHAPE_VARIANTS = 8  # pre-built outlines per asteroid size class
 
 # Shot constants
 SHOT_RADIUS = 5
 PLAYER_SHOOT_SPEED = 500
+SHOT_LIFETIME = 1.5  # seconds before a shot fizzles out
+SHOT_RANGE = 900     # pixels a shot can travel before it fizzles out
+MAX_SHOTS = 64       # shot storage capacity, oldest shot is recycled when full
 
 # Player constants
 PLAYER_SHOOT_COOLDOWN = 0.3  # seconds between shots
@@ -31,7 +55,49 @@ RESPAWN_TIME = 3.0  # Seconds of invulnerability after respawning
 EXPLOSION_DURATION = 0.5  # seconds
 EXPLOSION_PARTICLES = 12  # number of particles per explosion
 EXPLOSION_SPEED = 150    # pixels per second
+EXPLOSION_DAMPING = 0.95  # particle velocity multiplier per update
+
+# HUD constants
+TEXT_CACHE_SIZE = 64  # rendered text surfaces kept before LRU eviction
+
+# Replay constants
+# Simulation steps between recorded state hashes. Every step pins a
+# divergence to the step it starts in, but at 4 bytes a hash that is
+# 240 bytes per second, most of a recording; held controls run-length
+# encode to a few bytes a second.
+REPLAY_HASH_INTERVAL = 1
+SAVESTATE_RING_SIZE = 16   # world snapshots kept for rollback, one per step
+
+# Profiler constants
+PROFILER_HISTORY = 600  # frames kept in the profiler ring buffer
+
+# Adaptive quality governor
+ADAPTIVE_QUALITY = True     # trade visual detail for frame rate on slow machines
+QUALITY_BUDGET_MS = 1000 / 60  # frame work budget in milliseconds
+QUALITY_WINDOW = 30         # frames averaged before each decision
+QUALITY_COOLDOWN = 60       # minimum frames between quality changes
+QUALITY_DEGRADE_AT = 0.9    # drop quality above this fraction of the budget
+QUALITY_RESTORE_AT = 0.6    # raise quality below this fraction of the budget
+
+# Particle rendering
+PARTICLE_ALPHA_LEVELS = 16  # pre-baked alpha steps per particle sprite
+PARTICLE_SIZE_STEP = 0.5    # particle radius rounding for sprite reuse
+THRUST_PARTICLE_FADE = 0.3  # seconds of life that map to full alpha
 
 # Player physics
 PLAYER_ACCELERATION = 400  # pixels per second squared
-PLAYER_FRICTION = 0.98    # velocity multiplier per frame (< 1 for drag)
\ No newline at end of file
+PLAYER_FRICTION = 0.98    # velocity multiplier per 1/SIMULATION_RATE seconds, whatever the step (< 1 for drag)
+
+# Batched training environment (batched.py)
+BATCH_MAX_ASTEROIDS = 128  # asteroid slots per world; spawns and pieces beyond this are dropped
+
+# Networking
+NET_PORT = 7777                # default server port
+NET_MAX_PLAYERS = 2            # ships in a networked game
+NET_SNAPSHOT_INTERVAL = 3      # simulation steps between snapshots sent to clients
+NET_POSITION_SCALE = 8         # quantization steps per pixel
+NET_POSITION_MARGIN = 128      # pixels beyond the screen edge that can still be encoded
+NET_INTERPOLATION_DELAY = 0.1  # seconds clients draw behind the newest snapshot
+NET_RESTART_DELAY = 3.0        # seconds after game over before the server starts a new game
+NET_SEND_BUFFER_LIMIT = 65536  # bytes queued for a client above which snapshots to it are skipped
+NET_STALL_TIMEOUT = 5.0        # seconds a client may stay over that limit before it is dropped
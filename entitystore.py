@@ -0,0 +1,342 @@
+import numpy as np
+import pygame
+from circleshape import CircleShape
+from constants import WORLD_WIDTH, WORLD_HEIGHT
+
+
+def wrapped_paths(previous, motions, current, radii, starts,
+                  width: int = WORLD_WIDTH, height: int = WORLD_HEIGHT):
+    """Describe straight-line moves over one step as up to three segments.
+
+    previous and current are where each circle started and ended the step,
+    motions how far it moved without wrapping and starts the fraction of
+    the step at which it started moving. Returns (origins, motions, lo, hi):
+    during fractions lo[i, k]..hi[i, k] of the step circle i was at
+    origins[i, k] + motions[i] * t. A circle that wrapped round an edge gets
+    a new segment, shifted by the wrap, from the moment it crossed; crossing
+    both edges makes three. Unused segments are empty (lo > hi) or repeat
+    the end point.
+    """
+    offsets = current - (previous + motions)
+    wrapped = np.abs(offsets) > 1e-6
+    # wrap() teleports a circle once it is a whole radius past an edge
+    boundary = np.where(motions < 0, -radii[:, None], np.array((width, height)) + radii[:, None])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing = np.where(wrapped & (motions != 0), (boundary - previous) / motions, 1.0)
+    crossing = np.clip(crossing, starts[:, None], 1.0)
+    x_first = crossing[:, 0] <= crossing[:, 1]
+    first_offsets = np.where(x_first[:, None], offsets * (1, 0), offsets * (0, 1))
+    t_first = crossing.min(axis=1)
+    t_second = crossing.max(axis=1)
+    origins = np.stack((previous, previous + first_offsets, previous + offsets), axis=1)
+    lo = np.stack((starts, np.maximum(t_first, starts), np.maximum(t_second, starts)), axis=1)
+    hi = np.stack((t_first, t_second, np.ones_like(t_first)), axis=1)
+    return origins, motions, lo, hi
+
+
+def path_positions(paths, times):
+    """Where each circle in paths (from wrapped_paths) was at the given fractions of the step"""
+    origins, motions, lo, _ = paths
+    segment = (times >= lo[:, 1]).astype(np.intp) + (times >= lo[:, 2])
+    return origins[np.arange(len(times)), segment] + motions * times[:, None]
+
+
+class EntityStore:
+    """Struct-of-arrays storage for many circles of the same kind.
+
+    Positions, velocities, radii and alive flags live in contiguous NumPy
+    arrays so the per-frame integrate and wrap steps run as a handful of
+    vectorized operations instead of one Python call per entity.
+    """
+
+    def __init__(self, capacity: int = 64, wrap: bool = True):
+        self.wrap_edges = wrap
+        # Playfield the store wraps or culls at; reset_game sets it for
+        # worlds bigger than the screen
+        self.world_size = (WORLD_WIDTH, WORLD_HEIGHT)
+        self.positions = np.zeros((capacity, 2))
+        # Positions at the start of the last update, and the blend of the
+        # two that gets drawn this frame
+        self.previous_positions = np.zeros((capacity, 2))
+        self.render_positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.radii = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.owners = [None] * capacity
+        self.free_slots = []
+        # Slots at or past this index have never been handed out
+        self.count = 0
+        # For swept collisions: the last update's dt and the fraction of it
+        # at which each entity started moving. That is t after launch(), and
+        # 1 for entities added since the update, which have not moved yet.
+        self.last_dt = 0.0
+        self.step_starts = np.zeros(capacity)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.radii)
+
+    def __len__(self):
+        return self.count - len(self.free_slots)
+
+    def add(self, owner) -> int:
+        """Reserve a slot for owner and return its index"""
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.count == self.capacity:
+                self._grow()
+            slot = self.count
+            self.count += 1
+        self.alive[slot] = True
+        self.owners[slot] = owner
+        # update() resets this, so it only sticks for entities added after it
+        self.step_starts[slot] = 1
+        return slot
+
+    def deactivate(self, slot: int):
+        """Mark a slot dead without releasing it, so vectorized steps skip it"""
+        self.alive[slot] = False
+        self.velocities[slot] = 0
+
+    def remove(self, slot: int, owner=None):
+        """Release a slot so it can be reused.
+
+        If owner is given the slot is only released while it still belongs
+        to that owner.
+        """
+        if self.owners[slot] is None or (owner is not None and self.owners[slot] is not owner):
+            return
+        self.deactivate(slot)
+        self.owners[slot] = None
+        self.free_slots.append(slot)
+
+    def _grow(self):
+        # Double the arrays; existing slot indices stay valid
+        extra = self.capacity
+        self.positions = np.concatenate((self.positions, np.zeros((extra, 2))))
+        self.previous_positions = np.concatenate((self.previous_positions, np.zeros((extra, 2))))
+        self.render_positions = np.concatenate((self.render_positions, np.zeros((extra, 2))))
+        self.velocities = np.concatenate((self.velocities, np.zeros((extra, 2))))
+        self.radii = np.concatenate((self.radii, np.zeros(extra)))
+        self.alive = np.concatenate((self.alive, np.zeros(extra, dtype=bool)))
+        self.step_starts = np.concatenate((self.step_starts, np.zeros(extra)))
+        self.owners.extend([None] * extra)
+
+    def update(self, dt):
+        """Advance every entity in the store by dt seconds"""
+        n = self.count
+        self.last_dt = dt
+        self.step_starts[:n] = 0
+        self.previous_positions[:n] = self.positions[:n]
+        self.integrate(dt)
+        if self.wrap_edges:
+            self.wrap()
+
+    def integrate(self, dt):
+        # Dead slots have zero velocity, so there is no need to mask them
+        n = self.count
+        self.positions[:n] += self.velocities[:n] * dt
+
+    def wrap(self):
+        """Vectorized CircleShape.wrap_position over the whole store"""
+        n = self.count
+        radii = self.radii[:n]
+        for axis, size in enumerate(self.world_size):
+            coords = self.positions[:n, axis]
+            below = coords < -radii
+            above = coords > size + radii
+            coords[below] = size + radii[below]
+            coords[above] = -radii[above]
+
+    def interpolate(self, alpha: float):
+        """Fill render_positions with a blend of the last two updates"""
+        n = self.count
+        previous = self.previous_positions[:n]
+        current = self.positions[:n]
+        blended = previous + (current - previous) * alpha
+        # Entities that wrapped this step are drawn where they landed
+        jumped = np.abs(current - previous).max(axis=1) > self.radii[:n] * 2
+        blended[jumped] = current[jumped]
+        self.render_positions[:n] = blended
+
+    def paths(self, slots):
+        """Segments each entity in slots moved along during the last update (see wrapped_paths)"""
+        starts = self.step_starts[slots]
+        motions = self.velocities[slots] * self.last_dt
+        # Entities added after the update sit where they were placed
+        motions[starts >= 1] = 0
+        if not self.wrap_edges:
+            # Nothing wraps: one segment for the whole step, and the unused
+            # ones start at the end of it
+            previous = self.previous_positions[slots]
+            origins = np.repeat(previous[:, None, :], 3, axis=1)
+            lo = np.ones((len(previous), 3))
+            lo[:, 0] = starts
+            return origins, motions, lo, np.ones((len(previous), 3))
+        return wrapped_paths(self.previous_positions[slots], motions, self.positions[slots],
+                             self.radii[slots], starts, *self.world_size)
+
+    def position_at(self, slot: int, t: float):
+        """Where an entity was a fraction t of the way through the last update"""
+        return path_positions(self.paths([slot]), np.array([t]))[0]
+
+    def launch(self, slot: int, t: float):
+        """Move an entity created a fraction t of the way through the last
+        update on by the rest of that update, so swept collisions see it
+        travel from the moment it appeared"""
+        motion = self.velocities[slot] * self.last_dt
+        position = self.positions[slot].copy()
+        # previous_positions holds where it would have been at the start of
+        # the step, so its path is previous + motion * t like everything else
+        self.previous_positions[slot] = position - motion * t
+        self.positions[slot] = position + motion * (1 - t)
+        self.step_starts[slot] = t
+        if self.wrap_edges:
+            self.wrap()
+
+    def overlap_matrix(self, slots, other: 'EntityStore', other_slots):
+        """Return a bool matrix, True where slots[i] overlaps other_slots[j]"""
+        delta = self.positions[slots][:, None, :] - other.positions[other_slots][None, :, :]
+        dist_sq = np.einsum('ijk,ijk->ij', delta, delta)
+        reach = self.radii[slots][:, None] + other.radii[other_slots][None, :]
+        return dist_sq < reach * reach
+
+
+class RingStore(EntityStore):
+    """Fixed-capacity store that hands out slots in ring order.
+
+    When every slot is taken the oldest entity is killed to make room, so
+    memory and per-frame cost stay bounded however long the game runs.
+    Entities also expire after a lifetime or range, and non-wrapping stores
+    cull anything that has left the screen.
+    """
+
+    def __init__(self, capacity: int, lifetime: float = None, max_range: float = None,
+                 wrap: bool = False):
+        super().__init__(capacity, wrap)
+        self.lifetime = lifetime
+        self.max_range = max_range
+        self.ages = np.zeros(capacity)
+        self.travelled = np.zeros(capacity)
+        self.head = 0
+        # Swept collisions turn this off and cull after sweeping, so entities
+        # that expire during a step still have that step checked
+        self.cull_on_update = True
+
+    def add(self, owner) -> int:
+        slot = self.head
+        self.head = (self.head + 1) % self.capacity
+        if self.alive[slot]:
+            # Evict the oldest entity to make room
+            self.owners[slot].kill()
+        # A killed entity may still be waiting for the kill queue; it no
+        # longer owns the slot, so its later remove() leaves it alone
+        self.count = max(self.count, slot + 1)
+        self.alive[slot] = True
+        self.owners[slot] = owner
+        # update() resets this, so it only sticks for entities added after it
+        self.step_starts[slot] = 1
+        self.ages[slot] = 0
+        self.travelled[slot] = 0
+        return slot
+
+    def remove(self, slot: int, owner=None):
+        if self.owners[slot] is None or (owner is not None and self.owners[slot] is not owner):
+            return
+        self.deactivate(slot)
+        self.owners[slot] = None
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive[:self.count]))
+
+    def _grow(self):
+        raise RuntimeError("RingStore has a fixed capacity")
+
+    def update(self, dt):
+        n = self.count
+        self.ages[:n] += dt
+        self.travelled[:n] += np.hypot(self.velocities[:n, 0], self.velocities[:n, 1]) * dt
+        super().update(dt)
+        if self.cull_on_update:
+            self.cull()
+
+    def cull(self):
+        """Kill every entity that has expired or left the world"""
+        n = self.count
+        expired = np.zeros(n, dtype=bool)
+        if self.lifetime is not None:
+            expired |= self.ages[:n] > self.lifetime
+        if self.max_range is not None:
+            expired |= self.travelled[:n] > self.max_range
+        if not self.wrap_edges:
+            radii = self.radii[:n]
+            x = self.positions[:n, 0]
+            y = self.positions[:n, 1]
+            width, height = self.world_size
+            expired |= (x < -radii) | (x > width + radii)
+            expired |= (y < -radii) | (y > height + radii)
+        for slot in np.flatnonzero(expired & self.alive[:n]):
+            self.owners[slot].kill()
+
+
+class StoredShape(CircleShape):
+    """CircleShape whose position, velocity and radius are a view into an EntityStore"""
+    __slots__ = ('store', 'slot')
+    default_store = None  # Will be set from main.py
+
+    @classmethod
+    def create_store(cls):
+        """Return an empty store suitable for this kind of shape"""
+        return EntityStore()
+
+    def reset(self, x: int, y: int, radius: int):
+        cls = type(self)
+        if cls.default_store is None:
+            cls.default_store = self.create_store()
+        # Keep our own reference so a later reset_game can swap the class store
+        self.store = cls.default_store
+        self.slot = self.store.add(self)
+        super().reset(x, y, radius)
+
+    @property
+    def position(self):
+        x, y = self.store.positions[self.slot]
+        return pygame.Vector2(x, y)
+
+    @position.setter
+    def position(self, value):
+        # Setting a position places the entity; it does not move it, so
+        # there is nothing to interpolate from
+        self.store.positions[self.slot] = (value[0], value[1])
+        self.store.previous_positions[self.slot] = (value[0], value[1])
+        self.store.render_positions[self.slot] = (value[0], value[1])
+
+    @property
+    def velocity(self):
+        x, y = self.store.velocities[self.slot]
+        return pygame.Vector2(x, y)
+
+    @velocity.setter
+    def velocity(self, value):
+        self.store.velocities[self.slot] = (value[0], value[1])
+
+    @property
+    def radius(self):
+        return float(self.store.radii[self.slot])
+
+    @radius.setter
+    def radius(self, value):
+        self.store.radii[self.slot] = value
+
+    def kill(self):
+        if self.alive:
+            # Drop out of vectorized steps straight away; the slot itself is
+            # released when the kill queue is flushed
+            self.store.deactivate(self.slot)
+        super().kill()
+
+    def remove(self):
+        """Removes this object from its containers and frees its store slot"""
+        self.store.remove(self.slot, self)
+        super().remove()
@@ -1,57 +1,66 @@
 import pygame
 import random
 import math
-from constants import EXPLOSION_DURATION, EXPLOSION_PARTICLES, EXPLOSION_SPEED
+from constants import EXPLOSION_DURATION, EXPLOSION_PARTICLES, EXPLOSION_SPEED, EXPLOSION_DAMPING
+from groups import KillQueue
+from particles import ParticleSystem
+from governor import RenderQuality
 
 class Explosion:
+    __slots__ = ('position', 'timer', 'alive')
     containers = []  # Will be set from main.py
+    kill_queue = KillQueue()  # Will be set from main.py
+    particle_system = ParticleSystem()  # Will be set from main.py
+    effects_rng = random.Random()  # Will be set from main.py
+    quality = RenderQuality()  # Will be set from main.py
+    pool = None  # Will be set from main.py
+
+    @classmethod
+    def spawn(cls, *args):
+        """Create an explosion, reusing a pooled one when there is a pool"""
+        if cls.pool is not None:
+            return cls.pool.acquire(*args)
+        return cls(*args)
     
     def __init__(self, x: int, y: int, radius: float):
+        self.reset(x, y, radius)
+
+    def reset(self, x: int, y: int, radius: float):
+        """(Re)initialise this explosion; pools call this instead of __init__"""
         self.position = pygame.Vector2(x, y)
-        self.particles = []
         self.timer = EXPLOSION_DURATION
+        self.alive = True
         
-        # Create particles
-        for _ in range(EXPLOSION_PARTICLES):
-            angle = random.uniform(0, math.pi * 2)
-            speed = random.uniform(EXPLOSION_SPEED * 0.5, EXPLOSION_SPEED)
-            velocity = pygame.Vector2(math.cos(angle), math.sin(angle)) * speed
-            self.particles.append({
-                'pos': pygame.Vector2(x, y),
-                'vel': velocity,
-                'size': random.uniform(1, 3)
-            })
+        # Emit particles into the shared particle system, which moves,
+        # fades and draws them
+        velocities = []
+        sizes = []
+        count = round(EXPLOSION_PARTICLES * self.quality.particle_scale)
+        for _ in range(count):
+            angle = self.effects_rng.uniform(0, math.pi * 2)
+            speed = self.effects_rng.uniform(EXPLOSION_SPEED * 0.5, EXPLOSION_SPEED)
+            velocities.append((math.cos(angle) * speed, math.sin(angle) * speed))
+            sizes.append(self.effects_rng.uniform(1, 3))
+        self.particle_system.emit([(x, y)] * count, velocities,
+                                  [EXPLOSION_DURATION] * count, sizes,
+                                  fade=EXPLOSION_DURATION, damping=EXPLOSION_DAMPING)
             
         # Add self to containers
         for container in self.containers:
-            container.append(self)
+            container.add(self)
     
     def update(self, dt):
         self.timer -= dt
         if self.timer <= 0:
             self.kill()
-            return
-            
-        # Update particle positions
-        for particle in self.particles:
-            particle['pos'] += particle['vel'] * dt
-            particle['vel'] *= 0.95  # Slow down over time
-    
-    def draw(self, screen):
-        # Fade out based on remaining time
-        alpha = int((self.timer / EXPLOSION_DURATION) * 255)
-        
-        # Draw each particle
-        for particle in self.particles:
-            pos = particle['pos']
-            size = particle['size']
-            # Create a surface for the particle with transparency
-            particle_surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
-            pygame.draw.circle(particle_surface, (255, 255, 255, alpha), 
-                             (size, size), size)
-            screen.blit(particle_surface, pos - pygame.Vector2(size, size))
     
     def kill(self):
+        if self.alive:
+            self.alive = False
+            self.kill_queue.push(self)
+
+    def remove(self):
         for container in self.containers:
-            if self in container:
-                container.remove(self) 
\ No newline at end of file
+            container.discard(self)
+        if self.pool is not None:
+            self.pool.release(self)
@@ -0,0 +1,89 @@
+import logging
+from collections import deque
+from constants import (QUALITY_BUDGET_MS, QUALITY_WINDOW, QUALITY_COOLDOWN,
+                       QUALITY_DEGRADE_AT, QUALITY_RESTORE_AT)
+
+logger = logging.getLogger(__name__)
+
+# Rendering knobs per quality level, best first:
+# (particle emission scale, line width, asteroid outline detail)
+# Outline detail is the fraction of outline vertices kept; 0 draws circles.
+QUALITY_LEVELS = (
+    (1.0, 2, 1.0),
+    (0.5, 2, 1.0),
+    (0.5, 1, 0.5),
+    (0.25, 1, 0.5),
+    (0.0, 1, 0.0),
+)
+
+
+class RenderQuality:
+    """Current rendering knobs, read by everything that draws or emits particles.
+
+    Nothing here feeds back into the simulation: particles only use the
+    cosmetic RNG stream and are never collided with.
+    """
+
+    def __init__(self, level: int = 0):
+        self.set_level(level)
+
+    def set_level(self, level: int):
+        self.level = level
+        self.particle_scale, self.line_width, self.outline_detail = QUALITY_LEVELS[level]
+
+
+class QualityGovernor:
+    """Steps RenderQuality up and down to keep frame work under a budget.
+
+    record() takes the time spent working on each frame (excluding the
+    frame-cap wait). Quality drops when the average over the last window
+    exceeds QUALITY_DEGRADE_AT of the budget and only comes back once it is
+    under QUALITY_RESTORE_AT, with a cooldown between changes, so it does
+    not oscillate.
+    """
+
+    def __init__(self, quality: RenderQuality, budget_ms: float = QUALITY_BUDGET_MS,
+                 window: int = QUALITY_WINDOW, cooldown: int = QUALITY_COOLDOWN):
+        self.quality = quality
+        self.budget_ms = budget_ms
+        self.cooldown = cooldown
+        self.samples = deque(maxlen=window)
+        self.total = 0.0
+        self.frames_since_change = 0
+        # (frame, old level, new level, average ms) for every change
+        self.decisions = []
+        self.frames = 0
+
+    @property
+    def average_ms(self) -> float:
+        return self.total / len(self.samples) if self.samples else 0.0
+
+    def record(self, frame_ms: float):
+        if len(self.samples) == self.samples.maxlen:
+            self.total -= self.samples[0]
+        self.samples.append(frame_ms)
+        self.total += frame_ms
+        self.frames += 1
+        self.frames_since_change += 1
+        if len(self.samples) < self.samples.maxlen or self.frames_since_change < self.cooldown:
+            return
+
+        level = self.quality.level
+        average = self.average_ms
+        if average > self.budget_ms * QUALITY_DEGRADE_AT and level < len(QUALITY_LEVELS) - 1:
+            self._change(level + 1, average)
+        elif average < self.budget_ms * QUALITY_RESTORE_AT and level > 0:
+            self._change(level - 1, average)
+
+    def _change(self, level: int, average: float):
+        old = self.quality.level
+        self.quality.set_level(level)
+        self.decisions.append((self.frames, old, level, average))
+        self.frames_since_change = 0
+        # Judge the new level on its own frames only
+        self.samples.clear()
+        self.total = 0.0
+        logger.info("quality %d -> %d (%.1f ms average, budget %.1f ms)", old, level, average, self.budget_ms)
+
+    def describe(self) -> str:
+        return f"quality {self.quality.level} avg {self.average_ms:.1f}/{self.budget_ms:.1f}ms"
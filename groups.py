@@ -0,0 +1,84 @@
+class Group:
+    """Collection of game objects with O(1) add, remove and membership.
+
+    Items live in a list with a side table mapping each object to its index;
+    removal swaps the last item into the hole, so order is not preserved.
+    Iteration visits the items present when it started: objects added while
+    iterating are picked up on the next pass. Removing while iterating should
+    go through a KillQueue so nothing is skipped.
+    """
+
+    def __init__(self, items=()):
+        self._items = []
+        self._index = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, obj):
+        if obj in self._index:
+            return
+        self._index[obj] = len(self._items)
+        self._items.append(obj)
+
+    def extend(self, objects):
+        for obj in objects:
+            self.add(obj)
+
+    def remove(self, obj):
+        """Remove obj, raising KeyError if it is not in the group"""
+        index = self._index.pop(obj)
+        last = self._items.pop()
+        if last is not obj:
+            self._items[index] = last
+            self._index[last] = index
+
+    def assign(self, objects):
+        """Replace the contents with objects, in that order"""
+        self._items = list(objects)
+        self._index = {obj: index for index, obj in enumerate(self._items)}
+
+    def discard(self, obj):
+        if obj in self._index:
+            self.remove(obj)
+
+    def clear(self):
+        self._items.clear()
+        self._index.clear()
+
+    def __contains__(self, obj):
+        return obj in self._index
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        items = self._items
+        for index in range(len(items)):
+            yield items[index]
+
+
+class KillQueue:
+    """Objects killed this frame, removed from their groups in one batch"""
+
+    def __init__(self):
+        self.pending = []
+
+    def push(self, obj):
+        self.pending.append(obj)
+
+    def flush(self):
+        """Remove every queued object from its containers"""
+        pending = self.pending
+        self.pending = []
+        for obj in pending:
+            obj.remove()
+        return len(pending)
+
+    def __len__(self):
+        return len(self.pending)
@@ -0,0 +1,109 @@
+import time
+import numpy as np
+import pygame
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, FIXED_DT
+from inputs import Actions, ScriptedInput, NO_ACTIONS
+from collision import SpatialHash, DEFAULT_MODE
+from main import reset_game, update_game, draw_game
+import savestate
+
+
+class HeadlessGame:
+    """The normal game world driven from code, with no window and no frame cap.
+
+    Controls come from a ScriptedInput instead of the keyboard, and nothing
+    touches the display; when render is True frames are drawn to an
+    off-screen surface that callers can inspect.
+    """
+
+    def __init__(self, render: bool = False, mode: str = DEFAULT_MODE, seed: int = None):
+        self.input = ScriptedInput()
+        self.seed = seed
+        self.mode = mode
+        self.grids = (SpatialHash(), SpatialHash())
+        self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)) if render else None
+        self.reset()
+
+    def reset(self, seed: int = None):
+        """Start a fresh game and return the first observation"""
+        if seed is not None:
+            self.seed = seed
+        self.input.set(NO_ACTIONS)
+        self.game_objects = reset_game(self.input, self.seed)
+        self.game_over = False
+        self.frames = 0
+        self.time = 0.0
+        return self.observe()
+
+    def step(self, actions: Actions = NO_ACTIONS, dt: float = FIXED_DT):
+        """Advance one tick with the given controls.
+
+        Returns (observation, reward, done) where reward is the score gained
+        during the tick.
+        """
+        if self.game_over:
+            return self.observe(), 0, True
+        score = self.game_objects['score']
+        self.input.set(actions)
+        self.game_over = update_game(self.game_objects, dt, self.mode, self.grids)
+        self.frames += 1
+        self.time += dt
+        if self.screen is not None:
+            self.render()
+        return self.observe(), self.game_objects['score'] - score, self.game_over
+
+    def save_state(self) -> bytes:
+        """Binary snapshot of the world (see savestate.py)"""
+        return savestate.capture(self.game_objects, self.frames)
+
+    def load_state(self, data: bytes):
+        """Go back (or forward) to a world saved with save_state()"""
+        self.frames = savestate.restore(self.game_objects, data)
+        self.time = self.frames * FIXED_DT
+        self.game_over = all(player.lives < 0 for player in self.game_objects['players'])
+        return self.observe()
+
+    def render(self):
+        """Draw the current frame to the off-screen surface and return it"""
+        if self.screen is None:
+            self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.screen.fill("black")
+        draw_game(self.screen, self.game_objects)
+        return self.screen
+
+    def observe(self):
+        """Snapshot of the world as plain numbers and NumPy arrays"""
+        player = self.game_objects['player']
+        asteroid_store = self.game_objects['asteroid_store']
+        shot_store = self.game_objects['shot_store']
+        asteroids = asteroid_store.alive[:asteroid_store.count]
+        shots = shot_store.alive[:shot_store.count]
+        return {
+            'player': np.array([player.position.x, player.position.y,
+                                player.velocity.x, player.velocity.y,
+                                player.rotation % 360, player.is_vulnerable]),
+            'lives': player.lives,
+            # Each row is x, y, vx, vy, radius
+            'asteroids': np.column_stack((asteroid_store.positions[:asteroid_store.count][asteroids],
+                                          asteroid_store.velocities[:asteroid_store.count][asteroids],
+                                          asteroid_store.radii[:asteroid_store.count][asteroids])),
+            # Each row is x, y, vx, vy
+            'shots': np.column_stack((shot_store.positions[:shot_store.count][shots],
+                                      shot_store.velocities[:shot_store.count][shots])),
+            'score': self.game_objects['score'],
+            'game_over': self.game_over,
+        }
+
+
+if __name__ == "__main__":
+    # Quick speed check: spin and fire until the ship dies
+    game = HeadlessGame()
+    spin_and_fire = Actions(rotate_right=True, fire=True)
+    start = time.perf_counter()
+    done = False
+    while not done and game.frames < 100000:
+        _, _, done = game.step(spin_and_fire)
+    elapsed = time.perf_counter() - start
+    print(f"{game.frames} frames in {elapsed:.2f}s "
+          f"({game.frames / elapsed:.0f} frames/s, {game.time / elapsed:.0f}x real time), "
+          f"score {game.game_objects['score']}")
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+import pygame
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, TEXT_CACHE_SIZE
+
+
+class TextCache:
+    """Rendered text surfaces for one font, keyed on (text, colour, antialias).
+
+    Least recently used entries are evicted once the cache is full. font
+    may be a pygame Font or a point size, in which case the default font is
+    loaded at that size the first time text is rendered.
+    """
+
+    def __init__(self, font, max_entries: int = TEXT_CACHE_SIZE):
+        self._font = font
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text: str, color="white", antialias: bool = True):
+        key = (text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    @property
+    def font(self):
+        if isinstance(self._font, int):
+            self._font = pygame.font.Font(None, self._font)
+        return self._font
+
+
+class Hud:
+    """Score and lives display that only re-renders text when a value changes"""
+
+    def __init__(self, text_cache: TextCache):
+        self.text_cache = text_cache
+        self.score = None
+        self.lives = None
+        self.score_text = None
+        self.lives_text = None
+
+    def draw(self, screen, score: int, lives: int):
+        if score != self.score:
+            self.score = score
+            self.score_text = self.text_cache.render(f"Score: {score}")
+        if lives != self.lives:
+            self.lives = lives
+            self.lives_text = self.text_cache.render(f"Lives: {lives}")
+        return [screen.blit(self.score_text, (10, 10)),
+                screen.blit(self.lives_text, (10, 50))]
+
+
+class GameOverLayer:
+    """Pre-built game over overlay, rebuilt only when the final score changes"""
+
+    def __init__(self, text_cache: TextCache):
+        self.text_cache = text_cache
+        self.score = None
+        self.surface = None
+
+    def build(self, score: int):
+        # Semi-transparent overlay
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        layer.fill((0, 0, 0, 128))
+
+        # Center all text
+        screen_center_x = SCREEN_WIDTH // 2
+        screen_center_y = SCREEN_HEIGHT // 2
+        lines = (("GAME OVER!", -60),
+                 (f"Final Score: {score}", 0),
+                 ("Press SPACE to play again", 60),
+                 ("Press ESC to quit", 100))
+        for text, offset in lines:
+            surface = self.text_cache.render(text)
+            layer.blit(surface, surface.get_rect(centerx=screen_center_x, centery=screen_center_y + offset))
+        self.score = score
+        self.surface = layer
+
+    def draw(self, screen, score: int):
+        if self.surface is None or score != self.score:
+            self.build(score)
+        return screen.blit(self.surface, (0, 0))
@@ -0,0 +1,32 @@
+from collections import namedtuple
+import pygame
+
+# The controls Player.update reacts to on a given tick
+Actions = namedtuple('Actions', ['rotate_left', 'rotate_right', 'thrust', 'reverse', 'fire'],
+                     defaults=(False, False, False, False, False))
+NO_ACTIONS = Actions()
+
+
+class KeyboardInput:
+    """Reads the player's controls from the pygame keyboard state"""
+
+    def read(self) -> Actions:
+        keys = pygame.key.get_pressed()
+        return Actions(rotate_left=keys[pygame.K_a],
+                       rotate_right=keys[pygame.K_d],
+                       thrust=keys[pygame.K_w],
+                       reverse=keys[pygame.K_s],
+                       fire=keys[pygame.K_SPACE])
+
+
+class ScriptedInput:
+    """Input source driven from code; returns whatever actions were set last"""
+
+    def __init__(self, actions: Actions = NO_ACTIONS):
+        self.actions = actions
+
+    def set(self, actions: Actions):
+        self.actions = actions
+
+    def read(self) -> Actions:
+        return self.actions
@@ -1,146 +1,457 @@
 # this allows us to use code from
 # the open-source pygame library
 # throughout this file
+import argparse
+import heapq
+import itertools
+import numpy as np
 import pygame
+import random
 import sys
+import time
 from constants import *
 from player import Player
 from asteroid import Asteroid
 from asteroidfield import AsteroidField
 from shot import Shot
 from explosion import Explosion
+from circleshape import CircleShape
+from groups import Group, KillQueue
+from particles import ParticleSystem
+from pools import Pool
+from hud import TextCache, Hud, GameOverLayer
+from profiler import FrameProfiler, ProfilerOverlay
+from inputs import KeyboardInput
+from renderer import DirtyRectRenderer
+from governor import RenderQuality, QualityGovernor
+from camera import Camera
+from startup import init_subsystems, PhaseTimer
+from collision import (SpatialHash, find_shot_hits, find_swept_shot_hits, find_player_hit, find_swept_player_hits,
+                       DEFAULT_MODE, MODE_SWEPT)
 
-def reset_game():
-    """Create and return fresh game objects and initial score"""
+def reset_game(input_source=None, seed=None, pooled=True, world_size=None):
+    """Create and return fresh game objects and initial score.
+
+    input_source may be a list with one input source per player for
+    multiplayer games; 'player' is then the first of 'players'. world_size
+    is the (width, height) of the playfield, WORLD_WIDTH x WORLD_HEIGHT by
+    default.
+    """
+    # Everything random in the simulation draws from one seeded RNG.
+    # Cosmetic effects get a second stream derived from the same seed, so
+    # changing them never shifts the simulation.
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    effects_rng = random.Random(rng.getrandbits(64))
+    AsteroidField.rng = rng
+    Asteroid.rng = rng
+    Asteroid.effects_rng = effects_rng
+    Explosion.effects_rng = effects_rng
+    Player.effects_rng = effects_rng
+    world_size = tuple(world_size) if world_size else (WORLD_WIDTH, WORLD_HEIGHT)
+    CircleShape.world_size = world_size
+    AsteroidField.world_size = world_size
+    
     # Create groups to manage game objects
-    updatable = []
-    drawable = []
-    asteroids = []
-    shots = []
-    explosions = []
+    updatable = Group()
+    drawable = Group()
+    asteroids = Group()
+    shots = Group()
+    explosions = Group()
+    # Kills are deferred and flushed in one batch after each phase
+    kill_queue = KillQueue()
+    CircleShape.kill_queue = kill_queue
+    Explosion.kill_queue = kill_queue
+    
+    # Asteroids and shots keep their physics state in array stores which
+    # are updated as a whole, so they are not in the updatable list
+    asteroid_store = Asteroid.create_store()
+    shot_store = Shot.create_store()
+    asteroid_store.world_size = shot_store.world_size = world_size
+    updatable.extend([asteroid_store, shot_store])
     
     # Set up containers before creating objects
-    Asteroid.containers = [asteroids, updatable, drawable]
-    Shot.containers = [shots, updatable, drawable]
+    Asteroid.default_store = asteroid_store
+    Shot.default_store = shot_store
+    Asteroid.containers = [asteroids, drawable]
+    Shot.containers = [shots, drawable]
     AsteroidField.containers = [updatable]
-    Explosion.containers = [explosions, updatable, drawable]
+    Explosion.containers = [explosions, updatable]
+    
+    # Dead asteroids, shots and explosions are recycled instead of being
+    # left for the garbage collector
+    pools = {}
+    for name, cls in (('asteroids', Asteroid), ('shots', Shot), ('explosions', Explosion)):
+        cls.pool = Pool(cls) if pooled else None
+        if pooled:
+            pools[name] = cls.pool
     
-    # Create game objects
-    player = Player(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
+    # One particle system shared by explosions and the player's thruster,
+    # drawn underneath everything else
+    particle_system = ParticleSystem()
+    Explosion.particle_system = particle_system
+    Player.particle_system = particle_system
+    updatable.add(particle_system)
+    drawable.add(particle_system)
+    
+    # Create game objects. Several players start spread across the middle.
+    input_sources = input_source if isinstance(input_source, (list, tuple)) else [input_source]
+    players = []
+    for i, source in enumerate(input_sources):
+        player = Player(world_size[0] * (i + 1) / (len(input_sources) + 1), world_size[1] / 2, source)
+        updatable.add(player)
+        drawable.add(player)
+        players.append(player)
     asteroid_field = AsteroidField()
-    updatable.append(player)
-    drawable.append(player)
     
     return {
         'updatable': updatable,
         'drawable': drawable,
         'asteroids': asteroids,
         'shots': shots,
-        'player': player,
+        'player': players[0],
+        'players': players,
         'asteroid_field': asteroid_field,
         'score': 0,
+        'asteroids_destroyed': 0,
         'explosions': explosions,
+        'asteroid_store': asteroid_store,
+        'shot_store': shot_store,
+        'kill_queue': kill_queue,
+        'particles': particle_system,
+        'pools': pools,
+        'world_size': world_size,
+        'seed': seed,
+        'rng': rng,
+        'effects_rng': effects_rng,
     }
 
-def draw_game_over(screen, score, font):
-    """Draw game over screen with score and options"""
-    # Semi-transparent overlay
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    overlay.fill((0, 0, 0))
-    overlay.set_alpha(128)
-    screen.blit(overlay, (0, 0))
-    
-    # Game Over text
-    game_over_text = font.render("GAME OVER!", True, "white")
-    score_text = font.render(f"Final Score: {score}", True, "white")
-    retry_text = font.render("Press SPACE to play again", True, "white")
-    quit_text = font.render("Press ESC to quit", True, "white")
-    
-    # Center all text
-    screen_center_x = SCREEN_WIDTH // 2
-    screen_center_y = SCREEN_HEIGHT // 2
-    
-    screen.blit(game_over_text, 
-                game_over_text.get_rect(centerx=screen_center_x, centery=screen_center_y - 60))
-    screen.blit(score_text, 
-                score_text.get_rect(centerx=screen_center_x, centery=screen_center_y))
-    screen.blit(retry_text, 
-                retry_text.get_rect(centerx=screen_center_x, centery=screen_center_y + 60))
-    screen.blit(quit_text, 
-                quit_text.get_rect(centerx=screen_center_x, centery=screen_center_y + 100))
-
-def main():
-    pygame.init()
+def hit_player(game_objects, player):
+    """An asteroid got the player: lose a life, and drop out with none left"""
+    player.respawn()
+    if player.lives < 0:
+        # Stop updating player to prevent further movement
+        game_objects['updatable'].remove(player)
+
+def check_collisions(game_objects, mode=DEFAULT_MODE, grids=None):
+    """Resolve player and shot collisions for this frame.
+
+    Returns True when every player has run out of lives.
+    """
+    players = game_objects['players']
+    asteroid_grid, shot_grid = grids if grids else (None, None)
+
+    if mode == MODE_SWEPT:
+        resolve_swept_hits(game_objects)
+        # update_objects left shots that expired during the step alive for this
+        game_objects['shot_store'].cull()
+    else:
+        # Check for collisions between players and asteroids
+        for player in players:
+            if player.lives < 0:
+                continue
+            if player.is_vulnerable and find_player_hit(player, game_objects['asteroids'], mode, asteroid_grid):
+                hit_player(game_objects, player)
+    game_over = all(player.lives < 0 for player in players)
+    if not game_over:
+        # Ships that are out while others play on disappear
+        for player in players:
+            if player.lives < 0:
+                game_objects['drawable'].discard(player)
+    if mode == MODE_SWEPT:
+        return game_over
+
+    # Check for collisions between shots and asteroids. Hits are collected
+    # first so splitting never mutates the lists being scanned.
+    for shot, asteroid in find_shot_hits(game_objects['asteroids'], game_objects['shots'], mode, shot_grid):
+        game_objects['score'] += asteroid.score_value
+        game_objects['asteroids_destroyed'] += 1
+        shot.kill()
+        asteroid.split()
+
+    return game_over
+
+def resolve_swept_hits(game_objects):
+    """Resolve ship contacts and shot hits from the whole last step in the
+    order they happened.
+
+    A shot, ship or asteroid used up by an earlier event is skipped, so an
+    asteroid shot early in the step can no longer reach a ship later in it.
+    The pieces of a split asteroid are swept against the remaining shots
+    and ships from the moment of the split, so they can be hit, or hit a
+    ship, within the same step.
+    """
+    shots = game_objects['shots']
+    order = itertools.count()
+    # (time, tie-break, shot or player, asteroid)
+    events = []
+
+    def sweep(asteroids):
+        for at, shot, asteroid in find_swept_shot_hits(asteroids, [s for s in shots if s.alive]):
+            heapq.heappush(events, (at, next(order), shot, asteroid))
+        for player in game_objects['players']:
+            if player.lives >= 0 and player.is_vulnerable:
+                for at, asteroid in find_swept_player_hits(player, asteroids):
+                    heapq.heappush(events, (at, next(order), player, asteroid))
+
+    sweep(game_objects['asteroids'])
+    while events:
+        at, _, hitter, asteroid = heapq.heappop(events)
+        if not asteroid.alive:
+            continue
+        if isinstance(hitter, Player):
+            # A respawned ship is invulnerable for the rest of the step
+            if hitter.lives >= 0 and hitter.is_vulnerable:
+                hit_player(game_objects, hitter)
+            continue
+        if not hitter.alive:
+            continue
+        game_objects['score'] += asteroid.score_value
+        game_objects['asteroids_destroyed'] += 1
+        hitter.kill()
+        pieces = asteroid.split(at)
+        if pieces:
+            sweep(pieces)
+
+def update_objects(game_objects, dt, mode=DEFAULT_MODE):
+    """Run the update phase: move everything by dt seconds.
+
+    Pass the collision mode the step will be resolved with; swept
+    collisions cull expired shots only after checking their last move.
+    """
+    game_objects['shot_store'].cull_on_update = mode != MODE_SWEPT
+    for obj in game_objects['updatable']:
+        obj.update(dt)
+    game_objects['kill_queue'].flush()
+
+def resolve_collisions(game_objects, mode=DEFAULT_MODE, grids=None):
+    """Run the collision phase. Returns True when the game is over."""
+    game_over = check_collisions(game_objects, mode, grids)
+    game_objects['kill_queue'].flush()
+    return game_over
+
+def update_game(game_objects, dt, mode=DEFAULT_MODE, grids=None):
+    """Advance the world by dt seconds. Returns True when the game is over."""
+    update_objects(game_objects, dt, mode)
+    return resolve_collisions(game_objects, mode, grids)
+
+def draw_game(screen, game_objects, alpha=1.0, camera=None):
+    """Draw every drawable object and return the list of Rects touched.
+
+    alpha is how far rendering sits between the previous simulation step
+    (0) and the latest one (1). With a camera only what it sees is drawn.
+    """
+    game_objects['asteroid_store'].interpolate(alpha)
+    game_objects['shot_store'].interpolate(alpha)
+    for player in game_objects['players']:
+        player.interpolate(alpha)
+    if camera is not None:
+        return draw_view(screen, game_objects, camera)
+    rects = []
+    for obj in game_objects['drawable']:
+        add_rects(rects, obj.draw(screen))
+    return rects
+
+def draw_view(screen, game_objects, camera):
+    """Draw what the camera sees, following the first player.
+
+    Visible entities are picked out of the stores with a few array
+    operations, so the cost follows what is on screen rather than how
+    many entities the world holds. Render positions of whatever is drawn
+    are moved into screen space.
+    """
+    drawable = game_objects['drawable']
+    camera.follow(game_objects['player'].render_position)
+    rects = []
+    if game_objects['particles'] in drawable:
+        add_rects(rects, game_objects['particles'].draw(screen, camera))
+    for store in (game_objects['asteroid_store'], game_objects['shot_store']):
+        n = store.count
+        positions = camera.to_screen(store.render_positions[:n])
+        slots = np.flatnonzero(store.alive[:n] & camera.visible(positions, store.radii[:n]))
+        store.render_positions[slots] = positions[slots]
+        owners = store.owners
+        for slot in slots.tolist():
+            add_rects(rects, owners[slot].draw(screen))
+    for player in game_objects['players']:
+        if player in drawable:
+            player.render_position = camera.point_to_screen(player.render_position)
+            add_rects(rects, player.draw(screen))
+    return rects
+
+def add_rects(rects, drawn):
+    """Append what a draw() call returned (None, a Rect or a list) to rects"""
+    if drawn is None:
+        return
+    if isinstance(drawn, list):
+        rects.extend(drawn)
+    else:
+        rects.append(drawn)
+
+def main(record_path=None, threaded=THREADED_SIMULATION, large_world=False, first_frame_only=False):
+    """Run the game in a window. With record_path, the first game is recorded there.
+
+    With threaded, the simulation runs on its own thread (see threaded.py).
+    With large_world, the playfield is LARGE_WORLD_SCREENS screens across
+    and down, each screen spawning asteroids as the single one does, and the
+    view scrolls with the ship. With first_frame_only,
+    returns the startup phase timings in ms once the first frame is shown
+    (see startup.py).
+    """
+    startup = PhaseTimer()
+    init_subsystems()
+    startup.lap('init')
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Bootsteroids")
+    startup.lap('window')
+    if threaded:
+        # Imported here because threaded imports this module
+        from threaded import run_threaded
+        run_threaded(screen, record_path)
+        pygame.quit()
+        sys.exit()
     clock = pygame.time.Clock()
-    font = pygame.font.Font(None, 36)
+    # Fonts are loaded when the first text is drawn
+    text_cache = TextCache(36)
+    hud = Hud(text_cache)
+    game_over_layer = GameOverLayer(text_cache)
+    # Rendering detail shared by everything that draws, turned down by the
+    # governor when frames run over budget
+    quality = RenderQuality()
+    Asteroid.quality = Explosion.quality = Player.quality = quality
+    governor = QualityGovernor(quality) if ADAPTIVE_QUALITY else None
+    # F3 toggles the profiler and its overlay, F4 dumps the trace
+    profiler = FrameProfiler()
+    profiler_overlay = ProfilerOverlay(profiler, TextCache(22), governor)
+    # Optional renderer that only redraws and pushes changed areas
+    renderer = DirtyRectRenderer(screen) if DIRTY_RECTS else None
+    world_size = (WORLD_WIDTH, WORLD_HEIGHT)
+    camera = None
+    if large_world:
+        world_size = (SCREEN_WIDTH * LARGE_WORLD_SCREENS, SCREEN_HEIGHT * LARGE_WORLD_SCREENS)
+        camera = Camera(world_size)
+    # Reused every frame for the collision broadphase
+    grids = (SpatialHash(width=world_size[0], height=world_size[1]),
+             SpatialHash(width=world_size[0], height=world_size[1]))
     
     # Create game objects and get containers
-    game_objects = reset_game()
+    recorder = None
+    if record_path:
+        # Imported here because replay imports this module
+        from replay import Recorder
+        seed = random.randrange(2 ** 32)
+        recorder = Recorder(KeyboardInput(), seed)
+        game_objects = reset_game(recorder, seed, world_size=world_size)
+    else:
+        game_objects = reset_game(world_size=world_size)
     game_over = False
+    # Simulation time owed but not yet stepped
+    accumulator = 0.0
+    startup.lap('setup')
     
     running = True
     while running:
-        dt = clock.tick(60) / 1000  # Update delta time
+        profiler.start_frame()
+        # The first frame goes out straight away rather than waiting for the cap
+        frame_time = clock.tick(RENDER_FPS if startup is None else 0) / 1000
+        work_start = time.perf_counter()
+        profiler.lap('wait')
         
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                print("Profile written to", *profiler.dump())
             elif event.type == pygame.KEYDOWN and game_over:
                 if event.key == pygame.K_SPACE:
                     # Reset game
-                    game_objects = reset_game()
+                    game_objects = reset_game(world_size=world_size)
                     game_over = False
+                    accumulator = 0.0
                 elif event.key == pygame.K_ESCAPE:
                     running = False
         
-        # Game logic and drawing
-        screen.fill("black")
+        profiler.lap('events')
         
         if not game_over:
-            # Update all objects
-            for obj in game_objects['updatable']:
-                obj.update(dt)
-                
-            # Draw score and lives
-            score_text = font.render(f"Score: {game_objects['score']}", True, "white")
-            lives_text = font.render(f"Lives: {game_objects['player'].lives}", True, "white")
-            screen.blit(score_text, (10, 10))
-            screen.blit(lives_text, (10, 50))
+            # Step the simulation in fixed increments, whatever the frame
+            # rate. After a long hitch only MAX_STEPS_PER_FRAME steps are
+            # run and the rest of the backlog is dropped.
+            accumulator += frame_time
+            steps = 0
+            while accumulator >= FIXED_DT and steps < MAX_STEPS_PER_FRAME and not game_over:
+                update_objects(game_objects, FIXED_DT)
+                profiler.lap('update')
+                game_over = resolve_collisions(game_objects, grids=grids)
+                profiler.lap('collision')
+                if recorder is not None:
+                    recorder.end_tick(game_objects)
+                accumulator -= FIXED_DT
+                steps += 1
+            if steps == MAX_STEPS_PER_FRAME:
+                accumulator = min(accumulator, FIXED_DT)
+            if game_over and recorder is not None:
+                recorder.recording.save(record_path)
+                recorder = None
             
-            # Check for collisions between player and asteroids
-            for asteroid in game_objects['asteroids']:
-                if game_objects['player'].is_vulnerable and game_objects['player'].collides_with(asteroid):
-                    game_objects['player'].respawn()
-                    if game_objects['player'].lives < 0:
-                        game_over = True
-                        # Stop updating player to prevent further movement
-                        game_objects['updatable'].remove(game_objects['player'])
-                    break
-                
-                # Check for collisions between shots and asteroids
-                for shot in game_objects['shots'][:]:
-                    if shot.collides_with(asteroid):
-                        game_objects['score'] += asteroid.score_value
-                        shot.kill()
-                        asteroid.split()
-                        break
-            
-            # Draw all objects
-            for obj in game_objects['drawable']:
-                obj.draw(screen)
+            # Draw all objects between the last two steps, then score and
+            # lives on top
+            if renderer is not None:
+                renderer.begin()
+                renderer.add(draw_game(screen, game_objects, accumulator / FIXED_DT, camera))
+                renderer.add(hud.draw(screen, game_objects['score'], game_objects['player'].lives))
+            else:
+                screen.fill("black")
+                draw_game(screen, game_objects, accumulator / FIXED_DT, camera)
+                hud.draw(screen, game_objects['score'], game_objects['player'].lives)
         else:
             # Draw game over screen
-            for obj in game_objects['drawable']:
-                obj.draw(screen)  # Draw final game state in background
-            draw_game_over(screen, game_objects['score'], font)
+            if renderer is not None:
+                renderer.invalidate()
+                renderer.begin()
+            else:
+                screen.fill("black")
+            draw_game(screen, game_objects, camera=camera)  # Draw final game state in background
+            game_over_layer.draw(screen, game_objects['score'])
+        overlay_rects = profiler_overlay.draw(screen)
+        profiler.lap('draw')
         
-        pygame.display.flip()
+        if renderer is not None:
+            renderer.add(overlay_rects)
+            renderer.present()
+        else:
+            pygame.display.flip()
+        profiler.lap('flip')
+        if startup is not None:
+            startup.lap('first frame')
+            if first_frame_only:
+                pygame.quit()
+                return startup.phases
+            startup = None
+        profiler.end_frame(game_objects)
+        if governor is not None:
+            governor.record((time.perf_counter() - work_start) * 1000)
+
+    if recorder is not None:
+        recorder.recording.save(record_path)
 
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # python main.py [--record session.bsr] [--threaded] | [--large-world]
+    parser = argparse.ArgumentParser(description="Play Bootsteroids")
+    parser.add_argument("--record", metavar="FILE", help="record the first game to FILE")
+    parser.add_argument("--threaded", action="store_true", default=THREADED_SIMULATION,
+                        help="run the simulation on its own thread")
+    parser.add_argument("--large-world", action="store_true",
+                        help=f"play in a world {LARGE_WORLD_SCREENS} screens across with a scrolling view")
+    args = parser.parse_args()
+    if args.large_world and (args.threaded or args.record):
+        # Threaded drawing has no camera, and recordings replay in the default world
+        parser.error("--large-world cannot be combined with --threaded or --record")
+    main(args.record, args.threaded, args.large_world)
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""Wire format shared by server.py and client.py.
+
+Every message is a little-endian uint32 byte count followed by a one-byte
+message type and its body. Snapshots carry the world as fixed-layout
+records with quantized positions, one record type per kind of entity, and
+only list the entities that changed since the previous snapshot sent on
+the same connection, plus the ids of the ones that disappeared. Streams
+are reliable and ordered, so the previous snapshot is always the client's
+baseline and no acknowledgements are needed.
+"""
+import struct
+from collections import namedtuple
+import numpy as np
+from constants import NET_POSITION_SCALE, NET_POSITION_MARGIN
+from inputs import Actions
+from replay import pack_actions, unpack_actions
+
+MSG_WELCOME = 1   # server -> client: player index, simulation rate, snapshot interval
+MSG_SNAPSHOT = 2  # server -> client: delta-compressed world state
+MSG_INPUT = 3     # client -> server: one byte of packed Actions
+
+ASTEROID_DTYPE = np.dtype([('id', '<u4'), ('x', '<u2'), ('y', '<u2'), ('radius', 'u1'), ('shape', 'u1')])
+SHOT_DTYPE = np.dtype([('id', '<u4'), ('x', '<u2'), ('y', '<u2')])
+PLAYER_DTYPE = np.dtype([('id', '<u4'), ('x', '<u2'), ('y', '<u2'), ('rotation', '<u2'),
+                         ('lives', 'i1'), ('flags', 'u1')])
+KINDS = (('asteroids', ASTEROID_DTYPE), ('shots', SHOT_DTYPE), ('players', PLAYER_DTYPE))
+
+# Player flags
+FLAG_VISIBLE = 1     # drawn this tick (off during the invulnerability blink)
+FLAG_VULNERABLE = 2
+
+# Rotation is sent in 1/65536ths of a turn
+ROTATION_SCALE = 65536 / 360
+
+FRAME = struct.Struct("<IB")
+WELCOME = struct.Struct("<BHH")
+# tick, score, game over, then changed and removed counts for each kind
+SNAPSHOT = struct.Struct("<IIB6H")
+
+# Quantized world state. Record arrays are sorted by id.
+NetState = namedtuple('NetState', 'tick score game_over asteroids shots players')
+
+
+def empty_state() -> NetState:
+    return NetState(0, 0, False, *(np.zeros(0, dtype) for _, dtype in KINDS))
+
+
+def quantize_positions(positions):
+    values = np.rint((np.asarray(positions) + NET_POSITION_MARGIN) * NET_POSITION_SCALE)
+    return np.clip(values, 0, 65535).astype(np.uint16)
+
+
+def dequantize_positions(values):
+    return values / NET_POSITION_SCALE - NET_POSITION_MARGIN
+
+
+def capture(game_objects, tick: int, game_over: bool = False) -> NetState:
+    """Quantize the networked part of a world from reset_game()"""
+    asteroids = game_objects['asteroids']
+    store = game_objects['asteroid_store']
+    slots = np.fromiter((a.slot for a in asteroids), dtype=np.intp, count=len(asteroids))
+    asteroid_records = np.empty(len(slots), ASTEROID_DTYPE)
+    asteroid_records['id'] = [a.entity_id for a in asteroids]
+    positions = quantize_positions(store.positions[slots])
+    asteroid_records['x'] = positions[:, 0]
+    asteroid_records['y'] = positions[:, 1]
+    asteroid_records['radius'] = store.radii[slots]
+    asteroid_records['shape'] = [a.shape for a in asteroids]
+
+    shots = game_objects['shots']
+    store = game_objects['shot_store']
+    slots = np.fromiter((s.slot for s in shots), dtype=np.intp, count=len(shots))
+    shot_records = np.empty(len(slots), SHOT_DTYPE)
+    shot_records['id'] = [s.entity_id for s in shots]
+    positions = quantize_positions(store.positions[slots])
+    shot_records['x'] = positions[:, 0]
+    shot_records['y'] = positions[:, 1]
+
+    players = game_objects['players']
+    player_records = np.empty(len(players), PLAYER_DTYPE)
+    for record, player in zip(player_records, players):
+        x, y = quantize_positions((player.position.x, player.position.y))
+        record['id'] = player.entity_id
+        record['x'] = x
+        record['y'] = y
+        record['rotation'] = int(player.rotation % 360 * ROTATION_SCALE) & 0xFFFF
+        record['lives'] = max(-1, min(127, player.lives))
+        record['flags'] = (FLAG_VISIBLE if player.visible else 0) | (FLAG_VULNERABLE if player.is_vulnerable else 0)
+
+    return NetState(tick, game_objects['score'], game_over,
+                    *(np.sort(records, order='id') for records in (asteroid_records, shot_records, player_records)))
+
+
+def diff(previous, current):
+    """Return (records in current that are new or changed, ids missing from current)"""
+    if len(previous) == 0:
+        return current, np.zeros(0, np.uint32)
+    index = np.minimum(np.searchsorted(previous['id'], current['id']), len(previous) - 1)
+    matched = previous[index]
+    unchanged = matched == current
+    removed = previous['id'][~np.isin(previous['id'], current['id'], assume_unique=True)]
+    return current[~unchanged], removed
+
+
+def apply(previous, changed, removed):
+    """Inverse of diff(): rebuild the current records from the previous ones"""
+    keep = ~np.isin(previous['id'], removed, assume_unique=True) & \
+        ~np.isin(previous['id'], changed['id'], assume_unique=True)
+    return np.sort(np.concatenate((previous[keep], changed)), order='id')
+
+
+def frame(message_type: int, body: bytes = b"") -> bytes:
+    return FRAME.pack(len(body) + 1, message_type) + body
+
+
+async def read_message(reader):
+    """Return (message type, body) for the next message on an asyncio stream"""
+    length, message_type = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return message_type, await reader.readexactly(length - 1)
+
+
+def encode_welcome(player_index: int, simulation_rate: int, snapshot_interval: int) -> bytes:
+    return frame(MSG_WELCOME, WELCOME.pack(player_index, simulation_rate, snapshot_interval))
+
+
+def decode_welcome(body: bytes):
+    return WELCOME.unpack(body)
+
+
+def encode_input(actions: Actions) -> bytes:
+    return frame(MSG_INPUT, bytes((pack_actions(actions),)))
+
+
+def decode_input(body: bytes) -> Actions:
+    return unpack_actions(body[0])
+
+
+def encode_snapshot(baseline: NetState, state: NetState) -> bytes:
+    """Snapshot message for state, delta-compressed against baseline"""
+    counts = []
+    parts = []
+    for kind, _ in KINDS:
+        changed, removed = diff(getattr(baseline, kind), getattr(state, kind))
+        counts.extend((len(changed), len(removed)))
+        parts.append(changed.tobytes())
+        parts.append(removed.astype('<u4').tobytes())
+    header = SNAPSHOT.pack(state.tick, state.score, state.game_over, *counts)
+    return frame(MSG_SNAPSHOT, header + b"".join(parts))
+
+
+def decode_snapshot(body: bytes, baseline: NetState) -> NetState:
+    """Rebuild the full quantized state from a snapshot body and the previous state"""
+    tick, score, game_over, *counts = SNAPSHOT.unpack_from(body)
+    offset = SNAPSHOT.size
+    records = []
+    for (kind, dtype), n_changed, n_removed in zip(KINDS, counts[0::2], counts[1::2]):
+        changed = np.frombuffer(body, dtype, n_changed, offset)
+        offset += changed.nbytes
+        removed = np.frombuffer(body, '<u4', n_removed, offset)
+        offset += removed.nbytes
+        records.append(apply(getattr(baseline, kind), changed, removed))
+    return NetState(tick, score, bool(game_over), *records)
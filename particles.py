@@ -0,0 +1,126 @@
+import numpy as np
+import pygame
+from constants import PARTICLE_ALPHA_LEVELS, PARTICLE_SIZE_STEP
+
+
+class SpriteCache:
+    """Pre-baked soft white dots, quantized by radius and alpha.
+
+    Particles blit one of these instead of allocating a fresh SRCALPHA
+    surface every frame.
+    """
+
+    def __init__(self, alpha_levels: int = PARTICLE_ALPHA_LEVELS, size_step: float = PARTICLE_SIZE_STEP):
+        self.alpha_levels = alpha_levels
+        self.size_step = size_step
+        self.sprites = {}
+
+    def size_index(self, sizes):
+        """Map particle radii onto cache buckets (vectorized)"""
+        return np.maximum(np.rint(sizes / self.size_step), 1).astype(np.intp)
+
+    def alpha_index(self, fractions):
+        """Map remaining-life fractions in [0, 1] onto alpha buckets (vectorized)"""
+        levels = self.alpha_levels - 1
+        return np.rint(np.clip(fractions, 0, 1) * levels).astype(np.intp)
+
+    def get(self, size_index: int, alpha_index: int):
+        key = (size_index, alpha_index)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            size = size_index * self.size_step
+            alpha = int(alpha_index / (self.alpha_levels - 1) * 255)
+            sprite = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (255, 255, 255, alpha), (size, size), size)
+            self.sprites[key] = sprite
+        return sprite
+
+
+def blit_particles(screen, sprites: SpriteCache, positions, sizes, fractions):
+    """Blit particles given as arrays of centres, radii and remaining-life fractions"""
+    size_idx = sprites.size_index(sizes)
+    alpha_idx = sprites.alpha_index(fractions)
+    top_left = positions - (size_idx * sprites.size_step)[:, None]
+    get = sprites.get
+    return screen.blits([(get(s, a), pos) for s, a, pos in
+                         zip(size_idx.tolist(), alpha_idx.tolist(), top_left.tolist())])
+
+
+class ParticleSystem:
+    """Shared, array-backed store for every particle in the game.
+
+    Live particles are packed at the front of the arrays; dead ones are
+    compacted away after each update.
+    """
+
+    def __init__(self, capacity: int = 256, sprites: SpriteCache = None):
+        self.positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.life = np.zeros(capacity)
+        # Particles fade from full alpha at fade time down to zero
+        self.fade = np.ones(capacity)
+        self.sizes = np.ones(capacity)
+        # Velocity multiplier applied every update
+        self.damping = np.ones(capacity)
+        self.count = 0
+        self.sprites = sprites if sprites is not None else SpriteCache()
+
+    def __len__(self):
+        return self.count
+
+    def _reserve(self, n: int):
+        needed = self.count + n
+        capacity = len(self.life)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("positions", "velocities", "life", "fade", "sizes", "damping"):
+            old = getattr(self, name)
+            new = np.ones((capacity,) + old.shape[1:])
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def emit(self, positions, velocities, life, sizes, fade: float, damping: float = 1.0):
+        """Add a batch of particles; positions/velocities are (n, 2), life/sizes length n"""
+        life = np.asarray(life, dtype=float)
+        n = len(life)
+        if n == 0:
+            return
+        self._reserve(n)
+        start, end = self.count, self.count + n
+        self.positions[start:end] = positions
+        self.velocities[start:end] = velocities
+        self.life[start:end] = life
+        self.sizes[start:end] = sizes
+        self.fade[start:end] = fade
+        self.damping[start:end] = damping
+        self.count = end
+
+    def update(self, dt):
+        n = self.count
+        if n == 0:
+            return
+        self.life[:n] -= dt
+        self.positions[:n] += self.velocities[:n] * dt
+        self.velocities[:n] *= self.damping[:n, None]
+
+        # Compact the survivors to the front of the arrays
+        keep = self.life[:n] > 0
+        alive = int(np.count_nonzero(keep))
+        if alive < n:
+            for array in (self.positions, self.velocities, self.life, self.fade, self.sizes, self.damping):
+                array[:alive] = array[:n][keep]
+            self.count = alive
+
+    def draw(self, screen, camera=None):
+        n = self.count
+        if n == 0:
+            return None
+        if camera is None:
+            return blit_particles(screen, self.sprites, self.positions[:n], self.sizes[:n],
+                                  self.life[:n] / self.fade[:n])
+        positions = camera.to_screen(self.positions[:n])
+        shown = camera.visible(positions, self.sizes[:n])
+        return blit_particles(screen, self.sprites, positions[shown], self.sizes[:n][shown],
+                              self.life[:n][shown] / self.fade[:n][shown])
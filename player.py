@@ -1,17 +1,46 @@
 from circleshape import CircleShape
 from constants import (PLAYER_RADIUS, PLAYER_TURN_SPEED, PLAYER_SPEED, 
                       PLAYER_SHOOT_SPEED, PLAYER_SHOOT_COOLDOWN, STARTING_LIVES, RESPAWN_TIME,
-                      PLAYER_ACCELERATION, PLAYER_FRICTION)
+                      PLAYER_ACCELERATION, PLAYER_FRICTION, THRUST_PARTICLE_FADE, SIMULATION_RATE)
 import pygame
+import numpy as np
 from shot import Shot
+from particles import ParticleSystem
+from inputs import KeyboardInput
+from governor import RenderQuality
+from collision import within_reach
 import random
 
+def ship_triangle(position, rotation: float, radius: float):
+    """Corners of the ship outline centred on position, facing rotation degrees"""
+    forward = pygame.Vector2(0, 1).rotate(rotation)
+    right = pygame.Vector2(0, 1).rotate(rotation + 90) * radius / 1.5
+    a = pygame.Vector2(position + forward * radius)
+    b = pygame.Vector2(position - forward * radius - right)
+    c = pygame.Vector2(position - forward * radius + right)
+    return [a, b, c]
+
 class Player(CircleShape):
-    def __init__(self, x: int, y: int):
+    __slots__ = ('input_source', 'rotation', 'previous_position', 'previous_rotation',
+                 'render_position', 'render_rotation', 'shoot_timer', 'lives', 'respawn_timer',
+                 'is_vulnerable', 'initial_position', 'thrusting')
+    particle_system = ParticleSystem()  # Will be set from main.py
+    effects_rng = random.Random()  # Will be set from main.py
+    quality = RenderQuality()  # Will be set from main.py
+
+    def __init__(self, x: int, y: int, input_source=None):
         # Call parent constructor with position and player radius
         super().__init__(x, y, PLAYER_RADIUS)
+        # Where the controls come from; the keyboard unless told otherwise
+        self.input_source = input_source if input_source is not None else KeyboardInput()
         # Initialize rotation to 0
         self.rotation = 0
+        # State at the start of the last step and the interpolated state
+        # drawn this frame
+        self.previous_position = self.position.copy()
+        self.previous_rotation = 0
+        self.render_position = self.position.copy()
+        self.render_rotation = 0
         # Initialize shoot cooldown timer
         self.shoot_timer = 0
         self.lives = STARTING_LIVES
@@ -20,36 +49,44 @@ class Player(CircleShape):
         self.initial_position = pygame.Vector2(x, y)
         # Add velocity for acceleration-based movement
         self.velocity = pygame.Vector2(0, 0)
-        # Thruster particles
+        # Thruster particles are emitted into the shared particle system
         self.thrusting = False
-        self.thrust_particles = []
     # in the player class
-    def triangle(self):
-        forward = pygame.Vector2(0, 1).rotate(self.rotation)
-        right = pygame.Vector2(0, 1).rotate(self.rotation + 90) * self.radius / 1.5
-        a = pygame.Vector2(self.position + forward * self.radius)
-        b = pygame.Vector2(self.position - forward * self.radius - right)
-        c = pygame.Vector2(self.position - forward * self.radius + right)
-        return [a, b, c]
+    def triangle(self, position=None, rotation=None):
+        if position is None:
+            position = self.position
+        if rotation is None:
+            rotation = self.rotation
+        return ship_triangle(position, rotation, self.radius)
+
+    @property
+    def visible(self) -> bool:
+        """False during the off half of the invulnerability blink"""
+        return self.is_vulnerable or self.respawn_timer % 0.2 < 0.1
+
+    def interpolate(self, alpha: float):
+        """Blend the last two simulation states for drawing"""
+        if self.previous_position.distance_squared_to(self.position) > self.radius * self.radius * 4:
+            # Wrapped or respawned this step; don't smear across the screen
+            self.render_position = self.position.copy()
+        else:
+            self.render_position = self.previous_position.lerp(self.position, alpha)
+        self.render_rotation = self.previous_rotation + (self.rotation - self.previous_rotation) * alpha
 
     def draw(self, screen):
-        # Draw thrust particles
-        if self.thrust_particles:
-            for particle in self.thrust_particles:
-                alpha = int((particle['life'] / 0.3) * 255)  # Fade out
-                particle_surface = pygame.Surface((3, 3), pygame.SRCALPHA)
-                pygame.draw.circle(particle_surface, (255, 255, 255, alpha), 
-                                 (1.5, 1.5), 1.5)
-                screen.blit(particle_surface, particle['pos'] - pygame.Vector2(1.5, 1.5))
-        
-        # Draw ship
-        if self.is_vulnerable or pygame.time.get_ticks() % 200 < 100:
-            pygame.draw.polygon(screen, "white", self.triangle(), 2)
+        # Draw ship, blinking while invulnerable. The blink follows the
+        # respawn timer rather than the wall clock so headless renders match.
+        if self.visible:
+            return pygame.draw.polygon(screen, "white", self.triangle(self.render_position, self.render_rotation),
+                                       self.quality.line_width)
 
     def rotate(self, dt):
         self.rotation += PLAYER_TURN_SPEED * dt
     
     def update(self, dt):
+        self.previous_position = self.position.copy()
+        self.previous_rotation = self.rotation
+
         # Handle respawn timer
         if not self.is_vulnerable:
             self.respawn_timer -= dt
@@ -60,37 +97,29 @@ class Player(CircleShape):
         if self.shoot_timer > 0:
             self.shoot_timer -= dt
         
-        keys = pygame.key.get_pressed()
+        actions = self.input_source.read()
         self.thrusting = False
         
-        if keys[pygame.K_a]:
+        if actions.rotate_left:
             self.rotate(-dt)  # Negative dt for counter-clockwise rotation
-        if keys[pygame.K_d]:
+        if actions.rotate_right:
             self.rotate(dt)   # Positive dt for clockwise rotation
             
-        if keys[pygame.K_w]:
+        if actions.thrust:
             self.thrust(dt)     # Forward movement with acceleration
             self.thrusting = True
         
-        if keys[pygame.K_s]:
+        if actions.reverse:
             self.move(-dt)    # Backward movement
 
-        # Apply friction/drag
-        self.velocity *= PLAYER_FRICTION
+        # Apply friction/drag; it is given per 1/SIMULATION_RATE s, so bigger steps get more of it
+        self.velocity *= PLAYER_FRICTION ** (dt * SIMULATION_RATE)
         
         # Update position based on velocity
         self.position += self.velocity * dt
         
-        # Update thrust particles
-        for particle in self.thrust_particles[:]:
-            particle['life'] -= dt
-            if particle['life'] <= 0:
-                self.thrust_particles.remove(particle)
-            else:
-                particle['pos'] += particle['vel'] * dt
-        
         # Handle shooting
-        if keys[pygame.K_SPACE] and self.shoot_timer <= 0:
+        if actions.fire and self.shoot_timer <= 0:
             self.shoot()
             
         # Wrap position around screen edges
@@ -109,7 +138,7 @@ class Player(CircleShape):
     def shoot(self):
         """Creates a new shot moving in the direction the player is facing"""
         # Create shot at player position
-        shot = Shot(self.position.x, self.position.y)
+        shot = Shot.spawn(self.position.x, self.position.y)
         # Set velocity in direction player is facing (same as movement direction)
         direction = pygame.Vector2(0, 1).rotate(self.rotation)
         shot.velocity = direction * PLAYER_SHOOT_SPEED
@@ -123,11 +152,18 @@ class Player(CircleShape):
             self.position = self.initial_position.copy()
             self.velocity = pygame.Vector2(0, 0)
             self.rotation = 0
+            self.previous_position = self.position.copy()
+            self.previous_rotation = 0
             self.respawn_timer = RESPAWN_TIME
             self.is_vulnerable = False
 
     def collides_with(self, other: 'CircleShape') -> bool:
         """Override circle collision with triangle collision for player"""
+        # Cheap bounding-circle rejection before building the triangle. The
+        # back corners of the ship sit sqrt(1 + 1/1.5**2) ~ 1.2 radii out.
+        if not within_reach(self.position, other.position, self.radius * 1.21 + other.radius):
+            return False
+
         # Get the triangle points for collision checking
         triangle_points = self.triangle()
         
@@ -160,22 +196,63 @@ class Player(CircleShape):
                     
         return False
 
+    def collides_with_many(self, centres, radii, position=None, rotation=None):
+        """Batched collides_with against many circles at once.
+
+        centres is an (n, 2) array and radii a length-n array; returns a
+        boolean mask of the circles touching the ship. The triangle is built
+        once and circles outside the ship's bounding circle are dropped
+        before the edge tests. position and rotation test the ship somewhere
+        other than where it is now, as triangle() does.
+        """
+        hits = np.zeros(len(radii), dtype=bool)
+        if len(radii) == 0:
+            return hits
+        if position is None:
+            position = self.position
+        triangle = self.triangle(position, rotation)
+        position = np.array((position[0], position[1]))
+        offsets = centres - position
+        dist_sq = np.einsum('ij,ij->i', offsets, offsets)
+        reach = self.radius * 1.21 + radii
+        near = np.flatnonzero(dist_sq < reach * reach)
+        if len(near) == 0:
+            return hits
+
+        centres = centres[near]
+        radii_sq = radii[near] * radii[near]
+        # Ship centre inside the circle
+        touching = dist_sq[near] <= radii_sq
+        # Closest point on each edge of the triangle within the circle
+        points = np.array([(point.x, point.y) for point in triangle])
+        for i in range(3):
+            start = points[i]
+            edge = points[(i + 1) % 3] - start
+            length_sq = edge @ edge
+            if length_sq == 0:
+                continue
+            t = np.clip((centres - start) @ edge / length_sq, 0, 1)
+            closest = start + t[:, None] * edge
+            delta = closest - centres
+            touching |= np.einsum('ij,ij->i', delta, delta) <= radii_sq
+        hits[near] = touching
+        return hits
+
     def thrust(self, dt):
         # Apply acceleration in facing direction
         direction = pygame.Vector2(0, 1).rotate(self.rotation)
         self.velocity += direction * PLAYER_ACCELERATION * dt
         
         # Add thrust particles
-        if random.random() < 0.5:  # Only add particles sometimes for variation
+        # Only add particles sometimes for variation, and less often when
+        # the quality governor has turned particles down
+        if self.effects_rng.random() < 0.5 * self.quality.particle_scale:
             # Calculate thruster position (back of ship)
             back_pos = self.position - direction * self.radius
             spread = 20  # Spread angle in degrees
-            angle = self.rotation + 180 + random.uniform(-spread, spread)
-            speed = random.uniform(100, 200)
+            angle = self.rotation + 180 + self.effects_rng.uniform(-spread, spread)
+            speed = self.effects_rng.uniform(100, 200)
             vel = pygame.Vector2(0, 1).rotate(angle) * speed
             
-            self.thrust_particles.append({
-                'pos': back_pos.copy(),
-                'vel': vel,
-                'life': random.uniform(0.1, 0.3)
-            })
\ No newline at end of file
+            self.particle_system.emit([back_pos], [vel], [self.effects_rng.uniform(0.1, 0.3)], [1.5],
+                                      fade=THRUST_PARTICLE_FADE)
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""Scripted controllers for headless games.
+
+A policy is a callable taking (observation, rng) and returning the Actions
+for the next tick, where observation comes from HeadlessGame.observe() and
+rng is a random.Random owned by the caller.
+"""
+import importlib
+import math
+from inputs import Actions, NO_ACTIONS
+
+
+def idle(observation, rng):
+    """Sit still and do nothing"""
+    return NO_ACTIONS
+
+
+def spin_and_fire(observation, rng):
+    """Turn on the spot, firing constantly"""
+    return Actions(rotate_right=True, fire=True)
+
+
+def random_policy(observation, rng):
+    """Mash buttons at random"""
+    return Actions(*(rng.random() < 0.3 for _ in Actions._fields))
+
+
+def aim_at_nearest(observation, rng):
+    """Turn towards the nearest asteroid and fire once it is lined up"""
+    asteroids = observation['asteroids']
+    if len(asteroids) == 0:
+        return NO_ACTIONS
+    x, y, _, _, rotation, _ = observation['player']
+    offsets = asteroids[:, :2] - (x, y)
+    nearest = offsets[(offsets * offsets).sum(axis=1).argmin()]
+    # Ship forward is (0, 1) rotated by rotation degrees
+    angle = math.radians(rotation)
+    forward_x, forward_y = -math.sin(angle), math.cos(angle)
+    distance = math.hypot(nearest[0], nearest[1]) or 1.0
+    cross = forward_x * nearest[1] - forward_y * nearest[0]
+    dot = (forward_x * nearest[0] + forward_y * nearest[1]) / distance
+    return Actions(rotate_left=cross < 0, rotate_right=cross > 0, fire=dot > 0.97)
+
+
+POLICIES = {
+    'idle': idle,
+    'spin_and_fire': spin_and_fire,
+    'random': random_policy,
+    'aim': aim_at_nearest,
+}
+
+
+def resolve_policy(name: str):
+    """Look up a policy by registry name or as 'module:function'"""
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, sep, attribute = name.partition(":")
+    if not sep:
+        raise ValueError(f"unknown policy {name!r}; use one of {', '.join(POLICIES)} or module:function")
+    return getattr(importlib.import_module(module_name), attribute)
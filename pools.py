@@ -0,0 +1,52 @@
+class Pool:
+    """Free list of reusable game objects of one class.
+
+    acquire() hands back a released instance re-initialised with reset(...)
+    when one is available, and only constructs a new one otherwise.
+    Objects return themselves with release() once removed from the world.
+    """
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.hits = 0    # acquires served from the free list
+        self.misses = 0  # acquires that had to construct a new object
+        self.live = 0    # objects currently handed out
+
+    def acquire(self, *args):
+        self.live += 1
+        if self.free:
+            self.hits += 1
+            obj = self.free.pop()
+            obj.reset(*args)
+            return obj
+        self.misses += 1
+        return self.cls(*args)
+
+    def acquire_blank(self):
+        """Return a released instance as-is, or a new one without calling __init__.
+
+        For callers that set every field themselves, like savestate.restore().
+        """
+        self.live += 1
+        if self.free:
+            self.hits += 1
+            return self.free.pop()
+        self.misses += 1
+        return self.cls.__new__(self.cls)
+
+    def release(self, obj):
+        self.live -= 1
+        self.free.append(obj)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'live': self.live, 'free': len(self.free)}
+
+
+def pool_stats(game_objects):
+    """Pool counters for every pooled class in a world from reset_game()"""
+    stats = {name: pool.stats() for name, pool in game_objects['pools'].items()}
+    # Particles live in preallocated arrays, which already act as their pool
+    particles = game_objects['particles']
+    stats['particles'] = {'live': particles.count, 'capacity': len(particles.life)}
+    return stats
@@ -0,0 +1,165 @@
+import time
+import numpy as np
+import pygame
+from constants import PROFILER_HISTORY, FIXED_DT
+
+# Phases of a frame in main(), in the order they run
+PHASES = ("wait", "events", "update", "collision", "draw", "flip")
+# Entity counts recorded alongside every frame
+COUNTS = ("asteroids", "shots", "explosions", "particles")
+
+
+class FrameProfiler:
+    """Per-phase frame timer with a ring buffer of recent frames.
+
+    Call start_frame() at the top of the loop, lap(phase) after each phase
+    (time since the previous lap is added to that phase, so phases that run
+    several times per frame accumulate) and end_frame() at the bottom. While
+    disabled every call returns straight away.
+    """
+
+    def __init__(self, history: int = PROFILER_HISTORY, enabled: bool = False):
+        self.enabled = enabled
+        self.history = history
+        self.phase_index = {phase: i for i, phase in enumerate(PHASES)}
+        self.durations = np.zeros((history, len(PHASES)), dtype=np.int64)
+        self.starts = np.zeros(history, dtype=np.int64)
+        self.counts = np.zeros((history, len(COUNTS)), dtype=np.int64)
+        self.frames = 0  # total frames recorded
+        self.current = np.zeros(len(PHASES), dtype=np.int64)
+        self.frame_start = 0
+        self.last_lap = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        # Don't record the half frame we were switched on in
+        self.frame_start = 0
+
+    def start_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = self.last_lap = time.perf_counter_ns()
+        self.current[:] = 0
+
+    def lap(self, phase: str):
+        if not self.enabled or not self.frame_start:
+            return
+        now = time.perf_counter_ns()
+        self.current[self.phase_index[phase]] += now - self.last_lap
+        self.last_lap = now
+
+    def end_frame(self, game_objects=None):
+        if not self.enabled or self.frame_start == 0:
+            return
+        slot = self.frames % self.history
+        self.durations[slot] = self.current
+        self.starts[slot] = self.frame_start
+        if game_objects is not None:
+            self.counts[slot] = [len(game_objects[name]) for name in COUNTS]
+        self.frames += 1
+
+    def recent(self):
+        """Return (starts, durations, counts) for buffered frames, oldest first"""
+        n = min(self.frames, self.history)
+        order = (np.arange(n) + self.frames - n) % self.history
+        return self.starts[order], self.durations[order], self.counts[order]
+
+    def summary(self):
+        """Mean milliseconds per phase over the buffered frames"""
+        _, durations, _ = self.recent()
+        if len(durations) == 0:
+            return {phase: 0.0 for phase in PHASES}
+        means = durations.mean(axis=0) / 1e6
+        return dict(zip(PHASES, means.tolist()))
+
+    def write_csv(self, path: str):
+        # Imported here so startup doesn't pay for them until a dump
+        import csv
+        starts, durations, counts = self.recent()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame", "start_ns") + tuple(f"{phase}_ns" for phase in PHASES) + COUNTS)
+            first = self.frames - len(starts)
+            for i, (start, row, count) in enumerate(zip(starts, durations, counts)):
+                writer.writerow([first + i, int(start)] + row.tolist() + count.tolist())
+
+    def write_chrome_trace(self, path: str):
+        """Write buffered frames in Chrome trace format (chrome://tracing, Perfetto)"""
+        import json
+        starts, durations, counts = self.recent()
+        events = []
+        origin = int(starts[0]) if len(starts) else 0
+        for start, row, count in zip(starts, durations, counts):
+            ts = (int(start) - origin) / 1000
+            total = int(row.sum()) / 1000
+            events.append({"name": "frame", "ph": "X", "ts": ts, "dur": total, "pid": 1, "tid": 1})
+            # Phases are laid out back to back in loop order
+            offset = ts
+            for phase, duration in zip(PHASES, row.tolist()):
+                events.append({"name": phase, "ph": "X", "ts": offset, "dur": duration / 1000,
+                               "pid": 1, "tid": 1})
+                offset += duration / 1000
+            events.append({"name": "entities", "ph": "C", "ts": ts, "pid": 1,
+                           "args": dict(zip(COUNTS, count.tolist()))})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def dump(self, prefix: str = "profile"):
+        """Write CSV and Chrome trace files side by side and return their paths"""
+        stem = f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.write_csv(stem + ".csv")
+        self.write_chrome_trace(stem + ".json")
+        return stem + ".csv", stem + ".json"
+
+
+class ProfilerOverlay:
+    """Frame-time graph, phase means and entity counts drawn over the game"""
+
+    WIDTH = 360
+    HEIGHT = 100
+    TEXT_REFRESH = 15  # frames between text updates, so the cache isn't churned
+
+    def __init__(self, profiler: FrameProfiler, text_cache, governor=None):
+        self.profiler = profiler
+        self.text_cache = text_cache
+        # Optional QualityGovernor whose state is shown under the counts
+        self.governor = governor
+        # Built on first draw, as most sessions never open the overlay
+        self.panel = None
+        self.lines = []
+
+    def draw(self, screen):
+        profiler = self.profiler
+        if not profiler.enabled:
+            return None
+        _, durations, counts = profiler.recent()
+        x0 = screen.get_width() - self.WIDTH - 10
+        y0 = 10
+
+        # Frame time graph; the full panel height is two simulation steps
+        if self.panel is None:
+            self.panel = pygame.Surface((self.WIDTH, self.HEIGHT), pygame.SRCALPHA)
+        self.panel.fill((0, 0, 0, 160))
+        budget = FIXED_DT * 1e9
+        if len(durations) > 1:
+            totals = durations.sum(axis=1)[-self.WIDTH:]
+            heights = np.minimum(totals / (budget * 2), 1.0) * self.HEIGHT
+            points = [(i, self.HEIGHT - h) for i, h in enumerate(heights.tolist())]
+            pygame.draw.lines(self.panel, "green", False, points)
+        pygame.draw.line(self.panel, "red", (0, self.HEIGHT / 2), (self.WIDTH, self.HEIGHT / 2))
+        rects = [screen.blit(self.panel, (x0, y0))]
+
+        if profiler.frames % self.TEXT_REFRESH == 0 or not self.lines:
+            summary = profiler.summary()
+            latest = counts[-1].tolist() if len(counts) else [0] * len(COUNTS)
+            self.lines = [" ".join(f"{phase} {summary[phase]:.1f}" for phase in PHASES[:3]),
+                          " ".join(f"{phase} {summary[phase]:.1f}" for phase in PHASES[3:]),
+                          " ".join(f"{name} {count}" for name, count in zip(COUNTS, latest))]
+            if self.governor is not None:
+                self.lines.append(self.governor.describe())
+        y = y0 + self.HEIGHT + 4
+        for line in self.lines:
+            surface = self.text_cache.render(line)
+            rects.append(screen.blit(surface, (x0, y)))
+            y += surface.get_height()
+        return rects
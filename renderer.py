@@ -0,0 +1,62 @@
+import pygame
+from constants import DIRTY_RECT_FULL_THRESHOLD
+
+
+class DirtyRectRenderer:
+    """Redraw and push only the parts of the screen that changed.
+
+    Every frame the areas drawn last frame are erased, everything is drawn
+    again, and only the union of last frame's and this frame's rects is sent
+    to the display with pygame.display.update(rects). When those rects cover
+    more than full_threshold of the screen a normal full flip is cheaper, so
+    that is used instead.
+    """
+
+    def __init__(self, screen, background="black", full_threshold: float = DIRTY_RECT_FULL_THRESHOLD):
+        self.screen = screen
+        self.background = background
+        self.full_threshold = full_threshold
+        self.screen_area = screen.get_width() * screen.get_height()
+        self.previous = []
+        self.current = []
+        self.full_redraw = True
+        # Counters for the last frame, for profiling
+        self.last_full = True
+        self.last_area = 0
+
+    def invalidate(self):
+        """Clear and push the whole screen next frame"""
+        self.full_redraw = True
+
+    def begin(self):
+        """Erase what was drawn last frame"""
+        if self.full_redraw:
+            self.screen.fill(self.background)
+        else:
+            fill = self.screen.fill
+            for rect in self.previous:
+                fill(self.background, rect)
+        self.current = []
+
+    def add(self, drawn):
+        """Record what a draw() call returned: None, a Rect or a list of Rects"""
+        if drawn is None:
+            return
+        if isinstance(drawn, list):
+            self.current.extend(drawn)
+        else:
+            self.current.append(drawn)
+
+    def present(self):
+        """Push this frame to the display"""
+        dirty = self.previous + self.current
+        area = sum(rect.width * rect.height for rect in dirty)
+        self.last_area = area
+        self.last_full = self.full_redraw or area > self.full_threshold * self.screen_area
+        if self.last_full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        self.previous = self.current
+        self.current = []
+        self.full_redraw = False
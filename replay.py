@@ -0,0 +1,242 @@
+"""Input recording and deterministic replay.
+
+A recording is the world seed plus one byte of control bits per simulation
+step, run-length encoded, and a 4-byte state hash every REPLAY_HASH_INTERVAL
+steps. Replaying feeds the bits back through a fresh reset_game() world as
+fast as possible and checks the hashes. The interval is 1 by default, so a
+divergence is reported at the exact step it first shows up in; with a
+longer one it is reported at the first hashed step after that.
+
+    python replay.py session.bsr --render-every 60
+"""
+import argparse
+import struct
+import sys
+import time
+import zlib
+from array import array
+import pygame
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, FIXED_DT, SIMULATION_RATE, REPLAY_HASH_INTERVAL
+from inputs import Actions, NO_ACTIONS
+from main import reset_game, update_game, draw_game
+
+MAGIC = b"BSRP"
+# Bumped whenever state_hash() changes, since older hashes no longer match
+VERSION = 3
+# magic, version, seed, simulation rate, hash interval, tick count; then
+# the input runs and the hashes, which fall on every hash interval
+HEADER = struct.Struct("<4sBQHHI")
+RUN = struct.Struct("<BH")
+
+
+class ReplayDivergence(Exception):
+    """Raised when a replayed world stops matching the recording"""
+
+    def __init__(self, tick: int, expected: int, actual: int):
+        super().__init__(f"replay diverged at tick {tick}: expected hash {expected:08x}, got {actual:08x}")
+        self.tick = tick
+        self.expected = expected
+        self.actual = actual
+
+
+def pack_actions(actions: Actions) -> int:
+    bits = 0
+    for i, pressed in enumerate(actions):
+        if pressed:
+            bits |= 1 << i
+    return bits
+
+
+def unpack_actions(bits: int) -> Actions:
+    return Actions(*(bool(bits >> i & 1) for i in range(len(Actions._fields))))
+
+
+def state_hash(game_objects) -> int:
+    """CRC32 over everything that determines how the simulation continues.
+
+    Explosions and particles only draw, from their own RNG, so they are
+    left out; so are entity ids, which keep counting across games.
+    """
+    crc = 0
+    asteroid_store = game_objects['asteroid_store']
+    shot_store = game_objects['shot_store']
+    for store in (asteroid_store, shot_store):
+        n = store.count
+        for values in (store.alive[:n], store.positions[:n], store.velocities[:n], store.radii[:n]):
+            crc = zlib.crc32(values.tobytes(), crc)
+    n = shot_store.count
+    crc = zlib.crc32(shot_store.ages[:n].tobytes(), crc)
+    crc = zlib.crc32(shot_store.travelled[:n].tobytes(), crc)
+    # Which slots get handed out next, and the group order collisions visit
+    crc = zlib.crc32(array('q', asteroid_store.free_slots + [shot_store.head]).tobytes(), crc)
+    for group in (game_objects['asteroids'], game_objects['shots']):
+        crc = zlib.crc32(array('q', [shape.slot for shape in group]).tobytes(), crc)
+    for player in game_objects['players']:
+        crc = zlib.crc32(struct.pack("<7d2i", player.position.x, player.position.y,
+                                     player.velocity.x, player.velocity.y, player.rotation,
+                                     player.shoot_timer, player.respawn_timer,
+                                     player.lives, player.is_vulnerable), crc)
+    crc = zlib.crc32(struct.pack("<d2q", game_objects['asteroid_field'].spawn_timer,
+                                 game_objects['score'], game_objects['asteroids_destroyed']), crc)
+    _, rng_state, _ = game_objects['rng'].getstate()
+    return zlib.crc32(array('I', rng_state).tobytes(), crc)
+
+
+class Recording:
+    """Seed, per-tick control bits and periodic state hashes for one game"""
+
+    def __init__(self, seed: int, hash_interval: int = REPLAY_HASH_INTERVAL):
+        self.seed = seed
+        self.hash_interval = hash_interval
+        self.inputs = bytearray()
+        self.checkpoints = {}  # tick -> state hash
+
+    def to_bytes(self) -> bytes:
+        # Controls are usually held for many ticks, so store (bits, run) pairs
+        runs = bytearray()
+        i = 0
+        while i < len(self.inputs):
+            bits = self.inputs[i]
+            j = i + 1
+            while j < len(self.inputs) and self.inputs[j] == bits and j - i < 0xFFFF:
+                j += 1
+            runs += RUN.pack(bits, j - i)
+            i = j
+        parts = [HEADER.pack(MAGIC, VERSION, self.seed, SIMULATION_RATE, self.hash_interval, len(self.inputs)),
+                 struct.pack("<I", len(runs) // RUN.size), bytes(runs),
+                 struct.pack("<I", len(self.checkpoints)),
+                 struct.pack(f"<{len(self.checkpoints)}I", *(value for _, value in sorted(self.checkpoints.items())))]
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Recording':
+        try:
+            return cls._parse(data)
+        except struct.error:
+            raise ValueError("truncated recording") from None
+
+    @classmethod
+    def _parse(cls, data: bytes) -> 'Recording':
+        magic, version, seed, rate, interval, ticks = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a bootsteroids recording")
+        if version != VERSION:
+            raise ValueError(f"recording format {version}, this build reads format {VERSION}")
+        if rate != SIMULATION_RATE:
+            raise ValueError(f"recorded at {rate} Hz, this build simulates at {SIMULATION_RATE} Hz")
+        recording = cls(seed, interval)
+        offset = HEADER.size
+        (run_count,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        for _ in range(run_count):
+            bits, length = RUN.unpack_from(data, offset)
+            recording.inputs += bytes([bits]) * length
+            offset += RUN.size
+        (checkpoint_count,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        values = struct.unpack_from(f"<{checkpoint_count}I", data, offset)
+        recording.checkpoints = {(i + 1) * interval: value for i, value in enumerate(values)}
+        if len(recording.inputs) != ticks:
+            raise ValueError("truncated recording")
+        return recording
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'Recording':
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class Recorder:
+    """Input source wrapper that records every read, one per simulation step.
+
+    Call end_tick() after each step so state hashes are taken.
+    """
+
+    def __init__(self, source, seed: int, hash_interval: int = REPLAY_HASH_INTERVAL):
+        self.source = source
+        self.recording = Recording(seed, hash_interval)
+        self.pending = NO_ACTIONS
+
+    def read(self) -> Actions:
+        self.pending = self.source.read()
+        return self.pending
+
+    def end_tick(self, game_objects):
+        recording = self.recording
+        recording.inputs.append(pack_actions(self.pending))
+        # Nothing is read once the ship is gone, so default back to no input
+        self.pending = NO_ACTIONS
+        tick = len(recording.inputs)
+        if tick % recording.hash_interval == 0:
+            recording.checkpoints[tick] = state_hash(game_objects)
+
+
+class Replayer:
+    """Input source that plays a recording back and verifies its hashes"""
+
+    def __init__(self, recording: Recording):
+        self.recording = recording
+        self.tick = 0
+
+    def read(self) -> Actions:
+        return unpack_actions(self.recording.inputs[self.tick])
+
+    def end_tick(self, game_objects):
+        self.tick += 1
+        expected = self.recording.checkpoints.get(self.tick)
+        if expected is not None:
+            actual = state_hash(game_objects)
+            if actual != expected:
+                raise ReplayDivergence(self.tick, expected, actual)
+
+
+def replay(recording: Recording, render_every: int = 0, on_frame=None):
+    """Run a recording to the end at full speed and return the final world.
+
+    When render_every is set, every Nth tick is drawn to an off-screen
+    surface and passed to on_frame(tick, surface) if given.
+    """
+    replayer = Replayer(recording)
+    game_objects = reset_game(replayer, recording.seed)
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)) if render_every else None
+    for tick in range(len(recording.inputs)):
+        update_game(game_objects, FIXED_DT)
+        replayer.end_tick(game_objects)
+        if screen is not None and (tick + 1) % render_every == 0:
+            screen.fill("black")
+            draw_game(screen, game_objects)
+            if on_frame is not None:
+                on_frame(tick + 1, screen)
+    return game_objects
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded game at full speed")
+    parser.add_argument("recording")
+    parser.add_argument("--render-every", type=int, default=0, help="draw every Nth tick off-screen")
+    args = parser.parse_args(argv)
+
+    try:
+        recording = Recording.load(args.recording)
+    except ValueError as error:
+        print(f"{args.recording}: {error}")
+        return 1
+    start = time.perf_counter()
+    try:
+        game_objects = replay(recording, args.render_every)
+    except ReplayDivergence as error:
+        print(error)
+        return 1
+    elapsed = time.perf_counter() - start
+    ticks = len(recording.inputs)
+    print(f"{ticks} ticks verified against {len(recording.checkpoints)} hashes in {elapsed:.2f}s "
+          f"({ticks * FIXED_DT / elapsed:.0f}x real time), final score {game_objects['score']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
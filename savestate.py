@@ -0,0 +1,335 @@
+"""Binary snapshots of the whole simulation, for rollback and seeking.
+
+A snapshot is one bytes object made of fixed-layout NumPy records: a
+header, both RNG states, one record per player, the used slots of the
+asteroid and shot stores, the asteroid, shot and explosion objects in
+group order, and the live particles. restore() writes it back into an
+existing world from reset_game() with the same number of players,
+reusing pooled objects, so stepping on from a restored world gives the
+same results as stepping on from the original.
+
+Snapshots are taken between steps, when the kill queue is empty.
+"""
+import numpy as np
+import pygame
+from constants import SAVESTATE_RING_SIZE
+from circleshape import CircleShape
+from asteroid import Asteroid
+from shot import Shot
+from explosion import Explosion
+
+MAGIC = b"BSWS"
+VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'), ('version', 'u1'), ('tick', '<u4'),
+    ('score', '<i8'), ('asteroids_destroyed', '<i8'), ('next_id', '<u8'), ('spawn_timer', '<f8'),
+    ('players', '<u2'), ('explosions', '<u4'), ('particles', '<u4'),
+    ('asteroids', '<u4'), ('asteroid_slots', '<u4'), ('asteroid_free', '<u4'),
+    ('shots', '<u4'), ('shot_slots', '<u4'), ('shot_head', '<u4'),
+])
+# random.Random.getstate() is (version, 624 words + position, gauss_next)
+RNG_DTYPE = np.dtype([('state', '<u4', 625), ('has_gauss', 'u1'), ('gauss', '<f8')])
+PLAYER_DTYPE = np.dtype([
+    ('entity_id', '<u8'), ('position', '<f8', 2), ('previous_position', '<f8', 2),
+    ('velocity', '<f8', 2), ('initial_position', '<f8', 2), ('rotation', '<f8'),
+    ('previous_rotation', '<f8'), ('shoot_timer', '<f8'), ('respawn_timer', '<f8'),
+    ('lives', '<i4'), ('is_vulnerable', 'u1'), ('thrusting', 'u1'),
+    ('updating', 'u1'), ('drawn', 'u1'),
+])
+SLOT_DTYPE = np.dtype([('position', '<f8', 2), ('previous_position', '<f8', 2),
+                       ('velocity', '<f8', 2), ('radius', '<f8'), ('alive', 'u1')])
+RING_SLOT_DTYPE = np.dtype(SLOT_DTYPE.descr + [('age', '<f8'), ('travelled', '<f8')])
+ASTEROID_DTYPE = np.dtype([('slot', '<u4'), ('entity_id', '<u8'), ('shape', 'u1')])
+SHOT_DTYPE = np.dtype([('slot', '<u4'), ('entity_id', '<u8')])
+EXPLOSION_DTYPE = np.dtype([('position', '<f8', 2), ('timer', '<f8')])
+PARTICLE_DTYPE = np.dtype([('position', '<f8', 2), ('velocity', '<f8', 2), ('life', '<f8'),
+                           ('fade', '<f8'), ('size', '<f8'), ('damping', '<f8')])
+
+
+def _capture_rng(rng):
+    record = np.zeros(1, RNG_DTYPE)
+    _, state, gauss = rng.getstate()
+    record['state'] = state
+    record['has_gauss'] = gauss is not None
+    record['gauss'] = gauss or 0.0
+    return record
+
+
+def _restore_rng(rng, record):
+    gauss = float(record['gauss']) if record['has_gauss'] else None
+    rng.setstate((3, tuple(record['state'].tolist()), gauss))
+
+
+def _capture_slots(store, dtype):
+    n = store.count
+    slots = np.empty(n, dtype)
+    slots['position'] = store.positions[:n]
+    slots['previous_position'] = store.previous_positions[:n]
+    slots['velocity'] = store.velocities[:n]
+    slots['radius'] = store.radii[:n]
+    slots['alive'] = store.alive[:n]
+    if 'age' in dtype.names:
+        slots['age'] = store.ages[:n]
+        slots['travelled'] = store.travelled[:n]
+    return slots
+
+
+def _restore_slots(store, slots):
+    n = len(slots)
+    while store.capacity < n:
+        store._grow()
+    store.count = n
+    store.positions[:n] = slots['position']
+    store.previous_positions[:n] = slots['previous_position']
+    store.render_positions[:n] = slots['position']
+    store.velocities[:n] = slots['velocity']
+    store.radii[:n] = slots['radius']
+    store.alive[:n] = slots['alive']
+    store.alive[n:] = False
+    store.velocities[n:] = 0
+    if 'age' in slots.dtype.names:
+        store.ages[:n] = slots['age']
+        store.travelled[:n] = slots['travelled']
+    store.owners[:] = [None] * store.capacity
+
+
+def capture(game_objects, tick: int = 0) -> bytes:
+    """Serialise everything that determines how the world continues"""
+    players = game_objects['players']
+    asteroids = game_objects['asteroids']
+    shots = game_objects['shots']
+    explosions = game_objects['explosions']
+    particles = game_objects['particles']
+    asteroid_store = game_objects['asteroid_store']
+    shot_store = game_objects['shot_store']
+
+    header = np.zeros(1, HEADER_DTYPE)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    header['tick'] = tick
+    header['score'] = game_objects['score']
+    header['asteroids_destroyed'] = game_objects['asteroids_destroyed']
+    header['next_id'] = CircleShape.next_id
+    header['spawn_timer'] = game_objects['asteroid_field'].spawn_timer
+    header['players'] = len(players)
+    header['explosions'] = len(explosions)
+    header['particles'] = particles.count
+    header['asteroids'] = len(asteroids)
+    header['asteroid_slots'] = asteroid_store.count
+    header['asteroid_free'] = len(asteroid_store.free_slots)
+    header['shots'] = len(shots)
+    header['shot_slots'] = shot_store.count
+    header['shot_head'] = shot_store.head
+
+    player_records = np.zeros(len(players), PLAYER_DTYPE)
+    updatable = game_objects['updatable']
+    drawable = game_objects['drawable']
+    for record, player in zip(player_records, players):
+        record['entity_id'] = player.entity_id
+        record['position'] = player.position
+        record['previous_position'] = player.previous_position
+        record['velocity'] = player.velocity
+        record['initial_position'] = player.initial_position
+        record['rotation'] = player.rotation
+        record['previous_rotation'] = player.previous_rotation
+        record['shoot_timer'] = player.shoot_timer
+        record['respawn_timer'] = player.respawn_timer
+        record['lives'] = player.lives
+        record['is_vulnerable'] = player.is_vulnerable
+        record['thrusting'] = player.thrusting
+        record['updating'] = player in updatable
+        record['drawn'] = player in drawable
+
+    asteroid_records = np.empty(len(asteroids), ASTEROID_DTYPE)
+    asteroid_records['slot'] = [a.slot for a in asteroids]
+    asteroid_records['entity_id'] = [a.entity_id for a in asteroids]
+    asteroid_records['shape'] = [a.shape for a in asteroids]
+    shot_records = np.empty(len(shots), SHOT_DTYPE)
+    shot_records['slot'] = [s.slot for s in shots]
+    shot_records['entity_id'] = [s.entity_id for s in shots]
+    explosion_records = np.empty(len(explosions), EXPLOSION_DTYPE)
+    explosion_records['position'] = np.array([tuple(e.position) for e in explosions]).reshape(-1, 2)
+    explosion_records['timer'] = [e.timer for e in explosions]
+
+    n = particles.count
+    particle_records = np.empty(n, PARTICLE_DTYPE)
+    particle_records['position'] = particles.positions[:n]
+    particle_records['velocity'] = particles.velocities[:n]
+    particle_records['life'] = particles.life[:n]
+    particle_records['fade'] = particles.fade[:n]
+    particle_records['size'] = particles.sizes[:n]
+    particle_records['damping'] = particles.damping[:n]
+
+    parts = (header, _capture_rng(game_objects['rng']), _capture_rng(game_objects['effects_rng']),
+             player_records, _capture_slots(asteroid_store, SLOT_DTYPE),
+             np.array(asteroid_store.free_slots, '<u4'), asteroid_records,
+             _capture_slots(shot_store, RING_SLOT_DTYPE), shot_records, explosion_records, particle_records)
+    return b"".join(part.tobytes() for part in parts)
+
+
+def snapshot_tick(data: bytes) -> int:
+    return int(np.frombuffer(data, HEADER_DTYPE, 1)[0]['tick'])
+
+
+def _new_object(cls):
+    if cls.pool is not None:
+        return cls.pool.acquire_blank()
+    return cls.__new__(cls)
+
+
+def _drop_objects(objects, cls):
+    """Take objects out of their containers without touching the stores"""
+    for obj in list(objects):
+        for container in cls.containers:
+            container.discard(obj)
+        if cls.pool is not None:
+            cls.pool.release(obj)
+
+
+def _restore_stored(group, cls, store, slots, entity_ids):
+    """Rebind group to the given store slots, in order.
+
+    Objects whose entity id is still present are kept as they are, so
+    rolling back a few steps only touches what changed in between.
+    """
+    existing = {obj.entity_id: obj for obj in group}
+    ordered = []
+    owners = store.owners
+    for slot, entity_id in zip(slots.tolist(), entity_ids.tolist()):
+        obj = existing.pop(entity_id, None)
+        if obj is None:
+            obj = _new_object(cls)
+            obj.entity_id = entity_id
+            for container in cls.containers:
+                if container is not group:
+                    container.add(obj)
+        obj.store = store
+        obj.slot = slot
+        obj.alive = True
+        owners[slot] = obj
+        ordered.append(obj)
+    _drop_objects(existing.values(), cls)
+    group.assign(ordered)
+    return ordered
+
+
+def restore(game_objects, data: bytes) -> int:
+    """Put a world back into the state captured in data; returns its tick"""
+    offset = 0
+
+    def read(dtype, count=1):
+        nonlocal offset
+        records = np.frombuffer(data, dtype, count, offset)
+        offset += records.nbytes
+        return records
+
+    header = read(HEADER_DTYPE)[0]
+    if header['magic'] != MAGIC or header['version'] != VERSION:
+        raise ValueError("not a world snapshot of this version")
+    players = game_objects['players']
+    if header['players'] != len(players):
+        raise ValueError(f"snapshot has {header['players']} players, world has {len(players)}")
+
+    _restore_rng(game_objects['rng'], read(RNG_DTYPE)[0])
+    _restore_rng(game_objects['effects_rng'], read(RNG_DTYPE)[0])
+    game_objects['score'] = int(header['score'])
+    game_objects['asteroids_destroyed'] = int(header['asteroids_destroyed'])
+    game_objects['asteroid_field'].spawn_timer = float(header['spawn_timer'])
+    CircleShape.next_id = int(header['next_id'])
+    game_objects['kill_queue'].pending = []
+
+    updatable = game_objects['updatable']
+    drawable = game_objects['drawable']
+    for record, player in zip(read(PLAYER_DTYPE, len(players)), players):
+        player.entity_id = int(record['entity_id'])
+        player.position = pygame.Vector2(*record['position'])
+        player.previous_position = pygame.Vector2(*record['previous_position'])
+        player.render_position = player.position.copy()
+        player.velocity = pygame.Vector2(*record['velocity'])
+        player.initial_position = pygame.Vector2(*record['initial_position'])
+        player.rotation = float(record['rotation'])
+        player.previous_rotation = float(record['previous_rotation'])
+        player.render_rotation = player.rotation
+        player.shoot_timer = float(record['shoot_timer'])
+        player.respawn_timer = float(record['respawn_timer'])
+        player.lives = int(record['lives'])
+        player.is_vulnerable = bool(record['is_vulnerable'])
+        player.thrusting = bool(record['thrusting'])
+        for group, member in ((updatable, record['updating']), (drawable, record['drawn'])):
+            if member:
+                group.add(player)
+            else:
+                group.discard(player)
+
+    store = game_objects['asteroid_store']
+    _restore_slots(store, read(SLOT_DTYPE, int(header['asteroid_slots'])))
+    store.free_slots = read('<u4', int(header['asteroid_free'])).tolist()
+    records = read(ASTEROID_DTYPE, int(header['asteroids']))
+    asteroids = _restore_stored(game_objects['asteroids'], Asteroid, store, records['slot'], records['entity_id'])
+    for asteroid, shape in zip(asteroids, records['shape'].tolist()):
+        asteroid.shape = shape
+
+    store = game_objects['shot_store']
+    _restore_slots(store, read(RING_SLOT_DTYPE, int(header['shot_slots'])))
+    store.head = int(header['shot_head'])
+    records = read(SHOT_DTYPE, int(header['shots']))
+    _restore_stored(game_objects['shots'], Shot, store, records['slot'], records['entity_id'])
+
+    # Explosions have no identity worth keeping; rebuild them all
+    _drop_objects(game_objects['explosions'], Explosion)
+
+    records = read(EXPLOSION_DTYPE, int(header['explosions']))
+    for position, timer in zip(records['position'].tolist(), records['timer'].tolist()):
+        explosion = _new_object(Explosion)
+        explosion.position = pygame.Vector2(position)
+        explosion.timer = timer
+        explosion.alive = True
+        for container in Explosion.containers:
+            container.add(explosion)
+
+    records = read(PARTICLE_DTYPE, int(header['particles']))
+    particles = game_objects['particles']
+    n = len(records)
+    particles.count = 0
+    particles._reserve(n)
+    particles.positions[:n] = records['position']
+    particles.velocities[:n] = records['velocity']
+    particles.life[:n] = records['life']
+    particles.fade[:n] = records['fade']
+    particles.sizes[:n] = records['size']
+    particles.damping[:n] = records['damping']
+    particles.count = n
+    return int(header['tick'])
+
+
+class SnapshotRing:
+    """The most recent world snapshots, one per tick, for rollback"""
+
+    def __init__(self, capacity: int = SAVESTATE_RING_SIZE):
+        self.capacity = capacity
+        self.entries = [None] * capacity  # (tick, data)
+
+    def save(self, game_objects, tick: int) -> bytes:
+        data = capture(game_objects, tick)
+        self.entries[tick % self.capacity] = (tick, data)
+        return data
+
+    def get(self, tick: int):
+        """The snapshot taken at tick, or None once it has been overwritten"""
+        entry = self.entries[tick % self.capacity]
+        return entry[1] if entry is not None and entry[0] == tick else None
+
+    def oldest(self):
+        ticks = [entry[0] for entry in self.entries if entry is not None]
+        return min(ticks) if ticks else None
+
+    def rollback(self, game_objects, tick: int) -> int:
+        """Restore the world to how it was at tick and forget anything later"""
+        data = self.get(tick)
+        if data is None:
+            raise KeyError(f"no snapshot for tick {tick}; oldest is {self.oldest()}")
+        for i, entry in enumerate(self.entries):
+            if entry is not None and entry[0] > tick:
+                self.entries[i] = None
+        return restore(game_objects, data)
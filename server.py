@@ -0,0 +1,244 @@
+"""Authoritative game server for LAN play.
+
+The server runs the only copy of the world, headless, at SIMULATION_RATE.
+Clients (client.py) connect over TCP, send their controls whenever they
+change and get a delta-compressed snapshot every NET_SNAPSHOT_INTERVAL
+steps (see netcode.py). Each player slot has its own ship; ships of players
+who have not joined just sit still. A client that stops reading is skipped
+until its socket drains, and dropped if it stays stalled.
+
+    python server.py --port 7777
+    python server.py --bench 10    # bots on localhost; reports bandwidth and tick cost
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import deque
+import numpy as np
+from constants import (FIXED_DT, SIMULATION_RATE, MAX_STEPS_PER_FRAME, NET_PORT, NET_MAX_PLAYERS,
+                       NET_SNAPSHOT_INTERVAL, NET_RESTART_DELAY, NET_SEND_BUFFER_LIMIT, NET_STALL_TIMEOUT)
+from inputs import ScriptedInput, NO_ACTIONS
+from collision import SpatialHash
+from main import reset_game, update_game
+import netcode
+
+
+class Connection:
+    """One connected client and what has been sent to it"""
+
+    def __init__(self, player_index: int, writer):
+        self.player_index = player_index
+        self.writer = writer
+        # The last state sent, which the next snapshot is a delta against
+        self.baseline = netcode.empty_state()
+        self.bytes_sent = 0
+        self.snapshots = 0
+        self.skipped = 0
+        self.connected_at = time.perf_counter()
+        # When the client last fell behind, while it still is
+        self.stalled_since = None
+
+    def send(self, data: bytes):
+        self.writer.write(data)
+        self.bytes_sent += len(data)
+
+    def congested(self) -> bool:
+        """True while more than NET_SEND_BUFFER_LIMIT bytes wait to go out"""
+        return self.writer.transport.get_write_buffer_size() > NET_SEND_BUFFER_LIMIT
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.connected_at
+        return {
+            'bytes_sent': self.bytes_sent,
+            'snapshots': self.snapshots,
+            'bytes_per_second': self.bytes_sent / elapsed if elapsed > 0 else 0.0,
+            'bytes_per_snapshot': self.bytes_sent / self.snapshots if self.snapshots else 0.0,
+            'skipped': self.skipped,
+        }
+
+
+class GameServer:
+    """Steps the world on the event loop and streams it to connected clients"""
+
+    def __init__(self, max_players: int = NET_MAX_PLAYERS, seed=None,
+                 snapshot_interval: int = NET_SNAPSHOT_INTERVAL):
+        self.inputs = [ScriptedInput() for _ in range(max_players)]
+        self.snapshot_interval = snapshot_interval
+        self.connections = {}  # player index -> Connection
+        self.handlers = set()  # tasks serving each connection
+        self.grids = (SpatialHash(), SpatialHash())
+        # The tick count keeps running across games so clients can
+        # interpolate straight through a restart
+        self.tick = 0
+        # Cost of the last minute of steps and snapshot broadcasts
+        self.step_ms = deque(maxlen=SIMULATION_RATE * 60)
+        self.broadcast_ms = deque(maxlen=SIMULATION_RATE * 60)
+        self.server = None
+        self.simulation = None
+        self.new_game(seed)
+
+    def new_game(self, seed=None):
+        self.game_objects = reset_game(self.inputs, seed)
+        self.game_over = False
+        self.restart_tick = None
+
+    async def start(self, host: str = "0.0.0.0", port: int = NET_PORT) -> int:
+        """Start listening and simulating; returns the port actually bound"""
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        self.simulation = asyncio.create_task(self.run_simulation())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.simulation.cancel()
+        self.server.close()
+        for connection in list(self.connections.values()):
+            connection.writer.close()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def handle_client(self, reader, writer):
+        free = [i for i in range(len(self.inputs)) if i not in self.connections]
+        if not free:
+            writer.close()
+            return
+        index = free[0]
+        connection = Connection(index, writer)
+        self.connections[index] = connection
+        self.handlers.add(asyncio.current_task())
+        connection.send(netcode.encode_welcome(index, SIMULATION_RATE, self.snapshot_interval))
+        try:
+            while True:
+                message_type, body = await netcode.read_message(reader)
+                if message_type == netcode.MSG_INPUT:
+                    self.inputs[index].set(netcode.decode_input(body))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.inputs[index].set(NO_ACTIONS)
+            del self.connections[index]
+            self.handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def run_simulation(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            self.step()
+            next_tick += FIXED_DT
+            delay = next_tick - loop.time()
+            if delay < -MAX_STEPS_PER_FRAME * FIXED_DT:
+                # Too far behind; drop the backlog rather than spiral
+                next_tick = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+
+    def step(self):
+        """Advance one simulation step and send a snapshot when one is due"""
+        start = time.perf_counter()
+        if not self.game_over:
+            self.game_over = update_game(self.game_objects, FIXED_DT, grids=self.grids)
+            if self.game_over:
+                self.restart_tick = self.tick + round(NET_RESTART_DELAY * SIMULATION_RATE)
+        elif self.tick >= self.restart_tick:
+            self.new_game()
+        self.tick += 1
+        self.step_ms.append((time.perf_counter() - start) * 1000)
+        if self.tick % self.snapshot_interval == 0 and self.connections:
+            self.broadcast()
+
+    def broadcast(self):
+        start = time.perf_counter()
+        state = netcode.capture(self.game_objects, self.tick, self.game_over)
+        for connection in self.connections.values():
+            if connection.writer.is_closing():
+                continue  # dropped; handle_client has not cleaned up yet
+            if connection.congested():
+                # Skipping is safe: the next delta is against the last
+                # snapshot actually sent, so the client catches up in one
+                if connection.stalled_since is None:
+                    connection.stalled_since = start
+                elif start - connection.stalled_since > NET_STALL_TIMEOUT:
+                    # Discard what is queued; handle_client sees the
+                    # connection close and frees the slot
+                    connection.writer.transport.abort()
+                connection.skipped += 1
+                continue
+            connection.stalled_since = None
+            connection.send(netcode.encode_snapshot(connection.baseline, state))
+            connection.baseline = state
+            connection.snapshots += 1
+        self.broadcast_ms.append((time.perf_counter() - start) * 1000)
+
+    def stats(self):
+        step_ms = np.array(self.step_ms)
+        broadcast_ms = np.array(self.broadcast_ms)
+        return {
+            'ticks': self.tick,
+            'step_ms_mean': float(step_ms.mean()) if len(step_ms) else 0.0,
+            'step_ms_p95': float(np.percentile(step_ms, 95)) if len(step_ms) else 0.0,
+            'broadcast_ms_mean': float(broadcast_ms.mean()) if len(broadcast_ms) else 0.0,
+            'broadcast_ms_p95': float(np.percentile(broadcast_ms, 95)) if len(broadcast_ms) else 0.0,
+            'clients': {index: connection.stats() for index, connection in self.connections.items()},
+        }
+
+
+async def bench(seconds: float, policy_name: str = "aim", seed: int = 0):
+    """Run a server on localhost with a bot in every player slot"""
+    # Imported here because client is only needed for the bots
+    from client import run_bot
+    from policies import resolve_policy
+    server = GameServer(seed=seed)
+    port = await server.start("127.0.0.1", 0)
+    policy = resolve_policy(policy_name)
+    bots = [asyncio.create_task(run_bot("127.0.0.1", port, policy, seconds, seed + i))
+            for i in range(len(server.inputs))]
+    # Read the server side before the bots hang up
+    await asyncio.sleep(seconds - FIXED_DT * 2)
+    stats = server.stats()
+    clients = await asyncio.gather(*bots)
+    await server.close()
+    return stats, clients
+
+
+def print_stats(stats):
+    print(f"{stats['ticks']} ticks  step {stats['step_ms_mean']:.3f}ms (p95 {stats['step_ms_p95']:.3f}ms)  "
+          f"broadcast {stats['broadcast_ms_mean']:.3f}ms (p95 {stats['broadcast_ms_p95']:.3f}ms)")
+    for index, client in stats['clients'].items():
+        print(f"  player {index + 1}: {client['bytes_per_second'] / 1024:.2f} kB/s, "
+              f"{client['snapshots']} snapshots, {client['bytes_per_snapshot']:.0f} bytes each")
+
+
+async def serve(host: str, port: int, seed=None):
+    server = GameServer(seed=seed)
+    port = await server.start(host, port)
+    print(f"Listening on {host}:{port}")
+    while True:
+        await asyncio.sleep(10)
+        print_stats(server.stats())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an authoritative Bootsteroids server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=NET_PORT)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--bench", type=float, metavar="SECONDS",
+                        help="run bots against a localhost server for this long and report")
+    parser.add_argument("--policy", default="aim", help="policy the --bench bots play with")
+    args = parser.parse_args(argv)
+    if args.bench:
+        stats, clients = asyncio.run(bench(args.bench, args.policy, args.seed or 0))
+        print_stats(stats)
+        for client in clients:
+            print(f"  player {client.player_index + 1} received {client.bytes_received} bytes, "
+                  f"final score {client.state.score}")
+        return 0
+    try:
+        asyncio.run(serve(args.host, args.port, args.seed))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
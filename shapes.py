@@ -0,0 +1,80 @@
+import math
+import random
+import pygame
+from constants import ASTEROID_MIN_RADIUS, ASTEROID_KINDS, ASTEROID_SHAPE_VARIANTS
+
+
+class ShapeLibrary:
+    """Fixed pool of lumpy asteroid outlines, rendered once and reused.
+
+    Each radius class (1..ASTEROID_KINDS) gets ASTEROID_SHAPE_VARIANTS
+    outlines stored as unit-radius vertex lists. Sprites are drawn lazily the
+    first time a (kind, variant, radius) combination is needed; radii are
+    whole pixels no bigger than ASTEROID_MAX_RADIUS, so the cache is bounded.
+    """
+
+    def __init__(self, variants: int = ASTEROID_SHAPE_VARIANTS, seed: int = 0):
+        self.variants = variants
+        self.seed = seed
+        self._outlines = None
+        self.sprites = {}
+
+    @property
+    def outlines(self):
+        # Built on first use so importing asteroid stays cheap. The outlines
+        # come from their own RNG so the pool is the same every run.
+        if self._outlines is None:
+            rng = random.Random(self.seed)
+            self._outlines = {kind: [self._make_outline(rng) for _ in range(self.variants)]
+                              for kind in range(1, ASTEROID_KINDS + 1)}
+        return self._outlines
+
+    @staticmethod
+    def _make_outline(rng):
+        vertices = []
+        num_vertices = rng.randint(8, 12)
+        for i in range(num_vertices):
+            angle = (i / num_vertices) * 2 * math.pi
+            # Vary radius between 0.8 and 1.2 of original radius
+            dist = rng.uniform(0.8, 1.2)
+            vertices.append((math.cos(angle) * dist, math.sin(angle) * dist))
+        return vertices
+
+    @staticmethod
+    def kind_of(radius: float) -> int:
+        """Radius class of an asteroid, 1 for the smallest"""
+        return min(ASTEROID_KINDS, max(1, math.ceil(radius / ASTEROID_MIN_RADIUS)))
+
+    def vertices(self, radius: float, variant: int):
+        """Outline vertices for an asteroid of this radius, relative to its centre"""
+        outline = self.outlines[self.kind_of(radius)][variant]
+        return [(x * radius, y * radius) for x, y in outline]
+
+    def sprite(self, radius: float, variant: int, detail: float = 1.0, width: int = 2):
+        """Return (surface, half_size) for this outline at this radius.
+
+        detail is the fraction of outline vertices kept (0 draws a plain
+        circle) and width the line width; both come from RenderQuality.
+        """
+        radius = int(round(radius))
+        key = (radius, variant, detail, width)
+        entry = self.sprites.get(key)
+        if entry is None:
+            entry = self._render(radius, variant, detail, width)
+            self.sprites[key] = entry
+        return entry
+
+    def _render(self, radius: int, variant: int, detail: float, width: int):
+        # Outlines reach 1.2 radii out, plus room for the line width
+        half = math.ceil(radius * 1.2) + 2
+        surface = pygame.Surface((half * 2, half * 2), pygame.SRCALPHA)
+        if detail <= 0:
+            pygame.draw.circle(surface, "white", (half, half), radius, width)
+            return surface, half
+        vertices = self.vertices(radius, variant)
+        keep = max(3, round(len(vertices) * detail))
+        vertices = [vertices[i * len(vertices) // keep] for i in range(keep)]
+        points = [(half + x, half + y) for x, y in vertices]
+        points.append(points[0])
+        pygame.draw.lines(surface, "white", False, points, width)
+        return surface, half
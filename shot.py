@@ -1,16 +1,24 @@
 import pygame
-from circleshape import CircleShape
-from constants import SHOT_RADIUS
+from entitystore import StoredShape, RingStore
+from constants import SHOT_RADIUS, SHOT_LIFETIME, SHOT_RANGE, MAX_SHOTS
 
-class Shot(CircleShape):
+class Shot(StoredShape):
+    __slots__ = ()
     # Static containers will be set from main.py
     containers = []
+
+    @classmethod
+    def create_store(cls):
+        # Shots fly straight off the screen instead of wrapping, expire,
+        # and live in a bounded ring so they can never pile up
+        return RingStore(MAX_SHOTS, lifetime=SHOT_LIFETIME, max_range=SHOT_RANGE)
     
     def __init__(self, x: int, y: int):
         super().__init__(x, y, SHOT_RADIUS)
+
+    def reset(self, x: int, y: int, radius: int = SHOT_RADIUS):
+        super().reset(x, y, radius)
     
     def draw(self, screen):
-        pygame.draw.circle(screen, "white", self.position, self.radius)
-    
-    def update(self, dt):
-        self.position += self.velocity * dt 
\ No newline at end of file
+        return pygame.draw.circle(screen, "white", self.store.render_positions[self.slot], self.radius)
+ 
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""Fast launch and a time-to-first-frame report.
+
+Most of the time to the first frame goes on imports. Launching through
+this module imports pygame without pkg_resources, which pygame only tries
+as an optional way to find its bundled font, and then runs main.main().
+main() brings up only the display (with the event queue) and font
+subsystems and builds fonts, outlines and overlays on first use.
+
+    python startup.py                      # play
+    python startup.py --report             # time launches to the first frame and exit
+    python startup.py --report --output startup.json
+"""
+import time
+
+# As close to process start as this module can get
+LAUNCHED = time.perf_counter()
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Top-level packages reported on their own in the import breakdown
+PACKAGES = ("pygame", "numpy", "pkg_resources")
+
+
+def import_pygame():
+    """Import pygame without pulling in pkg_resources, and without the banner"""
+    if "pygame" in sys.modules:
+        return sys.modules["pygame"]
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    # A None entry makes the import raise ImportError, which pygame.pkgdata
+    # handles by reading its files straight from the package directory
+    blocked = "pkg_resources" not in sys.modules
+    if blocked:
+        sys.modules["pkg_resources"] = None
+    try:
+        import pygame
+    finally:
+        if blocked:
+            del sys.modules["pkg_resources"]
+    return pygame
+
+
+def init_subsystems():
+    """Start the pygame subsystems the game uses.
+
+    pygame.init() would also start audio, joysticks and the rest, which the
+    game never touches. The display subsystem brings the event queue with it.
+    """
+    pygame = import_pygame()
+    pygame.display.init()
+    pygame.font.init()
+
+
+class PhaseTimer:
+    """Wall-clock milliseconds of consecutive startup phases"""
+
+    def __init__(self, start: float = None):
+        self.last = time.perf_counter() if start is None else start
+        self.phases = {}
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = (now - self.last) * 1000
+        self.last = now
+
+
+def first_frame(standard_import: bool = False):
+    """Start the game, present one frame and return the phase timings"""
+    timer = PhaseTimer(LAUNCHED)
+    if standard_import:
+        import pygame
+    else:
+        import_pygame()
+    timer.lap("import pygame")
+    import main
+    timer.lap("import game")
+    return {**timer.phases, **main.main(first_frame_only=True)}
+
+
+def import_breakdown(importtime_log: str):
+    """Self time in ms per package from -X importtime output.
+
+    The game's own modules are grouped as "game" and everything else that
+    is not in PACKAGES as "other".
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    game = {name[:-3] for name in os.listdir(here) if name.endswith(".py")}
+    totals = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        root = fields[2].strip().split(".")[0]
+        group = "game" if root in game else root if root in PACKAGES else "other"
+        totals[group] = totals.get(group, 0.0) + int(fields[0]) / 1000
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def measure(standard_import: bool = False):
+    """Launch a fresh interpreter up to the first frame and report where the time went"""
+    command = [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--first-frame"]
+    if standard_import:
+        command.append("--standard-import")
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    return {
+        'wall_ms': wall_ms,
+        'phases': json.loads(result.stdout.strip().splitlines()[-1]),
+        'imports': import_breakdown(result.stderr),
+    }
+
+
+def print_report(name: str, report):
+    phases = report['phases']
+    print(f"{name}: {sum(phases.values()):.1f}ms to first frame in-process, "
+          f"{report['wall_ms']:.1f}ms wall clock including interpreter start and exit")
+    for phase, ms in phases.items():
+        print(f"  {phase:<14}{ms:8.1f}ms")
+    print("  imports by package (self time): " +
+          ", ".join(f"{group} {ms:.1f}ms" for group, ms in report['imports'].items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Launch Bootsteroids quickly, or report startup time")
+    parser.add_argument("--report", action="store_true",
+                        help="time the fast and the standard launch up to the first frame")
+    parser.add_argument("--output", help="with --report, also write the results to this JSON file")
+    parser.add_argument("--first-frame", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--standard-import", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.first_frame:
+        # Child process of --report; the timings go back on the last line
+        print(json.dumps(first_frame(args.standard_import)))
+        return 0
+
+    if args.report:
+        results = {'fast': measure(), 'standard': measure(standard_import=True)}
+        print_report("fast launch", results['fast'])
+        print_report("standard pygame import", results['standard'])
+        print("(-X importtime adds its own overhead to the import phases)")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        return 0
+
+    import_pygame()
+    import main as game
+    game.main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
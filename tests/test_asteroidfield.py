@@ -0,0 +1,36 @@
+from constants import ASTEROID_SPAWN_DELAY, FIXED_DT, LARGE_WORLD_SCREENS, SCREEN_WIDTH, SCREEN_HEIGHT
+from main import reset_game, update_objects
+
+SCREENS = LARGE_WORLD_SCREENS
+
+
+def spawn_once(world_size=None):
+    """Asteroid positions after the first spawn, with nothing else moving"""
+    game_objects = reset_game(seed=0, world_size=world_size)
+    game_objects['asteroid_field'].update(ASTEROID_SPAWN_DELAY)
+    return [asteroid.position for asteroid in game_objects['asteroids']]
+
+
+def test_one_screen_spawns_at_the_edge():
+    (position,) = spawn_once()
+    assert position.x in (0, SCREEN_WIDTH) or position.y in (0, SCREEN_HEIGHT)
+
+
+def test_large_world_spawns_in_every_screen():
+    positions = spawn_once((SCREEN_WIDTH * SCREENS, SCREEN_HEIGHT * SCREENS))
+    assert len(positions) == SCREENS * SCREENS
+    # One on the edge of each screen-sized tile, so the player's view fills
+    # up as fast as the single screen does
+    for col in range(SCREENS):
+        for row in range(SCREENS):
+            assert any(col * SCREEN_WIDTH <= p.x <= (col + 1) * SCREEN_WIDTH and
+                       row * SCREEN_HEIGHT <= p.y <= (row + 1) * SCREEN_HEIGHT for p in positions)
+    for p in positions:
+        assert p.x % SCREEN_WIDTH == 0 or p.y % SCREEN_HEIGHT == 0
+
+
+def test_spawn_rate_scales_with_area():
+    game_objects = reset_game(seed=0, world_size=(SCREEN_WIDTH * 2, SCREEN_HEIGHT * 3))
+    for _ in range(round(3 * ASTEROID_SPAWN_DELAY / FIXED_DT) + 3):
+        update_objects(game_objects, FIXED_DT)
+    assert len(game_objects['asteroids']) == 3 * 6
@@ -0,0 +1,25 @@
+import pytest
+from batch import GameSpec, play_game
+
+
+def test_fixed_dt_override_steps_with_it():
+    result = play_game(GameSpec(1, 'aim', (('FIXED_DT', 0.05),), 10.0))
+    assert result['frames'] == 200
+    assert result['survival_time'] == pytest.approx(10.0)
+
+
+@pytest.mark.parametrize("overrides", [
+    (('SHOT_RADIUS', 3),),            # an argument default in shot.py
+    (('ASTEROID_MIN_RADIUS', 10),),   # ASTEROID_MAX_RADIUS is derived from it
+    (('SIMULATION_RATE', 30),),       # and FIXED_DT from this
+    # The rest of the list in batch.py's docstring and --sweep help
+    (('ASTEROID_MIN_RADIUS', 10), ('ASTEROID_MAX_RADIUS', 30)),
+    (('ASTEROID_KINDS', 4),),
+    (('ASTEROID_SHAPE_VARIANTS', 4),),
+    (('VIEW_MARGIN', 0),),
+    (('WORLD_WIDTH', 640),),
+    (('SCREEN_HEIGHT', 360), ('WORLD_HEIGHT', 360)),
+])
+def test_overrides_that_cannot_take_effect_are_rejected(overrides):
+    with pytest.raises(ValueError):
+        play_game(GameSpec(1, 'aim', overrides, 1.0))
@@ -0,0 +1,69 @@
+import random
+import pytest
+from constants import FIXED_DT
+from inputs import Actions, ScriptedInput
+from main import reset_game, update_game
+from replay import HEADER, Recorder, Recording, ReplayDivergence, replay, state_hash
+
+SEED = 1234
+
+
+def record(ticks: int = 300) -> Recording:
+    source = ScriptedInput()
+    recorder = Recorder(source, SEED)
+    game_objects = reset_game(recorder, SEED)
+    rng = random.Random(0)
+    for _ in range(ticks):
+        source.set(Actions(*(rng.random() < 0.5 for _ in Actions._fields)))
+        update_game(game_objects, FIXED_DT)
+        recorder.end_tick(game_objects)
+    return recorder.recording
+
+
+def test_round_trip_replays_to_the_same_world():
+    recording = record()
+    data = recording.to_bytes()
+    loaded = Recording.from_bytes(data)
+    assert loaded.inputs == recording.inputs
+    assert loaded.checkpoints == recording.checkpoints
+    assert len(loaded.checkpoints) == len(recording.inputs)
+    replay(loaded)
+
+
+@pytest.mark.parametrize("index", [10, 137])
+def test_divergence_is_reported_at_its_tick(index):
+    recording = Recording.from_bytes(record().to_bytes())
+    # Any change of turning changes the ship on that very step
+    turning = recording.inputs[index] & 0b11
+    recording.inputs[index] ^= 0b11 if turning in (0b01, 0b10) else 0b01
+    with pytest.raises(ReplayDivergence) as error:
+        replay(recording)
+    assert error.value.tick == index + 1
+
+
+@pytest.mark.parametrize("cut", [0, 3, HEADER.size, HEADER.size + 6, -2])
+def test_truncated_recordings_are_rejected(cut):
+    data = record(60).to_bytes()
+    with pytest.raises(ValueError):
+        Recording.from_bytes(data[:cut])
+
+
+def test_older_formats_are_rejected():
+    data = bytearray(record(60).to_bytes())
+    data[4] = 2
+    with pytest.raises(ValueError):
+        Recording.from_bytes(bytes(data))
+
+
+@pytest.mark.parametrize("change", [
+    lambda game_objects: setattr(game_objects['asteroid_field'], 'spawn_timer',
+                                 game_objects['asteroid_field'].spawn_timer + 0.01),
+    lambda game_objects: setattr(game_objects['player'], 'respawn_timer', 1.0),
+    lambda game_objects: game_objects['shot_store'].ages.__setitem__(0, 0.5),
+])
+def test_hash_covers_timers(change):
+    game_objects = reset_game(ScriptedInput(Actions(fire=True)), SEED)
+    update_game(game_objects, FIXED_DT)
+    before = state_hash(game_objects)
+    change(game_objects)
+    assert state_hash(game_objects) != before
@@ -0,0 +1,154 @@
+import asyncio
+import socket
+import pytest
+import netcode
+import server
+from client import GameClient
+from inputs import Actions, NO_ACTIONS
+from server import GameServer
+
+FIRE = Actions(rotate_left=True, fire=True)
+
+
+async def wait_for(predicate, timeout: float = 5.0):
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout
+    while not predicate():
+        if loop.time() > end:
+            raise TimeoutError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+async def start_server(**kwargs):
+    """A server on a free localhost port, stepped by the test instead of its clock"""
+    game_server = GameServer(seed=0, **kwargs)
+    port = await game_server.start("127.0.0.1", 0)
+    game_server.simulation.cancel()
+    return game_server, port
+
+
+async def join(port: int):
+    client = GameClient()
+    await client.connect("127.0.0.1", port)
+    receiver = asyncio.create_task(client.receive())
+    return client, receiver
+
+
+async def run_steps(game_server, steps: int):
+    for _ in range(steps):
+        game_server.step()
+        await asyncio.sleep(0)
+
+
+def assert_same_state(received, expected):
+    assert (received.tick, received.score, received.game_over) == \
+        (expected.tick, expected.score, expected.game_over)
+    for kind, _ in netcode.KINDS:
+        assert getattr(received, kind).tobytes() == getattr(expected, kind).tobytes(), kind
+
+
+async def synced(game_server, client):
+    """Step to the next snapshot and wait for the client to decode it"""
+    while True:
+        game_server.step()
+        if game_server.tick % game_server.snapshot_interval == 0:
+            break
+    expected = netcode.capture(game_server.game_objects, game_server.tick, game_server.game_over)
+    await wait_for(lambda: client.state.tick == expected.tick)
+    assert_same_state(client.state, expected)
+    return expected
+
+
+def test_client_state_matches_server():
+    async def scenario():
+        game_server, port = await start_server()
+        client, receiver = await join(port)
+        await wait_for(lambda: 0 in game_server.connections)
+        client.send_actions(FIRE)
+        shot_ids = set()
+        removed = False
+        for _ in range(60):
+            await run_steps(game_server, 7)
+            state = await synced(game_server, client)
+            ids = set(state.shots['id'].tolist())
+            removed |= bool(shot_ids - ids)
+            shot_ids = ids
+        # Shots came and went, so deltas carried both changes and removals
+        assert removed
+        assert game_server.connections[0].snapshots > 60
+        receiver.cancel()
+        await client.close()
+        await game_server.close()
+
+    asyncio.run(scenario())
+
+
+def test_slots_and_reconnect():
+    async def scenario():
+        game_server, port = await start_server(max_players=2)
+        first, first_receiver = await join(port)
+        second, second_receiver = await join(port)
+        assert (first.player_index, second.player_index) == (0, 1)
+        # No free slot: the server hangs up straight away
+        with pytest.raises((asyncio.IncompleteReadError, ConnectionError)):
+            await GameClient().connect("127.0.0.1", port)
+
+        first.send_actions(FIRE)
+        await wait_for(lambda: game_server.inputs[0].read() == FIRE)
+        first_receiver.cancel()
+        await first.close()
+        # Leaving frees the slot and lets go of the controls
+        await wait_for(lambda: 0 not in game_server.connections)
+        assert game_server.inputs[0].read() == NO_ACTIONS
+
+        again, again_receiver = await join(port)
+        assert again.player_index == 0
+        await wait_for(lambda: 0 in game_server.connections)
+        await run_steps(game_server, 30)
+        # The new connection starts from an empty baseline; the one that
+        # stayed carries on with deltas
+        await synced(game_server, again)
+        await wait_for(lambda: second.state.tick == game_server.tick)
+        assert_same_state(second.state, again.state)
+
+        for receiver in (again_receiver, second_receiver):
+            receiver.cancel()
+        await again.close()
+        await second.close()
+        await game_server.close()
+
+    asyncio.run(scenario())
+
+
+def test_stalled_client_is_dropped(monkeypatch):
+    monkeypatch.setattr(server, 'NET_SEND_BUFFER_LIMIT', 4096)
+    monkeypatch.setattr(server, 'NET_STALL_TIMEOUT', 0.2)
+
+    async def scenario():
+        game_server, port = await start_server()
+        # Connects but never reads, with small socket buffers at both ends
+        stalled = socket.socket()
+        stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        stalled.connect(("127.0.0.1", port))
+        await wait_for(lambda: 0 in game_server.connections)
+        connection = game_server.connections[0]
+        connection.writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        reader, reader_task = await join(port)
+
+        loop = asyncio.get_running_loop()
+        end = loop.time() + 5
+        while 0 in game_server.connections and loop.time() < end:
+            await run_steps(game_server, 3)
+        assert 0 not in game_server.connections
+        assert connection.skipped > 0
+        assert connection.writer.transport.get_write_buffer_size() == 0
+        # The other client was not held back
+        state = await synced(game_server, reader)
+        assert state.tick == game_server.tick
+
+        stalled.close()
+        reader_task.cancel()
+        await reader.close()
+        await game_server.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+import tracemalloc
+import numpy as np
+import player
+from constants import MAX_SHOTS
+from headless import HeadlessGame
+from inputs import Actions
+from shot import Shot
+
+# Fire every step while turning, so shots leave in every direction. With
+# no cooldown and steps this short, the oldest shot is still on screen
+# when the ring wraps round to it, so the ring stays full and every step
+# recycles a slot.
+FIRE = Actions(rotate_left=True, rotate_right=False, thrust=False, reverse=False, fire=True)
+DT = 0.008
+MINUTES = 5
+WARMUP = 240  # steps before memory is measured from
+
+
+def shooting_range():
+    """A game with no asteroids, so nothing but shots ever changes"""
+    game = HeadlessGame(seed=0)
+    game_objects = game.game_objects
+    game_objects['updatable'].remove(game_objects['asteroid_field'])
+    for asteroid in list(game_objects['asteroids']):
+        asteroid.kill()
+    game_objects['kill_queue'].flush()
+    return game
+
+
+def test_soak_constant_fire(monkeypatch):
+    monkeypatch.setattr(player, 'PLAYER_SHOOT_COOLDOWN', 0)
+    game = shooting_range()
+    shots = game.game_objects['shots']
+    shot_store = game.game_objects['shot_store']
+    steps = round(MINUTES * 60 / DT)
+    tracemalloc.start()
+    try:
+        for step in range(steps):
+            if step == WARMUP:
+                baseline, _ = tracemalloc.get_traced_memory()
+            full = step >= MAX_SHOTS
+            if full:
+                # The slot about to be reused holds the oldest shot
+                slot = shot_store.head
+                assert np.argmax(shot_store.ages[:shot_store.count]) == slot
+                oldest = shot_store.owners[slot]
+            game.step(FIRE, DT)
+            assert len(shots) == len(shot_store)
+            if full:
+                assert len(shot_store) == MAX_SHOTS
+                assert oldest not in shots
+                assert shot_store.owners[slot] in shots
+                assert shot_store.ages[slot] == 0
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert current - baseline < 64 * 1024
+
+
+def test_ring_never_grows():
+    game = shooting_range()
+    shot_store = game.game_objects['shot_store']
+    for _ in range(10):
+        for _ in range(MAX_SHOTS * 3):
+            Shot.spawn(100, 100)
+        game.step(dt=0.01)
+        assert len(shot_store) <= MAX_SHOTS
+        assert shot_store.capacity == MAX_SHOTS
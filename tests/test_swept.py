@@ -0,0 +1,126 @@
+import pygame
+import pytest
+from benchmark import shooting_gallery
+from collision import DEFAULT_MODE, MODE_SWEPT
+from constants import FIXED_DT, SHOT_LIFETIME
+from inputs import Actions, ScriptedInput
+from main import reset_game, update_objects, resolve_collisions
+from asteroid import Asteroid
+from shot import Shot
+
+# Hits may differ from the 60 Hz run by this fraction; discrete collisions
+# at x8 miss about 15% of them
+TOLERANCE = 0.05
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return shooting_gallery(1, DEFAULT_MODE)
+
+
+@pytest.mark.parametrize("multiple", [4, 8])
+def test_big_steps_hit_like_60hz(baseline, multiple):
+    hits, _ = shooting_gallery(multiple, MODE_SWEPT)
+    assert abs(hits - baseline[0]) <= baseline[0] * TOLERANCE
+
+
+def test_discrete_big_steps_miss(baseline):
+    # Checks the gallery is hard enough to tell the modes apart
+    hits, _ = shooting_gallery(8, DEFAULT_MODE)
+    assert hits < baseline[0] * (1 - TOLERANCE)
+
+
+def empty_game():
+    game_objects = reset_game(ScriptedInput(), seed=0)
+    game_objects['updatable'].remove(game_objects['asteroid_field'])
+    for asteroid in list(game_objects['asteroids']):
+        asteroid.kill()
+    game_objects['kill_queue'].flush()
+    game_objects['player'].is_vulnerable = False
+    return game_objects
+
+
+def step(game_objects, multiple=8):
+    update_objects(game_objects, FIXED_DT * multiple, MODE_SWEPT)
+    resolve_collisions(game_objects, MODE_SWEPT)
+
+
+def test_new_shot_is_not_swept_before_it_moves():
+    game_objects = empty_game()
+    player = game_objects['player']
+    step(game_objects)
+    # Straight ahead, out of reach until the shot's first step
+    asteroid = Asteroid.spawn(player.position.x, player.position.y + 86, 20)
+    asteroid.velocity = pygame.Vector2(0, 0)
+    player.shoot()
+    resolve_collisions(game_objects, MODE_SWEPT)
+    assert game_objects['asteroids_destroyed'] == 0
+    step(game_objects)
+    assert game_objects['asteroids_destroyed'] == 1
+
+
+def test_expiring_shot_is_swept_for_its_last_step():
+    game_objects = empty_game()
+    player = game_objects['player']
+    player.shoot()
+    step(game_objects)
+    shot = next(iter(game_objects['shots']))
+    shot_store = game_objects['shot_store']
+    # The next step takes the shot past its lifetime, and it meets the
+    # asteroid most of the way through that step
+    shot_store.ages[shot.slot] = SHOT_LIFETIME
+    target = shot_store.positions[shot.slot] + shot_store.velocities[shot.slot] * FIXED_DT * 8 * 0.9
+    asteroid = Asteroid.spawn(target[0], target[1], 10)
+    asteroid.velocity = pygame.Vector2(0, 0)
+    step(game_objects)
+    assert game_objects['asteroids_destroyed'] == 1
+    assert not game_objects['shots']
+
+
+@pytest.mark.parametrize("multiple", [4, 8])
+def test_big_steps_keep_ship_speed(multiple):
+    speeds = []
+    for each in (1, multiple):
+        game_objects = empty_game()
+        player = game_objects['player']
+        player.input_source.set(Actions(thrust=True))
+        for _ in range(120 // each):
+            player.update(FIXED_DT * each)
+        speeds.append(player.velocity.length())
+    assert speeds[1] == pytest.approx(speeds[0], rel=0.1)
+
+
+def rock(x, y, radius=20):
+    asteroid = Asteroid.spawn(x, y, radius)
+    asteroid.velocity = pygame.Vector2(0, 0)
+    return asteroid
+
+
+def test_fast_ship_hits_asteroid_it_passes_through():
+    game_objects = empty_game()
+    player = game_objects['player']
+    player.is_vulnerable = True
+    lives = player.lives
+    # Thrusting straight at a rock it flies clean through in one big step
+    player.input_source.set(Actions(thrust=True))
+    player.velocity = pygame.Vector2(0, 1500)
+    rock(player.position.x, player.position.y + 100)
+    step(game_objects)
+    assert player.lives == lives - 1
+
+
+def test_shot_clears_asteroid_before_ship_reaches_it():
+    game_objects = empty_game()
+    player = game_objects['player']
+    player.is_vulnerable = True
+    lives = player.lives
+    # The smallest rock, so no pieces are left in the ship's way; the
+    # ship gets there late in the step and the shot early on
+    player.velocity = pygame.Vector2(0, 1500)
+    target = rock(player.position.x, player.position.y + 150)
+    shot = Shot.spawn(player.position.x + 10, player.position.y + 100)
+    shot.velocity = pygame.Vector2(0, 600)
+    step(game_objects)
+    assert not target.alive
+    assert game_objects['asteroids_destroyed'] == 1
+    assert player.lives == lives
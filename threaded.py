@@ -0,0 +1,314 @@
+"""Run the simulation on its own thread and draw from published snapshots.
+
+The simulation thread steps the world at SIMULATION_RATE and, after every
+step, publishes an immutable Snapshot of what needs drawing. The main
+thread keeps everything that touches pygame surfaces, the display and the
+event queue: it samples the keyboard, draws the newest snapshot and flips.
+A slow frame therefore no longer holds up physics, and NumPy and pygame
+drawing release the GIL often enough for the two threads to overlap.
+
+    python main.py --threaded
+"""
+import random
+import threading
+import time
+from collections import deque, namedtuple
+import numpy as np
+import pygame
+from constants import FIXED_DT, MAX_STEPS_PER_FRAME, RENDER_FPS, SHOT_RADIUS, SCREEN_WIDTH, ADAPTIVE_QUALITY
+from asteroid import Asteroid
+from explosion import Explosion
+from player import Player, ship_triangle
+from particles import SpriteCache, blit_particles
+from hud import TextCache, Hud, GameOverLayer
+from inputs import KeyboardInput, ScriptedInput
+from governor import RenderQuality, QualityGovernor
+from collision import SpatialHash
+from main import reset_game, update_objects, resolve_collisions
+
+# Everything the render thread needs from one simulation step. Arrays are
+# read-only copies, so a snapshot stays valid after newer ones are published.
+#   asteroids: (n, 6) previous x, y, current x, y, radius, shape variant
+#   shots:     (m, 4) previous x, y, current x, y
+#   player:    (previous x, y, current x, y, previous rotation, rotation, radius, visible)
+#   particles: (positions (k, 2), radii (k,), remaining-life fractions (k,))
+Snapshot = namedtuple('Snapshot', 'tick time asteroids shots player particles score lives game_over')
+
+
+def _frozen(array):
+    array.flags.writeable = False
+    return array
+
+
+def take_snapshot(game_objects, tick: int, published: float, game_over: bool = False) -> Snapshot:
+    """Copy the drawable state of a world into a new Snapshot"""
+    asteroids = game_objects['asteroids']
+    store = game_objects['asteroid_store']
+    slots = np.fromiter((asteroid.slot for asteroid in asteroids), dtype=np.intp, count=len(asteroids))
+    asteroid_data = np.empty((len(slots), 6))
+    asteroid_data[:, 0:2] = store.previous_positions[slots]
+    asteroid_data[:, 2:4] = store.positions[slots]
+    asteroid_data[:, 4] = store.radii[slots]
+    asteroid_data[:, 5] = [asteroid.shape for asteroid in asteroids]
+
+    shots = game_objects['shots']
+    store = game_objects['shot_store']
+    slots = np.fromiter((shot.slot for shot in shots), dtype=np.intp, count=len(shots))
+    shot_data = np.empty((len(slots), 4))
+    shot_data[:, 0:2] = store.previous_positions[slots]
+    shot_data[:, 2:4] = store.positions[slots]
+
+    player = game_objects['player']
+    player_data = (player.previous_position.x, player.previous_position.y,
+                   player.position.x, player.position.y,
+                   player.previous_rotation, player.rotation, player.radius, player.visible)
+
+    particles = game_objects['particles']
+    n = particles.count
+    particle_data = (_frozen(particles.positions[:n].copy()), _frozen(particles.sizes[:n].copy()),
+                     _frozen(particles.life[:n] / particles.fade[:n]))
+
+    return Snapshot(tick, published, _frozen(asteroid_data), _frozen(shot_data), player_data,
+                    particle_data, game_objects['score'], player.lives, game_over)
+
+
+class SnapshotBuffer:
+    """Two snapshot slots: the simulation fills the back one, then they swap.
+
+    read() always returns the front (newest complete) snapshot. Snapshots
+    are immutable, so the reader can keep drawing one while the next is
+    being published.
+    """
+
+    def __init__(self):
+        self.slots = [None, None]
+        self.front = 0
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def publish(self, snapshot: Snapshot):
+        back = 1 - self.front
+        self.slots[back] = snapshot
+        with self.lock:
+            self.front = back
+            self.published += 1
+
+    def read(self):
+        with self.lock:
+            return self.slots[self.front]
+
+
+class RateMeter:
+    """Events per second and mean work time over the last second.
+
+    Safe to tick from one thread while another reads it.
+    """
+
+    def __init__(self, window: float = 1.0):
+        self.window = window
+        self.events = deque()
+        self.total_ms = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def tick(self, work_ms: float = 0.0):
+        now = time.perf_counter()
+        with self.lock:
+            self.events.append((now, work_ms))
+            self.total_ms += work_ms
+            self.count += 1
+            self._trim(now)
+
+    def _trim(self, now: float):
+        while self.events and self.events[0][0] < now - self.window:
+            self.total_ms -= self.events.popleft()[1]
+
+    def read(self):
+        """Return (events per second, mean work ms) over the last window"""
+        with self.lock:
+            self._trim(time.perf_counter())
+            n = len(self.events)
+            return n / self.window, self.total_ms / n if n else 0.0
+
+
+class SimulationThread(threading.Thread):
+    """Steps a world at a fixed rate and publishes a snapshot after every step.
+
+    The world is created, stepped and reset only on this thread. After a
+    hitch at most MAX_STEPS_PER_FRAME steps are run back to back and the
+    rest of the backlog is dropped, as in the single-threaded loop.
+    """
+
+    def __init__(self, buffer: SnapshotBuffer, input_source, seed=None):
+        super().__init__(name="simulation", daemon=True)
+        self.buffer = buffer
+        self.input_source = input_source
+        self.seed = seed
+        self.meter = RateMeter()
+        self.stopping = threading.Event()
+        self.reset_requested = None
+        self.game_objects = None
+        self.game_over = False
+        self.tick = 0
+
+    def request_reset(self, input_source):
+        """Start a new game with this input source on the next tick"""
+        self.reset_requested = input_source
+
+    def stop(self):
+        self.stopping.set()
+
+    def reset(self, input_source, seed=None):
+        self.input_source = input_source
+        self.game_objects = reset_game(input_source, seed)
+        self.game_over = False
+        self.tick = 0
+        self.buffer.publish(take_snapshot(self.game_objects, 0, time.perf_counter()))
+
+    def step(self, grids):
+        start = time.perf_counter()
+        update_objects(self.game_objects, FIXED_DT)
+        self.game_over = resolve_collisions(self.game_objects, grids=grids)
+        end_tick = getattr(self.input_source, 'end_tick', None)
+        if end_tick is not None:
+            end_tick(self.game_objects)
+        self.tick += 1
+        self.buffer.publish(take_snapshot(self.game_objects, self.tick, time.perf_counter(), self.game_over))
+        self.meter.tick((time.perf_counter() - start) * 1000)
+
+    def run(self):
+        grids = (SpatialHash(), SpatialHash())
+        self.reset(self.input_source, self.seed)
+        next_tick = time.perf_counter() + FIXED_DT
+        while not self.stopping.is_set():
+            if self.reset_requested is not None:
+                input_source, self.reset_requested = self.reset_requested, None
+                self.reset(input_source)
+            now = time.perf_counter()
+            if now < next_tick:
+                self.stopping.wait(next_tick - now)
+                continue
+            if not self.game_over:
+                self.step(grids)
+            next_tick += FIXED_DT
+            if now - next_tick > MAX_STEPS_PER_FRAME * FIXED_DT:
+                next_tick = now
+
+
+def draw_snapshot(screen, snapshot: Snapshot, alpha: float, quality: RenderQuality, sprites: SpriteCache):
+    """Draw a snapshot alpha of the way from its previous step to its latest one"""
+    positions, sizes, fractions = snapshot.particles
+    if len(positions):
+        blit_particles(screen, sprites, positions, sizes, fractions)
+
+    asteroids = snapshot.asteroids
+    if len(asteroids):
+        centres = _blend(asteroids[:, 0:2], asteroids[:, 2:4], asteroids[:, 4], alpha)
+        sprite = Asteroid.shapes.sprite
+        blits = []
+        for (x, y), radius, shape in zip(centres.tolist(), asteroids[:, 4].tolist(), asteroids[:, 5].tolist()):
+            surface, half = sprite(radius, int(shape), quality.outline_detail, quality.line_width)
+            blits.append((surface, (x - half, y - half)))
+        screen.blits(blits, doreturn=False)
+
+    shots = snapshot.shots
+    if len(shots):
+        for centre in _blend(shots[:, 0:2], shots[:, 2:4], SHOT_RADIUS, alpha).tolist():
+            pygame.draw.circle(screen, "white", centre, SHOT_RADIUS)
+
+    previous_x, previous_y, x, y, previous_rotation, rotation, radius, visible = snapshot.player
+    if visible:
+        previous = pygame.Vector2(previous_x, previous_y)
+        current = pygame.Vector2(x, y)
+        # Wrapped or respawned this step; don't smear across the screen
+        position = current if previous.distance_squared_to(current) > radius * radius * 4 \
+            else previous.lerp(current, alpha)
+        blended_rotation = previous_rotation + (rotation - previous_rotation) * alpha
+        pygame.draw.polygon(screen, "white", ship_triangle(position, blended_rotation, radius),
+                            quality.line_width)
+
+
+def _blend(previous, current, radii, alpha):
+    blended = previous + (current - previous) * alpha
+    # Entities that wrapped this step are drawn where they landed
+    jumped = np.abs(current - previous).max(axis=1) > np.asarray(radii) * 2
+    blended[jumped] = current[jumped]
+    return blended
+
+
+def run_threaded(screen, record_path=None):
+    """Main-thread render loop for the threaded mode; returns when the window closes"""
+    clock = pygame.time.Clock()
+    text_cache = TextCache(36)
+    metrics_cache = TextCache(22)
+    hud = Hud(text_cache)
+    game_over_layer = GameOverLayer(text_cache)
+    quality = RenderQuality()
+    Asteroid.quality = Explosion.quality = Player.quality = quality
+    governor = QualityGovernor(quality) if ADAPTIVE_QUALITY else None
+    particle_sprites = SpriteCache()
+
+    # The keyboard may only be read on this thread; the simulation sees
+    # the latest sample through a ScriptedInput
+    keyboard = KeyboardInput()
+    controls = ScriptedInput()
+    recorder = None
+    seed = None
+    if record_path:
+        from replay import Recorder
+        seed = random.randrange(2 ** 32)
+        recorder = Recorder(controls, seed)
+
+    buffer = SnapshotBuffer()
+    simulation = SimulationThread(buffer, recorder or controls, seed)
+    render_meter = RateMeter()
+    simulation.start()
+
+    running = True
+    while running:
+        clock.tick(RENDER_FPS)
+        work_start = time.perf_counter()
+        snapshot = buffer.read()
+        game_over = snapshot is not None and snapshot.game_over
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and game_over:
+                if event.key == pygame.K_SPACE:
+                    simulation.request_reset(controls)
+                elif event.key == pygame.K_ESCAPE:
+                    running = False
+        controls.set(keyboard.read())
+
+        if game_over and recorder is not None:
+            recorder.recording.save(record_path)
+            recorder = None
+
+        screen.fill("black")
+        if snapshot is not None:
+            # Drawing runs up to one step behind the simulation so there is
+            # always a newer state to blend towards
+            alpha = min(1.0, (time.perf_counter() - snapshot.time) / FIXED_DT)
+            draw_snapshot(screen, snapshot, 1.0 if game_over else alpha, quality, particle_sprites)
+            if game_over:
+                game_over_layer.draw(screen, snapshot.score)
+            else:
+                hud.draw(screen, snapshot.score, snapshot.lives)
+        sim_rate, sim_ms = simulation.meter.read()
+        render_rate, render_ms = render_meter.read()
+        metrics = metrics_cache.render(f"sim {sim_rate:.0f} Hz {sim_ms:.1f}ms  "
+                                       f"render {render_rate:.0f} fps {render_ms:.1f}ms")
+        screen.blit(metrics, (SCREEN_WIDTH - metrics.get_width() - 10, 10))
+        pygame.display.flip()
+
+        work_ms = (time.perf_counter() - work_start) * 1000
+        render_meter.tick(work_ms)
+        if governor is not None:
+            governor.record(work_ms)
+
+    simulation.stop()
+    simulation.join()
+    if recorder is not None:
+        recorder.recording.save(record_path)
+    print(f"simulation: {simulation.meter.count} steps, render: {render_meter.count} frames")